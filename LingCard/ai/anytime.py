@@ -0,0 +1,124 @@
+# LingCard/ai/anytime.py
+import copy
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+class LatencyStats:
+    """单个策略的决策延迟统计，保留最近 window 次决策的耗时（秒）"""
+
+    def __init__(self, window: int = 10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, timed_out: bool = False, error: bool = False, fallback: bool = False):
+        with self._lock:
+            self.samples.append(seconds)
+            self.count += 1
+            self.timeouts += timed_out
+            self.errors += error
+            self.fallbacks += fallback
+
+    def percentile(self, p: float) -> float:
+        """最近邻秩法求第 p 百分位延迟，无样本时返回 0"""
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        rank = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def meets_slo(self, limit: float, p: float = 99) -> bool:
+        """第 p 百分位延迟是否不超过 limit 秒"""
+        return self.percentile(p) <= limit
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.percentile(100),
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'fallbacks': self.fallbacks,
+        }
+
+_latency_registry: Dict[str, LatencyStats] = {}
+_registry_lock = threading.Lock()
+
+def get_latency_stats(strategy_name: str) -> LatencyStats:
+    """按策略名取得（必要时创建）进程内共享的延迟统计"""
+    with _registry_lock:
+        if strategy_name not in _latency_registry:
+            _latency_registry[strategy_name] = LatencyStats()
+        return _latency_registry[strategy_name]
+
+def latency_report() -> Dict[str, Dict[str, float]]:
+    """所有策略的延迟摘要 {策略名: summary}"""
+    with _registry_lock:
+        names = list(_latency_registry)
+    return {name: get_latency_stats(name).summary() for name in names}
+
+
+class AnytimeAI:
+    """
+    带时间预算的 AI 决策包装器。
+    在后台线程中运行策略的 iter_moves，截止时间到达时返回目前最好的行动列表；
+    若策略超时仍无结果或抛出异常，则由看门狗改用 fallback（贪心）策略。
+    """
+
+    def __init__(self, strategy, fallback, time_budget: float = 1.0, grace: float = 0.05):
+        self.strategy = strategy
+        self.fallback = fallback
+        self.time_budget = time_budget
+        self.grace = grace # 截止后额外等待工作线程交出结果的时间
+        self.stats = get_latency_stats(strategy.name)
+        self.last_error: Optional[BaseException] = None
+
+    @property
+    def name(self) -> str:
+        return self.strategy.name
+
+    def choose_moves(self, game_state) -> List:
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        result = {'moves': None, 'error': None}
+        done = threading.Event()
+        if hasattr(self.strategy, 'observe'):
+            self.strategy.observe(game_state)
+
+        # 搜索线程只接触状态副本，即使看门狗放弃它也不会影响真实对局
+        worker = threading.Thread(
+            target=self._search, args=(copy.deepcopy(game_state), deadline, result, done), daemon=True
+        )
+        worker.start()
+        done.wait(max(0.0, deadline - time.perf_counter()) + self.grace)
+
+        moves, error = result['moves'], result['error']
+        timed_out = not done.is_set()
+        fallback = moves is None or error is not None
+        if fallback:
+            self.last_error = error
+            moves = self.fallback.choose_moves(game_state)
+
+        self.stats.record(time.perf_counter() - start, timed_out=timed_out,
+                          error=error is not None, fallback=fallback)
+        return list(moves)
+
+    def _search(self, game_state, deadline: float, result: Dict, done: threading.Event):
+        try:
+            for moves in self.strategy.iter_moves(game_state, deadline):
+                result['moves'] = list(moves)
+                if time.perf_counter() >= deadline:
+                    break
+        except Exception as e:
+            result['error'] = e
+        finally:
+            done.set()
@@ -0,0 +1,201 @@
+# LingCard/ai/belief.py
+"""
+对手隐藏牌的记牌信念。
+
+双方牌库构成公开（config 中的 deck_composition），打出的牌进入弃牌堆也公开，
+手牌数、牌库数、弃牌数同样可见。于是对手的手牌可以表示为
+  已知部分 known + 从 pool 中不放回抽出的 drawn 张（多元超几何分布），
+pool 为“在牌库里或已被抽进手牌但不知道是哪张”的牌，牌库恰好是 pool 中没被抽走的部分。
+牌库洗回时弃牌堆构成已知、牌库已空，此时对手手牌被完全确定，这正是比直接打乱手牌+牌库强的地方。
+
+BeliefTracker.observe 比较前后两次观察到的公开信息做增量更新；
+观察间隔较粗（例如只在自己决策时观察）导致无法区分的情况，退回“未知牌在手牌与牌库间均匀分布”，
+因此采样出的局面总与公开信息一致。同一 (pool, drawn) 的分布建一次别名表，之后每次采样 O(1)。
+"""
+import random
+from itertools import product
+from math import comb
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Counts = Tuple[int, ...]
+
+class _AliasTable:
+    """Walker 别名法：按权重 O(1) 抽取一个结果"""
+
+    def __init__(self, outcomes: List[Counts], weights: List[float]):
+        count = len(outcomes)
+        total = sum(weights)
+        scaled = [w * count / total for w in weights]
+        self.outcomes = outcomes
+        self.prob = [1.0] * count
+        self.alias = list(range(count))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+
+    def sample(self, rng) -> Counts:
+        i = rng.randrange(len(self.outcomes))
+        return self.outcomes[i] if rng.random() < self.prob[i] else self.outcomes[self.alias[i]]
+
+
+class CardBelief:
+    """一名玩家手牌/牌库的计数信念"""
+
+    _tables: Dict[Tuple[Counts, int], _AliasTable] = {} # 所有信念共享的别名表缓存
+
+    def __init__(self, card_names: Sequence[str]):
+        self.card_names = list(card_names)
+        self.index = {name: i for i, name in enumerate(self.card_names)}
+        self.known = [0] * len(self.card_names)
+        self.pool = [0] * len(self.card_names)
+        self.drawn = 0
+
+    def reset_uninformed(self, unseen: Sequence[int], hand_size: int):
+        """只知道未公开的牌（手牌+牌库）的构成"""
+        self.known = [0] * len(self.card_names)
+        self.pool = list(unseen)
+        self.drawn = hand_size
+
+    def reshuffle(self, hand: Sequence[int], discard: Sequence[int]):
+        """弃牌堆洗回牌库：此刻牌库为空，手牌构成已知，新牌库就是原弃牌堆"""
+        self.known = list(hand)
+        self.pool = list(discard)
+        self.drawn = 0
+
+    def deck_size(self) -> int:
+        return sum(self.pool) - self.drawn
+
+    def hand_size(self) -> int:
+        return sum(self.known) + self.drawn
+
+    def draw(self, count: int) -> bool:
+        if not 0 <= count <= self.deck_size():
+            return False
+        self.drawn += count
+        return True
+
+    def play(self, card_name: str) -> bool:
+        """打出一张已公开的牌；与信念矛盾时返回 False"""
+        c = self.index.get(card_name)
+        if c is None:
+            return False
+        if self.known[c] > 0:
+            self.known[c] -= 1
+        elif self.pool[c] > 0 and self.drawn > 0:
+            # 打出的牌必然是抽到的未知牌之一
+            self.pool[c] -= 1
+            self.drawn -= 1
+        else:
+            return False
+        return True
+
+    def hand_marginals(self) -> List[float]:
+        """手牌中各类卡的期望数量"""
+        total = sum(self.pool)
+        return [k + (self.drawn * p / total if total else 0.0) for k, p in zip(self.known, self.pool)]
+
+    def sample(self, rng=random) -> Tuple[Counts, Counts]:
+        """抽取一组与信念一致的 (手牌构成, 牌库构成)"""
+        key = (tuple(self.pool), self.drawn)
+        table = self._tables.get(key)
+        if table is None:
+            if len(self._tables) > 4096:
+                self._tables.clear()
+            table = self._tables[key] = self._build_table(*key)
+        drawn = table.sample(rng)
+        hand = tuple(k + x for k, x in zip(self.known, drawn))
+        deck = tuple(p - x for p, x in zip(self.pool, drawn))
+        return hand, deck
+
+    @staticmethod
+    def _build_table(pool: Counts, drawn: int) -> _AliasTable:
+        outcomes, weights = [], []
+        for combo in product(*(range(p + 1) for p in pool)):
+            if sum(combo) == drawn:
+                weight = 1
+                for p, x in zip(pool, combo):
+                    weight *= comb(p, x)
+                outcomes.append(combo)
+                weights.append(weight)
+        return _AliasTable(outcomes, weights)
+
+
+class BeliefTracker:
+    """跟踪某名玩家的公开信息并维护 CardBelief，每局一个"""
+
+    def __init__(self, config, player_id: int):
+        composition = config['game_settings']['deck_composition']
+        self.card_names = sorted(composition)
+        self.composition = [composition[name] for name in self.card_names]
+        self.player_id = player_id
+        self.belief = CardBelief(self.card_names)
+        self._last: Optional[Tuple[int, int, List[str]]] = None
+
+    def _player(self, game_state):
+        return next(p for p in game_state.players if p.id == self.player_id)
+
+    def _counts(self, cards: Sequence[str]) -> List[int]:
+        counts = [0] * len(self.card_names)
+        for name in cards:
+            counts[self.belief.index[name]] += 1
+        return counts
+
+    def observe(self, game_state):
+        """用当前公开信息（手牌数、牌库数、弃牌堆）更新信念"""
+        player = self._player(game_state)
+        hand, deck = len(player.hand), len(player.deck)
+        discard = [card.__class__.__name__ for card in player.discard_pile]
+        if self._last is None or not self._update(hand, deck, discard):
+            unseen = [total - used for total, used in zip(self.composition, self._counts(discard))]
+            self.belief.reset_uninformed(unseen, hand)
+        self._last = (hand, deck, discard)
+
+    def matches(self, game_state) -> bool:
+        """信念是否对应该状态下的公开信息（即最近一次 observe 的就是这个局面）"""
+        if self._last is None:
+            return False
+        player = self._player(game_state)
+        hand, deck, discard = self._last
+        return (len(player.hand), len(player.deck), len(player.discard_pile)) == (hand, deck, len(discard))
+
+    def _update(self, hand: int, deck: int, discard: List[str]) -> bool:
+        last_hand, last_deck, last_discard = self._last
+        belief = self.belief
+        if discard[:len(last_discard)] == last_discard:
+            plays = discard[len(last_discard):]
+            ok = belief.draw(hand - last_hand + len(plays)) and all(belief.play(name) for name in plays)
+        else:
+            # 抽牌时牌库洗回：先抽空旧牌库，洗回后再抽，之后打出的牌构成新的弃牌堆
+            plays = discard
+            draws_after = hand - last_hand + len(plays) - last_deck
+            ok = belief.draw(last_deck) and draws_after >= 0
+            if ok:
+                belief.reshuffle([k + p for k, p in zip(belief.known, belief.pool)], self._counts(last_discard))
+                ok = belief.draw(draws_after) and all(belief.play(name) for name in plays)
+        return ok and belief.deck_size() == deck and belief.hand_size() == hand
+
+    def determinize(self, game_state, rng=random):
+        """按信念重排副本中该玩家的手牌与牌库（只交换卡牌对象，不新建）"""
+        player = self._player(game_state)
+        hand_counts, deck_counts = self.belief.sample(rng)
+        by_name: Dict[str, list] = {}
+        for card in player.hand + player.deck:
+            by_name.setdefault(card.__class__.__name__, []).append(card)
+        if any(len(by_name.get(name, ())) != h + d
+               for name, h, d in zip(self.card_names, hand_counts, deck_counts)):
+            raise ValueError(f"玩家{self.player_id} 的信念与公开信息不一致")
+
+        hand, deck = [], []
+        for name, count in zip(self.card_names, hand_counts):
+            cards = by_name.get(name, [])
+            hand += cards[:count]
+            deck += cards[count:]
+        rng.shuffle(hand)
+        rng.shuffle(deck)
+        player.hand = hand
+        player.deck = deck
@@ -0,0 +1,92 @@
+# LingCard/ai/draft.py
+"""
+选角 AI：用模拟得到的“阵容对阵容”胜率表，常数时间选出针对对手已选角色的最佳阵容。
+
+胜率表按阵容组合缓存在磁盘上，每个组合的键包含 config.yaml 的对局设置、引擎/卡牌/策略源码，
+以及这两个阵容中各角色的源码摘要；改动或新增角色后重建时只重新模拟涉及它们的组合。
+
+用法: python -m LingCard.ai.draft --games 200
+"""
+import argparse
+import os
+from itertools import combinations
+from typing import Dict, List, Sequence, Tuple
+
+import yaml
+
+from LingCard.sim.matchups import all_lineups, pairing_key, read_cache, simulate_pairings
+from LingCard.strategies.greedy import GreedyAI
+from LingCard.utils.loader import load_cards, load_characters
+
+
+class DraftTable:
+    """阵容胜率表，构造时预先算好每种“对手已选角色”下的最佳阵容"""
+
+    def __init__(self, lineups: List[Tuple[str, ...]], entries: Sequence[Dict]):
+        self.lineups = lineups
+        self.win_rates: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], float] = {}
+        for entry in entries:
+            a, b = (tuple(sorted(lineup)) for lineup in entry['lineups'])
+            if entry['games'] == 0:
+                continue
+            # 平局记半场胜利
+            rate = (entry['wins'][0] + 0.5 * entry['draws']) / entry['games']
+            self.win_rates[(a, b)] = rate
+            self.win_rates[(b, a)] = 1 - rate
+
+        roster = sorted({name for lineup in lineups for name in lineup})
+        size = len(lineups[0]) if lineups else 0
+        self._best_response: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        for known_count in range(size + 1):
+            for known in combinations(roster, known_count):
+                candidates = [opp for opp in lineups if set(known) <= set(opp)]
+                if candidates:
+                    self._best_response[known] = max(
+                        lineups, key=lambda own: sum(self.win_rate(own, opp) for opp in candidates)
+                    )
+
+    def win_rate(self, lineup, opponent) -> float:
+        """lineup 对 opponent 的胜率（平局记半场），未模拟过的组合视为 0.5"""
+        return self.win_rates.get((tuple(sorted(lineup)), tuple(sorted(opponent))), 0.5)
+
+    def best_response(self, opponent_picks) -> Tuple[str, ...]:
+        """对手已选角色（可为空或只选了一部分）下期望胜率最高的阵容"""
+        return self._best_response[tuple(sorted(opponent_picks))]
+
+    @classmethod
+    def load(cls, path: str, config, strategy_class=GreedyAI) -> 'DraftTable':
+        """读取缓存并只保留与当前配置、源码一致的组合；因已分出高下而提前停止的组合胜率有偏，不使用"""
+        char_classes, card_classes = load_characters(), load_cards()
+        lineups = all_lineups(config, char_classes)
+        cache = read_cache(path)
+        entries = []
+        for a, b in combinations(lineups, 2):
+            entry = cache.get(pairing_key(config, strategy_class, a, b, char_classes, card_classes))
+            if entry is not None and entry.get('stop') != 'decided':
+                entries.append(entry)
+        return cls(lineups, entries)
+
+
+def build_draft_table(config, path: str, games: int = 200, jobs: int = 1,
+                      strategy_class=GreedyAI, verbose: bool = False) -> DraftTable:
+    """增量生成胜率表：缓存中键未变的组合直接复用，其余重新模拟（见 sim.matchups）"""
+    lineups, entries = simulate_pairings(config, path, games, jobs, strategy_class, verbose)
+    return DraftTable(lineups, entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟生成选角胜率表")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--output', default='draft_table.json')
+    parser.add_argument('--games', type=int, default=200, help="每个阵容组合模拟的局数")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    table = build_draft_table(config, args.output, args.games, args.jobs, verbose=True)
+    for opponent in table.lineups:
+        print(f"对手 {'-'.join(opponent)} -> 最佳阵容 {'-'.join(table.best_response(opponent))}")
+
+if __name__ == "__main__":
+    main()
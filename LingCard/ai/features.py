@@ -0,0 +1,187 @@
+# LingCard/ai/features.py
+"""
+局面特征编码：把 GameState 编码为定长 NumPy 向量，供向量化的估值函数批量打分。
+
+特征以“视角玩家”为己方，依次为：
+  每个角色槽（己方在前）: 血量/初始血量, 防御, 是否存活, 角色类 one-hot
+  双方: 手牌数, 牌库数, 弃牌数, 队伍效果 multi-hot
+  己方手牌中各类卡的数量（对手手牌是隐藏信息，不编码）
+  视角玩家是否为当前行动方, 视角玩家是否先手
+"""
+from typing import List, Sequence
+
+import numpy as np
+
+from LingCard.utils.enums import TeamEffect
+
+class StateEncoder:
+    """定长特征编码器，encode_batch 写入预分配的 (N, F) 数组"""
+
+    def __init__(self, char_names: Sequence[str], card_names: Sequence[str],
+                 chars_per_player: int, initial_hp: int):
+        self.char_names = list(char_names)
+        self.card_names = list(card_names)
+        self.char_index = {name: i for i, name in enumerate(self.char_names)}
+        self.card_index = {name: i for i, name in enumerate(self.card_names)}
+        self.effects = list(TeamEffect)
+        self.effect_index = {effect: i for i, effect in enumerate(self.effects)}
+        self.chars_per_player = chars_per_player
+        self.initial_hp = initial_hp
+
+        self.char_width = 3 + len(self.char_names)
+        self.player_width = 3 + len(self.effects)
+        self.char_offset = 0
+        self.player_offset = 2 * chars_per_player * self.char_width
+        self.hand_offset = self.player_offset + 2 * self.player_width
+        self.turn_offset = self.hand_offset + len(self.card_names)
+        self.size = self.turn_offset + 2
+
+    @classmethod
+    def from_config(cls, config, char_classes, card_classes=None) -> 'StateEncoder':
+        settings = config['game_settings']
+        return cls(sorted(char_classes), sorted(settings['deck_composition']),
+                   settings['characters_per_player'], settings['initial_hp'])
+
+    def feature_names(self) -> List[str]:
+        names = []
+        for side in ('own', 'opp'):
+            for slot in range(self.chars_per_player):
+                prefix = f"{side}_char{slot}"
+                names += [f"{prefix}_hp", f"{prefix}_defense", f"{prefix}_alive"]
+                names += [f"{prefix}_is_{name}" for name in self.char_names]
+        for side in ('own', 'opp'):
+            names += [f"{side}_hand", f"{side}_deck", f"{side}_discard"]
+            names += [f"{side}_effect_{effect.name}" for effect in self.effects]
+        names += [f"own_hand_{name}" for name in self.card_names]
+        names += ['to_move', 'moves_first']
+        return names
+
+    def encode(self, game_state, perspective_id: int = None) -> np.ndarray:
+        out = np.zeros((1, self.size), dtype=np.float32)
+        self.encode_into(out, 0, game_state, perspective_id)
+        return out[0]
+
+    def encode_batch(self, states, perspective_ids=None, out: np.ndarray = None) -> np.ndarray:
+        """
+        把多个局面编码进 (N, F) 数组。传入 out 时复用它（行数不少于 N），
+        每个局面只做标量写入，不产生中间数组。
+        """
+        count = len(states)
+        if out is None:
+            out = np.zeros((count, self.size), dtype=np.float32)
+        else:
+            out[:count] = 0
+        for row, game_state in enumerate(states):
+            perspective_id = perspective_ids[row] if perspective_ids is not None else None
+            self.encode_into(out, row, game_state, perspective_id)
+        return out[:count]
+
+    def encode_into(self, out: np.ndarray, row: int, game_state, perspective_id: int = None):
+        """把一个局面写入 out[row]（调用方负责清零）"""
+        current = game_state.get_current_player()
+        if perspective_id is None:
+            perspective_id = current.id
+        players = game_state.players
+        me = players[0] if players[0].id == perspective_id else players[1]
+        opponent = players[1] if me is players[0] else players[0]
+
+        col = self.char_offset
+        for player in (me, opponent):
+            for slot in range(self.chars_per_player):
+                if slot < len(player.characters):
+                    char = player.characters[slot]
+                    out[row, col] = char.current_hp / self.initial_hp
+                    out[row, col + 1] = char.defense_buff
+                    out[row, col + 2] = char.is_alive
+                    char_idx = self.char_index.get(char.__class__.__name__)
+                    if char_idx is not None:
+                        out[row, col + 3 + char_idx] = 1
+                col += self.char_width
+
+        col = self.player_offset
+        for player in (me, opponent):
+            out[row, col] = len(player.hand)
+            out[row, col + 1] = len(player.deck)
+            out[row, col + 2] = len(player.discard_pile)
+            for effect in player.team_effects:
+                out[row, col + 3 + self.effect_index[effect]] = 1
+            col += self.player_width
+
+        for card in me.hand:
+            card_idx = self.card_index.get(card.__class__.__name__)
+            if card_idx is not None:
+                out[row, self.hand_offset + card_idx] += 1
+
+        out[row, self.turn_offset] = current is me
+        out[row, self.turn_offset + 1] = game_state.turn_order[0] == players.index(me)
+
+
+class LinearEvaluator:
+    """线性估值 score = X @ w + b"""
+
+    def __init__(self, weights: np.ndarray, bias: float = 0.0):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+
+    @classmethod
+    def default(cls, encoder: StateEncoder) -> 'LinearEvaluator':
+        """与 strategies.strategy.evaluate 等价的权重：血量 1、防御 0.5、存活 5"""
+        weights = np.zeros(encoder.size, dtype=np.float32)
+        for side, sign in ((0, 1.0), (1, -1.0)):
+            for slot in range(encoder.chars_per_player):
+                col = encoder.char_offset + (side * encoder.chars_per_player + slot) * encoder.char_width
+                weights[col] = sign * encoder.initial_hp
+                weights[col + 1] = sign * 0.5
+                weights[col + 2] = sign * 5
+        return cls(weights)
+
+    def __call__(self, features: np.ndarray) -> np.ndarray:
+        return features @ self.weights + self.bias
+
+    def save(self, path: str):
+        np.savez(path, kind='linear', weights=self.weights, bias=self.bias)
+
+
+class MLPEvaluator:
+    """单隐层 MLP 估值：relu(X @ W1 + b1) @ w2 + b2"""
+
+    def __init__(self, w1: np.ndarray, b1: np.ndarray, w2: np.ndarray, b2: float = 0.0):
+        self.w1 = np.asarray(w1, dtype=np.float32)
+        self.b1 = np.asarray(b1, dtype=np.float32)
+        self.w2 = np.asarray(w2, dtype=np.float32)
+        self.b2 = float(b2)
+
+    def __call__(self, features: np.ndarray) -> np.ndarray:
+        hidden = features @ self.w1
+        hidden += self.b1
+        np.maximum(hidden, 0, out=hidden)
+        return hidden @ self.w2 + self.b2
+
+    def save(self, path: str):
+        np.savez(path, kind='mlp', w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2)
+
+
+def load_evaluator(path: str):
+    data = np.load(path)
+    if str(data['kind']) == 'mlp':
+        return MLPEvaluator(data['w1'], data['b1'], data['w2'], float(data['b2']))
+    return LinearEvaluator(data['weights'], float(data['bias']))
+
+
+class BatchEvaluator:
+    """把编码器与估值函数组合起来，一次为一批局面打分；终局仍按胜负给出极值"""
+
+    def __init__(self, encoder: StateEncoder, model, capacity: int = 256):
+        self.encoder = encoder
+        self.model = model
+        self._buffer = np.zeros((capacity, encoder.size), dtype=np.float32)
+
+    def evaluate(self, states, player_id: int) -> np.ndarray:
+        if len(states) > len(self._buffer):
+            self._buffer = np.zeros((len(states), self.encoder.size), dtype=np.float32)
+        features = self.encoder.encode_batch(states, [player_id] * len(states), out=self._buffer)
+        scores = self.model(features)
+        for i, game_state in enumerate(states):
+            if game_state.game_over:
+                scores[i] = 1000.0 if game_state.winner == player_id else -1000.0
+        return scores
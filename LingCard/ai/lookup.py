@@ -0,0 +1,316 @@
+# LingCard/ai/lookup.py
+"""
+手牌分配查找表：离线为 (阵容组合, 手牌各类卡数量, 双方角色血量/防御分档) 预先算好本回合的出牌分配，
+运行时以 mmap 打开，一次数组读取即得出牌方案。队伍效果由阵容决定，因此包含在阵容组合维度里。
+
+分配的评分沿用 strategies.strategy.evaluate 的权重（血量 1、防御 0.5、存活 5），
+攻击按期望结算（琉璃 5/6 命中、1/6 反击 2 点），攻击、回血、防御三部分分别取最优。
+
+用法: python -m LingCard.ai.lookup --output ai_lookup.lut --jobs 4
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+from array import array
+from functools import lru_cache
+from itertools import combinations
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from LingCard.utils.digest import config_digest
+from LingCard.utils.enums import ActionType, TeamEffect
+from LingCard.utils.loader import load_cards, load_characters
+
+MAGIC = b'LCLU'
+VERSION = 1
+_HEADER = struct.Struct('<4sBI')
+
+HP_EDGES = (4, 9)              # 血量分档: 倒下 / 1-4 / 5-9 / 10+
+MAX_COUNTS = (5, 3, 3)         # 表中区分的 攻击/回血/防御 卡数量上限，超出部分留在手里
+_CHAR_STATES = 1 + (len(HP_EDGES) + 1) * 2  # 倒下 + 各血量档 × 有无防御
+
+def hp_bucket(hp: int) -> int:
+    """0 表示倒下，其余从 1 开始按 HP_EDGES 分档"""
+    if hp <= 0:
+        return 0
+    return 1 + sum(1 for edge in HP_EDGES if hp > edge)
+
+def char_state(hp: int, defense: int) -> int:
+    bucket = hp_bucket(hp)
+    if bucket == 0:
+        return 0
+    return 1 + (bucket - 1) * 2 + (1 if defense > 0 else 0)
+
+def _bucket_representative(bucket: int, initial_hp: int) -> int:
+    """分档内用于离线评分的代表血量"""
+    low = HP_EDGES[bucket - 2] + 1 if bucket > 1 else 1
+    high = HP_EDGES[bucket - 1] if bucket <= len(HP_EDGES) else initial_hp
+    return min(initial_hp, (low + high) // 2)
+
+def _decode_char_state(state: int, initial_hp: int) -> Tuple[int, int]:
+    """char_state 的逆映射，返回代表 (血量, 防御)"""
+    if state == 0:
+        return 0, 0
+    bucket, has_defense = divmod(state - 1, 2)
+    return _bucket_representative(bucket + 1, initial_hp), has_defense
+
+
+class _TableLayout:
+    """查找表的索引布局，生成器与运行时共用"""
+
+    def __init__(self, lineups: List[Tuple[str, ...]]):
+        self.lineups = lineups
+        self.lineup_index = {lineup: i for i, lineup in enumerate(lineups)}
+        self.chars_per_side = len(lineups[0])
+        self.hand_count = 1
+        for limit in MAX_COUNTS:
+            self.hand_count *= limit + 1
+        self.state_count = _CHAR_STATES ** (2 * self.chars_per_side)
+        self.entries_per_pair = self.hand_count * self.state_count
+        # 分配编码的各位基数: 每个敌方角色的攻击数、每个己方角色的回血数、防御数
+        n = self.chars_per_side
+        self.alloc_radix = [MAX_COUNTS[0] + 1] * n + [MAX_COUNTS[1] + 1] * n + [MAX_COUNTS[2] + 1] * n
+        size = 1
+        for radix in self.alloc_radix:
+            size *= radix
+        self.typecode = 'H' if size <= 0xFFFF else 'I'
+
+    def index(self, own_lineup, opp_lineup, hand, own_states, opp_states) -> int:
+        idx = self.lineup_index[own_lineup] * len(self.lineups) + self.lineup_index[opp_lineup]
+        for count, limit in zip(hand, MAX_COUNTS):
+            idx = idx * (limit + 1) + min(count, limit)
+        for state in tuple(own_states) + tuple(opp_states):
+            idx = idx * _CHAR_STATES + state
+        return idx
+
+    def encode_alloc(self, alloc) -> int:
+        code = 0
+        for value, radix in zip(alloc, self.alloc_radix):
+            code = code * radix + value
+        return code
+
+    def decode_alloc(self, code: int) -> Tuple[int, ...]:
+        values = []
+        for radix in reversed(self.alloc_radix):
+            code, value = divmod(code, radix)
+            values.append(value)
+        return tuple(reversed(values))
+
+
+def _splits(total: int, parts: int):
+    """把不超过 total 张牌分给 parts 个角色的所有方式"""
+    if parts == 0:
+        yield ()
+        return
+    for first in range(total + 1):
+        for rest in _splits(total - first, parts - 1):
+            yield (first,) + rest
+
+
+class _PairingScorer:
+    """在一个阵容组合内为离散化局面打分，攻击/回血/防御分别求最优并缓存"""
+
+    def __init__(self, config, own_lineup, opp_lineup):
+        settings = config['game_settings']
+        self.initial_hp = settings['initial_hp']
+        self.own_lineup, self.opp_lineup = own_lineup, opp_lineup
+
+        values = {t: 0 for t in ActionType}
+        all_cards = load_cards()
+        overrides = settings.get('card_values') or {}
+        for card_name in settings['deck_composition']:
+            card = all_cards[card_name]()
+            values[card.action_type] = max(values[card.action_type], overrides.get(card_name, card.get_base_value()))
+        self.values = values
+
+        effects = {
+            TeamEffect[info['effect']] for info in config.get('team_effects', [])
+            if all(c in own_lineup for c in info['characters'])
+        }
+        self.attack_bonus = 1 if TeamEffect.JUN_LIULI in effects else 0
+
+    @lru_cache(maxsize=None)
+    def best_attacks(self, count: int, opp_states: Tuple[int, ...], cafe_alive: bool) -> Tuple[int, ...]:
+        best, best_score = (0,) * len(opp_states), 0.0
+        for split in _splits(count, len(opp_states)):
+            score = self._attack_score(split, opp_states, cafe_alive)
+            if score is not None and score > best_score + 1e-9:
+                best, best_score = split, score
+        return best
+
+    def _attack_score(self, split, opp_states, cafe_alive) -> Optional[float]:
+        score = 0.0
+        first = True
+        for name, state, count in zip(self.opp_lineup, opp_states, split):
+            if count == 0:
+                continue
+            if state == 0:
+                return None
+            hp, defense = _decode_char_state(state, self.initial_hp)
+            expected_hp = float(hp)
+            for nth in range(count):
+                damage = self.values[ActionType.ATTACK] + self.attack_bonus
+                if first and cafe_alive:
+                    damage += 1
+                first = False
+                if name == 'Jun' and nth < 2:
+                    damage = max(0, damage - 1)
+                hit_rate = 1.0
+                if name == 'Liuli':
+                    hit_rate = 5 / 6
+                    score -= 2 / 6 # 期望反击伤害
+                actual = max(0, damage - defense)
+                defense = max(0, defense - damage)
+                expected_hp -= hit_rate * actual
+            if expected_hp <= 0:
+                score += hp + 5
+            else:
+                score += hp - expected_hp
+        return score
+
+    @lru_cache(maxsize=None)
+    def best_support(self, action_type: ActionType, count: int, own_states: Tuple[int, ...]) -> Tuple[int, ...]:
+        best, best_score = (0,) * len(own_states), 0.0
+        for split in _splits(count, len(own_states)):
+            score = 0.0
+            for state, n in zip(own_states, split):
+                if n == 0:
+                    continue
+                if state == 0:
+                    score = None
+                    break
+                hp, _ = _decode_char_state(state, self.initial_hp)
+                if action_type == ActionType.HEAL:
+                    score += min(self.initial_hp - hp, self.values[ActionType.HEAL] * n)
+                else:
+                    # 防御按 0.5 计分，血量越低越值得防御
+                    score += n * (0.5 + 0.01 * (self.initial_hp - hp))
+            if score is not None and score > best_score + 1e-9:
+                best, best_score = split, score
+        return best
+
+    def best_alloc(self, hand, own_states, opp_states) -> Tuple[int, ...]:
+        cafe_alive = any(name == 'Cafe' and state > 0 for name, state in zip(self.own_lineup, own_states))
+        attacks = self.best_attacks(hand[0], opp_states, cafe_alive)
+        heals = self.best_support(ActionType.HEAL, hand[1], own_states)
+        defends = self.best_support(ActionType.DEFEND, hand[2], own_states)
+        return attacks + heals + defends
+
+
+def _build_pairing(args) -> bytes:
+    config, layout_lineups, own_lineup, opp_lineup = args
+    layout = _TableLayout(layout_lineups)
+    scorer = _PairingScorer(config, own_lineup, opp_lineup)
+    n = layout.chars_per_side
+    table = array(layout.typecode, bytes(layout.entries_per_pair * array(layout.typecode).itemsize))
+
+    hands = [(a, h, d) for a in range(MAX_COUNTS[0] + 1) for h in range(MAX_COUNTS[1] + 1) for d in range(MAX_COUNTS[2] + 1)]
+    idx = 0
+    for hand in hands:
+        for states in _state_tuples(2 * n):
+            own_states, opp_states = states[:n], states[n:]
+            if any(s > 0 for s in own_states) and any(s > 0 for s in opp_states):
+                table[idx] = layout.encode_alloc(scorer.best_alloc(hand, own_states, opp_states))
+            idx += 1
+    return table.tobytes()
+
+def _state_tuples(length: int):
+    if length == 0:
+        yield ()
+        return
+    for first in range(_CHAR_STATES):
+        for rest in _state_tuples(length - 1):
+            yield (first,) + rest
+
+
+def build_lookup_table(config, path: str, jobs: int = 1, verbose: bool = False):
+    """为花名册中所有阵容两两组合生成查找表并写入 path"""
+    roster = sorted(load_characters())
+    chars_per_side = config['game_settings']['characters_per_player']
+    lineups = list(combinations(roster, chars_per_side))
+    layout = _TableLayout(lineups)
+
+    meta = {
+        'lineups': [list(lineup) for lineup in lineups],
+        'hp_edges': list(HP_EDGES),
+        'max_counts': list(MAX_COUNTS),
+        'typecode': layout.typecode,
+        'digest': config_digest(config, 'game_settings', 'team_effects'),
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    # 数组起点按 8 字节对齐，便于 memoryview.cast
+    padding = -(_HEADER.size + len(meta_bytes)) % 8
+
+    tasks = [(config, lineups, own, opp) for own in lineups for opp in lineups]
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f, Pool(jobs) as pool:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(meta_bytes) + padding))
+        f.write(meta_bytes + b' ' * padding)
+        for i, chunk in enumerate(pool.imap(_build_pairing, tasks)):
+            f.write(chunk)
+            if verbose:
+                print(f"已完成 {i + 1}/{len(tasks)} 个阵容组合")
+
+
+class HandLookupTable:
+    """运行时查找表，一次读取得到 (攻击分配, 回血分配, 防御分配)"""
+
+    def __init__(self, path: str, config):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, meta_len = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"不是有效的查找表文件: {path}")
+        meta = json.loads(bytes(self._mm[_HEADER.size:_HEADER.size + meta_len]).decode('utf-8'))
+        if meta['digest'] != config_digest(config, 'game_settings', 'team_effects'):
+            raise ValueError(f"查找表与当前配置不匹配，请重新生成: {path}")
+
+        self.layout = _TableLayout([tuple(lineup) for lineup in meta['lineups']])
+        self._table = memoryview(self._mm)[_HEADER.size + meta_len:].cast(meta['typecode'])
+
+    def lookup(self, own_chars, opp_chars, hand_counts) -> Optional[Dict[str, List[int]]]:
+        """
+        返回按角色实际顺序排列的分配:
+        {'attack': [每个敌方角色的攻击数], 'heal': [...], 'defend': [...]}，阵容不在表中时返回 None
+        """
+        own_order = sorted(range(len(own_chars)), key=lambda i: own_chars[i].__class__.__name__)
+        opp_order = sorted(range(len(opp_chars)), key=lambda i: opp_chars[i].__class__.__name__)
+        own_lineup = tuple(own_chars[i].__class__.__name__ for i in own_order)
+        opp_lineup = tuple(opp_chars[i].__class__.__name__ for i in opp_order)
+        if own_lineup not in self.layout.lineup_index or opp_lineup not in self.layout.lineup_index:
+            return None
+
+        def states(chars, order):
+            return [char_state(chars[i].current_hp if chars[i].is_alive else 0, chars[i].defense_buff) for i in order]
+
+        idx = self.layout.index(own_lineup, opp_lineup, hand_counts, states(own_chars, own_order), states(opp_chars, opp_order))
+        alloc = self.layout.decode_alloc(self._table[idx])
+
+        n = self.layout.chars_per_side
+        result = {'attack': [0] * len(opp_chars), 'heal': [0] * n, 'defend': [0] * n}
+        for canonical, actual in enumerate(opp_order):
+            result['attack'][actual] = alloc[canonical]
+        for canonical, actual in enumerate(own_order):
+            result['heal'][actual] = alloc[n + canonical]
+            result['defend'][actual] = alloc[2 * n + canonical]
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线生成手牌分配查找表")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--output', default='ai_lookup.lut')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    build_lookup_table(config, args.output, args.jobs, verbose=True)
+    print(f"查找表已写入 {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# LingCard/ai/opening_book.py
+"""
+开局库：离线为每个阵容组合、每种可能的起手牌深度搜索前 N 个回合，
+把最优回合计划写入紧凑的键值文件。AI 在实时搜索前先查开局库。
+
+键由 (行动方阵容, 对手阵容, 回合数, 先后手, 手牌各类卡数量, 双方角色血量/防御) 哈希得到；
+值是与手牌顺序无关的行动序列 (卡牌类, 使用者, 目标)，运行时再换算成手牌索引。
+
+用法: python -m LingCard.ai.opening_book --plies 2 --budget 0.5
+"""
+import argparse
+import copy
+import hashlib
+import os
+import struct
+import time
+from array import array
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from LingCard.core.game_state import GameState
+from LingCard.core.game_engine import GameEngine
+from LingCard.strategies.rollout import RolloutAI
+from LingCard.utils.digest import config_digest
+from LingCard.utils.enums import ActionType
+from LingCard.utils.loader import load_cards, load_characters
+
+MAGIC = b'LCOB'
+VERSION = 1
+_HEADER = struct.Struct('<4sBI8s')
+
+def _canonical_chars(player):
+    return sorted(player.characters, key=lambda c: c.__class__.__name__)
+
+def position_key(game_state, card_names: List[str]) -> int:
+    """当前行动方回合开始时局面的 64 位键"""
+    player = game_state.get_current_player()
+    opponent = game_state.get_opponent_player()
+    own, opp = _canonical_chars(player), _canonical_chars(opponent)
+    counts = [0] * len(card_names)
+    for card in player.hand:
+        name = card.__class__.__name__
+        if name in card_names:
+            counts[card_names.index(name)] += 1
+    board = [(c.current_hp if c.is_alive else 0, c.defense_buff) for c in own + opp]
+    text = "|".join([
+        "-".join(c.__class__.__name__ for c in own),
+        "-".join(c.__class__.__name__ for c in opp),
+        str(game_state.current_round),
+        str(game_state.current_player_idx),
+        ",".join(map(str, counts)),
+        ";".join(f"{hp},{df}" for hp, df in board),
+    ])
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def encode_plan(game_state, moves, engine, card_names: List[str]) -> bytes:
+    """在状态副本上执行行动，把索引形式的行动转换为 (卡牌类, 使用者, 目标) 的字节串"""
+    sim = copy.deepcopy(game_state)
+    player = sim.get_current_player()
+    own = _canonical_chars(player)
+    encoded = bytearray()
+    for move in moves:
+        if not engine.is_legal_move(sim, move):
+            break
+        card_idx, user_idx, target_idx = move
+        card = player.hand[card_idx]
+        user = player.get_alive_characters()[user_idx]
+        target = engine.get_action_targets(sim, card)[target_idx]
+        target_side = own if target in player.characters else _canonical_chars(sim.get_opponent_player())
+        encoded += bytes([card_names.index(card.__class__.__name__), own.index(user) << 4 | target_side.index(target)])
+        engine.execute_action(sim, *move)
+        if sim.game_over:
+            break
+    return bytes([len(encoded) // 2]) + bytes(encoded)
+
+def decode_plan(game_state, data: bytes, card_names: List[str]) -> Optional[List[Tuple[int, int, int]]]:
+    """把开局库中的行动序列换算成当前手牌下的索引；有角色已倒下时返回 None"""
+    player = game_state.get_current_player()
+    opponent = game_state.get_opponent_player()
+    own, opp = _canonical_chars(player), _canonical_chars(opponent)
+    remaining = [c.__class__.__name__ for c in player.hand]
+    alive_own = player.get_alive_characters()
+    alive_opp = opponent.get_alive_characters()
+
+    moves = []
+    for i in range(data[0]):
+        card_code, chars = data[1 + 2 * i], data[2 + 2 * i]
+        card_name = card_names[card_code]
+        if card_name not in remaining:
+            return None
+        card_idx = remaining.index(card_name)
+        card = next(c for c in player.hand if c.__class__.__name__ == card_name)
+        if card.action_type == ActionType.ATTACK:
+            targets, target_pool = alive_opp, opp
+        else:
+            targets, target_pool = alive_own, own
+        user, target = own[chars >> 4], target_pool[chars & 0x0F]
+        if user not in alive_own or target not in targets:
+            return None
+        moves.append((card_idx, alive_own.index(user), targets.index(target)))
+        remaining.pop(card_idx)
+    return moves
+
+
+class OpeningBook:
+    """运行时开局库，整个文件读入字典，查询为一次哈希"""
+
+    def __init__(self, path: str, config):
+        self.config = config
+        self.card_names = sorted(config['game_settings']['deck_composition'])
+        self.entries: Dict[int, bytes] = {}
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, count, digest = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"不是有效的开局库文件: {path}")
+        if digest != bytes.fromhex(config_digest(config, 'game_settings', 'team_effects'))[:8]:
+            raise ValueError(f"开局库与当前配置不匹配，请重新生成: {path}")
+
+        pos = _HEADER.size
+        keys = array('Q')
+        keys.frombytes(data[pos:pos + 8 * count])
+        pos += 8 * count
+        offsets = array('I')
+        offsets.frombytes(data[pos:pos + 4 * (count + 1)])
+        pos += 4 * (count + 1)
+        for i, key in enumerate(keys):
+            self.entries[key] = data[pos + offsets[i]:pos + offsets[i + 1]]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, game_state, engine) -> Optional[List[Tuple[int, int, int]]]:
+        data = self.entries.get(position_key(game_state, self.card_names))
+        if data is None:
+            return None
+        return decode_plan(game_state, data, self.card_names)
+
+
+def write_opening_book(path: str, config, entries: Dict[int, bytes]):
+    keys = array('Q', sorted(entries))
+    offsets = array('I', [0])
+    blob = bytearray()
+    for key in keys:
+        blob += entries[key]
+        offsets.append(len(blob))
+    digest = bytes.fromhex(config_digest(config, 'game_settings', 'team_effects'))[:8]
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(keys), digest))
+        f.write(keys.tobytes())
+        f.write(offsets.tobytes())
+        f.write(blob)
+
+
+class OpeningBookBuilder:
+    """按阵容组合枚举开局局面，并用加大预算的推演搜索求每个局面的回合计划"""
+
+    def __init__(self, config, plies: int = 2, budget: float = 0.5):
+        self.config = config
+        self.plies = plies
+        self.budget = budget
+        self.engine = GameEngine(config)
+        self.searcher = RolloutAI(self.engine, samples=16, max_depth=6)
+        self.all_characters = load_characters()
+        self.all_cards = load_cards()
+        self.card_names = sorted(config['game_settings']['deck_composition'])
+        self.entries: Dict[int, bytes] = {}
+
+    def build_pairing(self, first_lineup, second_lineup):
+        game_state = GameState()
+        self.engine.setup_game(game_state, [first_lineup, second_lineup],
+                               self.all_characters, self.all_cards, turn_order=[0, 1])
+        self._expand(game_state, len(game_state.get_current_player().hand), 0)
+
+    def _expand(self, game_state, drawn: int, ply: int):
+        # 撤回本回合抽到的牌，改为逐一枚举所有可能的组合
+        player = game_state.get_current_player()
+        player.deck.extend(player.hand[len(player.hand) - drawn:])
+        del player.hand[len(player.hand) - drawn:]
+
+        available = {name: sum(1 for c in player.deck if c.__class__.__name__ == name) for name in self.card_names}
+        for composition in self._compositions(drawn, self.card_names, available):
+            position = copy.deepcopy(game_state)
+            self._deal(position.get_current_player(), composition)
+
+            key = position_key(position, self.card_names)
+            if key not in self.entries:
+                moves = self._search(position)
+                self.entries[key] = encode_plan(position, moves, self.engine, self.card_names)
+            else:
+                moves = decode_plan(position, self.entries[key], self.card_names) or []
+
+            if ply + 1 >= self.plies:
+                continue
+            for move in moves:
+                if not self.engine.is_legal_move(position, move):
+                    break
+                self.engine.execute_action(position, *move)
+            if position.game_over:
+                continue
+            self.engine.process_turn_end(position)
+            position.switch_turn()
+            before = len(position.get_current_player().hand)
+            self.engine.process_turn_start(position)
+            self._expand(position, len(position.get_current_player().hand) - before, ply + 1)
+
+    def _search(self, position) -> List:
+        deadline = time.perf_counter() + self.budget
+        moves = []
+        for moves in self.searcher.iter_moves(position, deadline):
+            pass
+        return moves
+
+    @staticmethod
+    def _compositions(size: int, names: List[str], available: Dict[str, int]):
+        if not names:
+            if size == 0:
+                yield {}
+            return
+        for count in range(min(size, available[names[0]]) + 1):
+            for rest in OpeningBookBuilder._compositions(size - count, names[1:], available):
+                yield dict(rest, **{names[0]: count})
+
+    @staticmethod
+    def _deal(player, composition: Dict[str, int]):
+        for name, count in composition.items():
+            for _ in range(count):
+                idx = next(i for i, c in enumerate(player.deck) if c.__class__.__name__ == name)
+                player.hand.append(player.deck.pop(idx))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线生成开局库")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--output', default='opening_book.bin')
+    parser.add_argument('--plies', type=int, default=2, help="覆盖的回合数（双方各算一回合）")
+    parser.add_argument('--budget', type=float, default=0.5, help="每个局面的搜索时间（秒）")
+    parser.add_argument('--lineups', nargs='*', help="只生成这些阵容之间的组合，如 Jun,Liuli Cafe,Xinhe")
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    builder = OpeningBookBuilder(config, args.plies, args.budget)
+    if args.lineups:
+        lineups = [tuple(item.split(',')) for item in args.lineups]
+    else:
+        lineups = list(combinations(sorted(builder.all_characters), config['game_settings']['characters_per_player']))
+
+    pairings = [(a, b) for a in lineups for b in lineups]
+    for i, (first, second) in enumerate(pairings):
+        builder.build_pairing(first, second)
+        print(f"[{i + 1}/{len(pairings)}] {'-'.join(first)} 先手 vs {'-'.join(second)}，累计 {len(builder.entries)} 个局面")
+    write_opening_book(args.output, config, builder.entries)
+    print(f"开局库已写入 {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+# LingCard/ai/tablebase.py
+"""
+残局库：离线用逆向分析生成，运行时 O(1) 查询胜率。
+
+残局被抽象为“行动方 + 双方各角色血量”，血量不超过阈值 threshold。
+模型按 config.yaml 的牌库比例估计每回合抽到的手牌，并包含攻击/回血数值、
+俊琉璃组合伤害+1、Cafe 第一次伤害+1、俊前两次减伤、琉璃 1/6 免疫反击；
+防御、手牌留存与额外抽牌类技能被忽略。
+
+用法: python -m LingCard.ai.tablebase Jun Liuli Cafe Xinhe --threshold 6
+"""
+import argparse
+import copy
+import mmap
+import os
+import struct
+from array import array
+from collections import defaultdict
+from math import factorial
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from LingCard.utils.digest import config_digest
+from LingCard.utils.enums import ActionType, TeamEffect
+from LingCard.utils.loader import load_cards
+
+MAGIC = b'LCTB'
+VERSION = 1
+_HEADER = struct.Struct('<4sBB8s')
+_SCALE = 65535 # 胜率以 uint16 定点数存储
+_WIN, _LOSS = -1, -2
+
+def _compositions(total: int, parts: int):
+    """所有和不超过 total 的 parts 元非负整数组"""
+    if parts == 0:
+        yield ()
+        return
+    for first in range(total + 1):
+        for rest in _compositions(total - first, parts - 1):
+            yield (first,) + rest
+
+def canonical_lineup(char_names) -> Tuple[str, ...]:
+    return tuple(sorted(char_names))
+
+def tablebase_filename(lineup_a, lineup_b) -> str:
+    a, b = sorted([canonical_lineup(lineup_a), canonical_lineup(lineup_b)])
+    return f"{'-'.join(a)}_vs_{'-'.join(b)}.tb"
+
+
+class EndgameModel:
+    """一对阵容的残局抽象模型，生成器与运行时查询共用"""
+
+    def __init__(self, config, lineup_a, lineup_b, threshold: int):
+        # 阵容按字典序排列，(A, B) 与 (B, A) 共用同一张表，由行动方位区分
+        self.lineups = tuple(sorted([canonical_lineup(lineup_a), canonical_lineup(lineup_b)]))
+        self.names = self.lineups[0] + self.lineups[1]
+        self.threshold = threshold
+        self.base = threshold + 1
+        self.positions = (
+            tuple(range(len(self.lineups[0]))),
+            tuple(range(len(self.lineups[0]), len(self.names))),
+        )
+        self.state_count = 2 * self.base ** len(self.names)
+
+        settings = config['game_settings']
+        self.hp_cap = min(settings['initial_hp'], threshold)
+
+        values = {t: 0 for t in ActionType}
+        weights = {t: 0 for t in ActionType}
+        all_cards = load_cards()
+        overrides = settings.get('card_values') or {}
+        for card_name, count in settings['deck_composition'].items():
+            card = all_cards[card_name]()
+            values[card.action_type] = max(values[card.action_type], overrides.get(card_name, card.get_base_value()))
+            weights[card.action_type] += count
+        self.attack_value = values[ActionType.ATTACK]
+        self.heal_value = values[ActionType.HEAL]
+        total = sum(weights.values())
+        p_attack = weights[ActionType.ATTACK] / total
+        p_heal = weights[ActionType.HEAL] / total
+
+        self.attack_bonus = []
+        self.hand_probs = []
+        self.allocs = []
+        for side, lineup in enumerate(self.lineups):
+            effects = {
+                TeamEffect[info['effect']] for info in config.get('team_effects', [])
+                if all(c in lineup for c in info['characters'])
+            }
+            self.attack_bonus.append(1 if TeamEffect.JUN_LIULI in effects else 0)
+            hand_size = settings['initial_hand_size'] + (2 if TeamEffect.CAFE_XINHE in effects else 0)
+            self.hand_probs.append(self._hand_distribution(hand_size, p_attack, p_heal))
+            # 行动分配: (对每个敌方角色的攻击次数..., 对每个己方角色的回血次数...)
+            opp_count = len(self.lineups[1 - side])
+            self.allocs.append(list(_compositions(hand_size, opp_count + len(lineup))))
+
+    @staticmethod
+    def _hand_distribution(hand_size: int, p_attack: float, p_heal: float) -> Dict[Tuple[int, int], float]:
+        """按牌库比例估计手牌中 (攻击数, 回血数) 的分布"""
+        p_other = max(0.0, 1 - p_attack - p_heal)
+        probs = defaultdict(float)
+        for attacks in range(hand_size + 1):
+            for heals in range(hand_size - attacks + 1):
+                others = hand_size - attacks - heals
+                ways = factorial(hand_size) // (factorial(attacks) * factorial(heals) * factorial(others))
+                probs[(attacks, heals)] += ways * p_attack ** attacks * p_heal ** heals * p_other ** others
+        return dict(probs)
+
+    def index(self, side: int, hp) -> int:
+        idx = side
+        for value in hp:
+            idx = idx * self.base + value
+        return idx
+
+    def decode(self, idx: int) -> Tuple[int, Tuple[int, ...]]:
+        hp = []
+        for _ in self.names:
+            idx, value = divmod(idx, self.base)
+            hp.append(value)
+        return idx, tuple(reversed(hp))
+
+    def terminal_value(self, side: int, hp) -> Optional[float]:
+        if all(hp[i] == 0 for i in self.positions[side]):
+            return 0.0
+        if all(hp[i] == 0 for i in self.positions[1 - side]):
+            return 1.0
+        return None
+
+    def first_attacker(self, side: int, hp) -> Optional[int]:
+        for i in self.positions[side]:
+            if self.names[i] == 'Cafe' and hp[i] > 0:
+                return i
+        return None
+
+    def attack_user(self, side: int, hp, attack_no: int) -> int:
+        """约定：Cafe 存活时由其打出第一张攻击，其余由血量最高的己方角色打出"""
+        cafe = self.first_attacker(side, hp)
+        if attack_no == 0 and cafe is not None:
+            return cafe
+        return max((i for i in self.positions[side] if hp[i] > 0), key=lambda i: hp[i])
+
+    def outcomes(self, side: int, hp, alloc) -> List[Tuple[int, float]]:
+        """
+        行动方按 alloc 打完一回合后的结果分布 [(下一状态索引或 _WIN/_LOSS, 概率)]。
+        攻击按目标顺序依次结算，回血在攻击之后结算。
+        """
+        own, opp = self.positions[side], self.positions[1 - side]
+        attacks, heals = alloc[:len(opp)], alloc[len(opp):]
+        sequence = [(target, nth) for target, count in zip(opp, attacks) for nth in range(count)]
+
+        results = defaultdict(float)
+        dist = {tuple(hp): 1.0}
+        for attack_no, (target, nth) in enumerate(sequence):
+            next_dist = defaultdict(float)
+            for state, p in dist.items():
+                if state[target] == 0:
+                    next_dist[state] += p
+                    continue
+                user = self.attack_user(side, state, attack_no)
+                damage = self.attack_value + self.attack_bonus[side]
+                if attack_no == 0 and user == self.first_attacker(side, state):
+                    damage += 1
+                if self.names[target] == 'Jun' and nth < 2:
+                    damage = max(0, damage - 1)
+                branches = [(1.0, damage, 0)]
+                if self.names[target] == 'Liuli':
+                    branches = [(5 / 6, damage, 0), (1 / 6, 0, 2)]
+
+                for q, dealt, counter in branches:
+                    new_state = list(state)
+                    new_state[target] = max(0, new_state[target] - dealt)
+                    new_state[user] = max(0, new_state[user] - counter)
+                    new_state = tuple(new_state)
+                    if all(new_state[i] == 0 for i in own):
+                        results[_LOSS] += p * q
+                    elif all(new_state[i] == 0 for i in opp):
+                        results[_WIN] += p * q
+                    else:
+                        next_dist[new_state] += p * q
+            dist = next_dist
+
+        for state, p in dist.items():
+            new_state = list(state)
+            for i, count in zip(own, heals):
+                if new_state[i] > 0:
+                    new_state[i] = max(new_state[i], min(self.hp_cap, new_state[i] + self.heal_value * count))
+            results[self.index(1 - side, new_state)] += p
+        return list(results.items())
+
+    def alloc_usage(self, side: int, alloc) -> Tuple[int, int]:
+        opp_count = len(self.positions[1 - side])
+        return sum(alloc[:opp_count]), sum(alloc[opp_count:])
+
+    def is_useful(self, side: int, hp, alloc) -> bool:
+        """不攻击已倒下的角色，也不治疗已倒下的角色"""
+        opp = self.positions[1 - side]
+        targets = opp + self.positions[side]
+        return all(count == 0 or hp[i] > 0 for i, count in zip(targets, alloc))
+
+
+def _expected_value(model: EndgameModel, side: int, q_values: Dict[Tuple[int, int], float]) -> float:
+    """对手牌分布求期望：手牌 (a, h) 可执行所有攻击数 ≤ a 且回血数 ≤ h 的分配"""
+    hand_size = max(a + h for a, h in model.hand_probs[side])
+    best = [[0.0] * (hand_size + 1) for _ in range(hand_size + 1)]
+    for a in range(hand_size + 1):
+        for h in range(hand_size + 1 - a):
+            value = q_values.get((a, h), 0.0)
+            if a > 0:
+                value = max(value, best[a - 1][h])
+            if h > 0:
+                value = max(value, best[a][h - 1])
+            best[a][h] = value
+    return sum(p * best[a][h] for (a, h), p in model.hand_probs[side].items())
+
+
+def build_tablebase(config, lineup_a, lineup_b, threshold: int = 6,
+                    tolerance: float = 1e-6, max_sweeps: int = 500, verbose: bool = False) -> Tuple[EndgameModel, array]:
+    """
+    逆向分析：从终局附近（总血量小）的局面开始反复迭代，直到胜率收敛。
+    回血会让局面成环，因此采用 Gauss-Seidel 迭代而非单次倒推。
+    """
+    model = EndgameModel(config, lineup_a, lineup_b, threshold)
+    values = [0.5] * model.state_count
+
+    transitions = {}
+    order = []
+    for idx in range(model.state_count):
+        side, hp = model.decode(idx)
+        terminal = model.terminal_value(side, hp)
+        if terminal is not None:
+            values[idx] = terminal
+            continue
+        order.append((sum(hp), idx))
+        transitions[idx] = [
+            (model.alloc_usage(side, alloc), model.outcomes(side, hp, alloc))
+            for alloc in model.allocs[side] if model.is_useful(side, hp, alloc)
+        ]
+    order = [idx for _, idx in sorted(order)]
+
+    for sweep in range(max_sweeps):
+        delta = 0.0
+        for idx in order:
+            side = idx // (model.base ** len(model.names))
+            q_values = {}
+            for usage, outcomes in transitions[idx]:
+                q = 0.0
+                for nxt, p in outcomes:
+                    q += p * (1.0 if nxt == _WIN else 0.0 if nxt == _LOSS else 1.0 - values[nxt])
+                if q > q_values.get(usage, -1.0):
+                    q_values[usage] = q
+            value = _expected_value(model, side, q_values)
+            delta = max(delta, abs(value - values[idx]))
+            values[idx] = value
+        if verbose:
+            print(f"第 {sweep + 1} 轮迭代，最大变化 {delta:.2e}")
+        if delta < tolerance:
+            break
+
+    return model, array('H', (int(round(v * _SCALE)) for v in values))
+
+
+def write_tablebase(path: str, config, model: EndgameModel, table: array):
+    digest = bytes.fromhex(config_digest(config, 'game_settings', 'team_effects'))[:8]
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, model.threshold, digest))
+        table.tofile(f)
+
+
+class EndgameTablebase:
+    """
+    运行时残局库查询。按阵容组合惰性地以 mmap 打开残局库文件，
+    所有存活角色血量都不超过阈值时返回 O(1) 的胜率查询与最优回合计划。
+    """
+
+    def __init__(self, directory: str, config):
+        self.directory = directory
+        self.config = config
+        self.digest = bytes.fromhex(config_digest(config, 'game_settings', 'team_effects'))[:8]
+        self._tables = {}
+
+    def _open(self, lineup_a, lineup_b):
+        filename = tablebase_filename(lineup_a, lineup_b)
+        if filename in self._tables:
+            return self._tables[filename]
+
+        entry = None
+        path = os.path.join(self.directory, filename)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, threshold, digest = _HEADER.unpack_from(mm)
+            # 配置变化后旧残局库作废
+            if magic == MAGIC and version == VERSION and digest == self.digest:
+                model = EndgameModel(self.config, lineup_a, lineup_b, threshold)
+                entry = (model, memoryview(mm)[_HEADER.size:].cast('H'))
+            else:
+                mm.close()
+        self._tables[filename] = entry
+        return entry
+
+    def locate(self, game_state):
+        """返回 (model, table, 行动方, 血量元组)，局面不在残局库范围内时返回 None"""
+        if game_state.game_over:
+            return None
+        player = game_state.get_current_player()
+        opponent = game_state.get_opponent_player()
+        names = [c.__class__.__name__ for c in player.characters]
+        opp_names = [c.__class__.__name__ for c in opponent.characters]
+        entry = self._open(names, opp_names)
+        if entry is None:
+            return None
+        model, table = entry
+
+        side = 0 if canonical_lineup(names) == model.lineups[0] else 1
+        hp_by_name = [{}, {}]
+        for s, p in ((side, player), (1 - side, opponent)):
+            for char in p.characters:
+                hp = char.current_hp if char.is_alive else 0
+                if hp > model.threshold:
+                    return None
+                hp_by_name[s][char.__class__.__name__] = hp
+        hp = tuple(hp_by_name[s][name] for s in (0, 1) for name in model.lineups[s])
+        return model, table, side, hp
+
+    def probe(self, game_state) -> Optional[float]:
+        """当前行动方的胜率（回合开始时的局面），不在范围内返回 None"""
+        located = self.locate(game_state)
+        if located is None:
+            return None
+        model, table, side, hp = located
+        return table[model.index(side, hp)] / _SCALE
+
+    def lookup(self, game_state, engine) -> Optional[List]:
+        """按残局库选出本回合的最优攻击/回血分配，并转换为具体的行动列表"""
+        located = self.locate(game_state)
+        if located is None:
+            return None
+        model, table, side, hp = located
+
+        player = game_state.get_current_player()
+        attacks = sum(1 for c in player.hand if c.action_type == ActionType.ATTACK)
+        heals = sum(1 for c in player.hand if c.action_type == ActionType.HEAL)
+
+        best_alloc, best_q = None, -1.0
+        for alloc in model.allocs[side]:
+            used_attacks, used_heals = model.alloc_usage(side, alloc)
+            if used_attacks > attacks or used_heals > heals or not model.is_useful(side, hp, alloc):
+                continue
+            q = 0.0
+            for nxt, p in model.outcomes(side, hp, alloc):
+                q += p * (1.0 if nxt == _WIN else 0.0 if nxt == _LOSS else 1.0 - table[nxt] / _SCALE)
+            if q > best_q:
+                best_alloc, best_q = alloc, q
+        if best_alloc is None:
+            return None
+        return self._alloc_to_moves(game_state, engine, model, side, best_alloc)
+
+    def _alloc_to_moves(self, game_state, engine, model, side, alloc) -> List:
+        """在状态副本上依次执行分配，记录对应的 (card_idx, user_idx, target_idx)"""
+        sim = copy.deepcopy(game_state)
+        player = sim.get_current_player()
+        opponent = sim.get_opponent_player()
+        own_names, opp_names = model.lineups[side], model.lineups[1 - side]
+        opp_count = len(opp_names)
+
+        plan = [(ActionType.ATTACK, opponent, name, count) for name, count in zip(opp_names, alloc[:opp_count])]
+        plan += [(ActionType.HEAL, player, name, count) for name, count in zip(own_names, alloc[opp_count:])]
+
+        moves = []
+        attack_no = 0
+        for action_type, owner, name, count in plan:
+            for _ in range(count):
+                if sim.game_over:
+                    return moves
+                card_idx = next((i for i, c in enumerate(player.hand) if c.action_type == action_type), None)
+                alive = player.get_alive_characters()
+                targets = owner.get_alive_characters()
+                target_idx = next((i for i, c in enumerate(targets) if c.__class__.__name__ == name), None)
+                if card_idx is None or target_idx is None or not alive:
+                    break
+
+                user = max(alive, key=lambda c: c.current_hp)
+                if action_type == ActionType.ATTACK and attack_no == 0:
+                    user = next((c for c in alive if c.__class__.__name__ == 'Cafe'), user)
+                    attack_no += 1
+                move = (card_idx, alive.index(user), target_idx)
+                engine.execute_action(sim, *move)
+                moves.append(move)
+        return moves
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线生成残局库")
+    parser.add_argument('characters', nargs='+', help="双方阵容的角色类名，前一半为一方，后一半为另一方")
+    parser.add_argument('--threshold', type=int, default=6, help="残局库覆盖的最大角色血量")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--output', default='tablebases')
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    half = len(args.characters) // 2
+    lineup_a, lineup_b = args.characters[:half], args.characters[half:]
+
+    model, table = build_tablebase(config, lineup_a, lineup_b, args.threshold, verbose=True)
+    path = os.path.join(args.output, tablebase_filename(lineup_a, lineup_b))
+    write_tablebase(path, config, model, table)
+    print(f"残局库已写入 {path}（{len(table)} 个局面）")
+
+if __name__ == "__main__":
+    main()
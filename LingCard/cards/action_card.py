@@ -14,6 +14,10 @@ class ActionCard(ABC):
         """获取行动卡的基础数值"""
         pass
 
+    def __deepcopy__(self, memo):
+        """卡牌创建后不再改变，复制对局状态（AI 推演）时共享同一实例即可"""
+        return self
+
     def to_dict(self):
         return {'class': self.__class__.__name__, 'name': self.name}
 
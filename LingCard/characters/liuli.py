@@ -1,5 +1,4 @@
 # LingCard/characters/liuli.py
-import random
 from .character import Character
 from typing import Tuple
 
@@ -18,7 +17,7 @@ class Liuli(Character):
         重写受到伤害的钩子，实现随机判定。
         返回 (最终受到的伤害, 对攻击者的反击伤害)。
         """
-        roll = random.randint(1, 6)
+        roll = game_state.get_rng().randint(1, 6)
         game_state.add_log(f"角色技能[{self.name}]触发：进行随机判定... 结果是 {roll}！")
         
         if roll == 6:
@@ -31,4 +31,4 @@ class Xinhe(Character):
         if self.is_alive and not self.status.get('used_card_this_turn', False):
             game_state.add_log(f"角色技能[{self.name}]触发：本回合未使用卡牌，额外抽1张牌。")
             if engine:
-                engine.draw_cards(player, 1)
\ No newline at end of file
+                engine.draw_cards(player, 1, game_state.rng)
\ No newline at end of file
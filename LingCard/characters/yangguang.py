@@ -19,4 +19,4 @@ class Yangguang(Character):
         if self.is_alive and not game_state.get_opponent_player().status.get('used_attack_this_turn', False):
             game_state.add_log(f"角色技能[{self.name}]触发：对手上回合未攻击，额外抽2张牌。")
             if engine:
-                engine.draw_cards(player, 2)
\ No newline at end of file
+                engine.draw_cards(player, 2, game_state.rng)
\ No newline at end of file
@@ -0,0 +1,203 @@
+# LingCard/core/flow.py
+"""
+生成器驱动的对局流程：流程在需要玩家行动时挂起，yield 一个 AwaitMove（等待哪位玩家、有哪些合法行动），
+调用方用 send() 把行动送回后继续执行。流程本身不读输入、不阻塞，一个线程可以同时推进任意多局对局。
+
+  flow = game_flow(engine, game_state)
+  request = next(flow)                  # AwaitMove
+  request = flow.send((0, 0, 1))        # 出牌 (card_idx, user_char_idx, target_char_idx)
+  request = flow.send(None)             # 结束回合
+  对局结束时生成器返回（StopIteration.value 为胜者 id，超过轮数上限为 None）
+
+TUI、服务端、模拟器与训练环境都经由同一个流程推进对局，回合规则只在这里体现一次。
+行动来源（控制器）只需提供 next_move(request) -> 行动或 None：StrategyController 把 AIStrategy 适配为控制器，
+run_flow 在当前线程中阻塞地把一局推进到底（可阻塞等待终端输入）；FlowScheduler 在一个线程里轮流推进多局对局，
+AI 控制的座位立即行动，其余座位挂起等待 submit()。
+
+用法: python -m LingCard.core.flow --games 1000
+"""
+import argparse
+import random
+import time
+from collections import deque
+from itertools import combinations
+from typing import Dict, Generator, List, Optional, Tuple
+
+import yaml
+
+from LingCard.core.game_engine import GameEngine
+from LingCard.core.game_state import GameState
+from LingCard.utils.loader import load_cards, load_characters, load_strategies
+
+Move = Tuple[int, int, int]
+
+
+class AwaitMove:
+    """流程挂起点：等待 player_id 行动。error 不为空表示上一次送回的行动不合法，需要重新给出"""
+
+    def __init__(self, engine, game_state: GameState, player_id: int, turn: int, error: Optional[str] = None):
+        self.engine = engine
+        self.game_state = game_state
+        self.player_id = player_id
+        self.turn = turn # 流程开始后的第几个回合，从 0 开始
+        self.error = error
+        self._legal_moves = None
+
+    @property
+    def legal_moves(self) -> List[Move]:
+        """当前玩家的合法行动，首次访问时才计算"""
+        if self._legal_moves is None:
+            self._legal_moves = self.engine.get_legal_moves(self.game_state)
+        return self._legal_moves
+
+    def __repr__(self):
+        return f"AwaitMove(player={self.player_id}, turn={self.turn}, error={self.error!r})"
+
+
+def game_flow(engine, game_state: GameState, max_rounds: Optional[int] = None) -> Generator[AwaitMove, Optional[Move], Optional[int]]:
+    """
+    已开局（setup_game 之后）的对局流程，见模块说明。
+    控制器可以直接在真实状态上走完整个回合再送回 None（StrategyController 的 in_place 选项），
+    此时若对局已经结束则不再结束回合。
+    """
+    turn = 0
+    error = None
+    while not game_state.game_over and (max_rounds is None or game_state.current_round <= max_rounds):
+        move = yield AwaitMove(engine, game_state, game_state.get_current_player().id, turn, error)
+        error = None
+        if move is None:
+            if not game_state.game_over:
+                engine.end_turn(game_state)
+            turn += 1
+        elif engine.is_legal_move(game_state, tuple(move)):
+            engine.execute_action(game_state, *move)
+        else:
+            error = f"不合法的行动: {list(move)}"
+    return game_state.winner
+
+
+def run_flow(flow: Generator, controllers: Dict[int, 'StrategyController']) -> Optional[int]:
+    """在当前线程中把一局推进到底：每个挂起点交给该玩家控制器的 next_move，返回胜者 id"""
+    try:
+        request = next(flow)
+        while True:
+            request = flow.send(controllers[request.player_id].next_move(request))
+    except StopIteration as stop:
+        return stop.value
+
+
+class StrategyController:
+    """
+    回合开始时让策略规划整个回合，之后逐个交出行动；计划中的行动失效时结束回合。
+    in_place 时，提供 play_turn 的策略（如贪心）直接在真实状态上走完整个回合，省去规划时的一次状态复制，
+    适合不需要逐步观察对局的批量模拟。
+    """
+
+    def __init__(self, strategy, in_place: bool = False):
+        self.strategy = strategy
+        self.in_place = in_place and hasattr(strategy, 'play_turn')
+        self._turn = None
+        self._plan = deque()
+
+    def next_move(self, request: AwaitMove) -> Optional[Move]:
+        if request.turn != self._turn:
+            self._turn = request.turn
+            if self.in_place:
+                self.strategy.play_turn(request.game_state)
+                return None
+            self._plan = deque(self.strategy.choose_moves(request.game_state))
+        if request.error or not self._plan:
+            self._plan.clear()
+            return None
+        move = self._plan.popleft()
+        if not request.engine.is_legal_move(request.game_state, move):
+            self._plan.clear()
+            return None
+        return move
+
+
+class FlowScheduler:
+    """单线程多局调度：AI 座位的行动排进就绪队列轮流执行，人类座位挂起等待 submit()"""
+
+    def __init__(self):
+        self.flows: Dict[str, Generator] = {}
+        self.controllers: Dict[str, Dict[int, StrategyController]] = {}
+        self.ready = deque()
+        self.waiting: Dict[str, AwaitMove] = {} # 等待外部输入的对局
+        self.results: Dict[str, Optional[int]] = {} # 已结束对局的胜者
+
+    def add(self, game_id: str, flow: Generator, controllers: Dict[int, StrategyController]):
+        """加入一局对局；controllers 中没有的座位由外部通过 submit() 行动"""
+        self.flows[game_id] = flow
+        self.controllers[game_id] = controllers
+        self._resume(game_id, None, start=True)
+
+    def submit(self, game_id: str, move: Optional[Move]) -> Optional[AwaitMove]:
+        """为挂起的对局送回外部行动，返回该局新的挂起点（已结束或轮到 AI 时为 None）"""
+        if game_id not in self.waiting:
+            raise KeyError(f"对局 {game_id} 没有在等待输入")
+        del self.waiting[game_id]
+        self._resume(game_id, move)
+        return self.waiting.get(game_id)
+
+    def _resume(self, game_id: str, value, start: bool = False):
+        try:
+            request = next(self.flows[game_id]) if start else self.flows[game_id].send(value)
+        except StopIteration as stop:
+            self.results[game_id] = stop.value
+            del self.flows[game_id], self.controllers[game_id]
+            return
+        if request.player_id in self.controllers[game_id]:
+            self.ready.append((game_id, request))
+        else:
+            self.waiting[game_id] = request
+
+    def run(self, max_steps: Optional[int] = None) -> int:
+        """推进就绪的对局，直到所有对局都结束或在等待外部输入；返回执行的步数"""
+        steps = 0
+        while self.ready and (max_steps is None or steps < max_steps):
+            game_id, request = self.ready.popleft()
+            move = self.controllers[game_id][request.player_id].next_move(request)
+            self._resume(game_id, move)
+            steps += 1
+        return steps
+
+    @property
+    def active(self) -> int:
+        return len(self.flows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在一个线程中交替推进多局 AI 对局")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--strategy', default='greedy')
+    parser.add_argument('--max-rounds', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    picker = random.Random(args.seed)
+    engine = GameEngine(config)
+    char_classes, card_classes = load_characters(), load_cards()
+    strategy_class = load_strategies()[args.strategy]
+    lineups = list(combinations(sorted(char_classes), config['game_settings']['characters_per_player']))
+
+    scheduler = FlowScheduler()
+    start = time.perf_counter()
+    for i in range(args.games):
+        game_state = GameState(state_file=None)
+        game_state.rng = random.Random(picker.getrandbits(32))
+        engine.setup_game(game_state, [picker.choice(lineups), picker.choice(lineups)], char_classes, card_classes)
+        controllers = {player.id: StrategyController(strategy_class(engine)) for player in game_state.players}
+        scheduler.add(str(i), game_flow(engine, game_state, args.max_rounds), controllers)
+    steps = scheduler.run()
+    elapsed = time.perf_counter() - start
+
+    winners = list(scheduler.results.values())
+    print(f"{args.games} 局交替推进完成：{steps} 步，用时 {elapsed:.2f} 秒（{steps / elapsed:.0f} 步/秒）")
+    print(f"玩家1胜 {winners.count(1)}，玩家2胜 {winners.count(2)}，平局 {winners.count(None)}")
+
+if __name__ == "__main__":
+    main()
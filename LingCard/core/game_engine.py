@@ -1,6 +1,7 @@
 # LingCard/core/game_engine.py
 import random
 from .game_state import GameState
+from .player import Player
 from LingCard.cards.action_card import ActionCard
 from LingCard.characters.character import Character
 from LingCard.utils.enums import ActionType, TeamEffect
@@ -8,24 +9,57 @@ from LingCard.utils.enums import ActionType, TeamEffect
 class GameEngine:
     def __init__(self, config):
         self.config = config
-
-    def initialize_player_deck(self, player, card_classes):
-        """根据配置初始化牌库"""
+        # 伤害监听：每次造成伤害时调用 listener(game_state, 来源角色, 目标角色, 实际伤害)，供模拟统计使用
+        self.damage_listeners = []
+
+    def create_character(self, char_class):
+        """创建角色实例，血量从config加载"""
+        char_instance = char_class()
+        char_instance.max_hp = self.config['game_settings']['initial_hp']
+        char_instance.current_hp = char_instance.max_hp
+        return char_instance
+
+    def get_card_value(self, card: ActionCard) -> int:
+        """卡牌数值：game_settings.card_values 中的覆盖值优先，否则为卡牌自身的基础数值"""
+        overrides = self.config['game_settings'].get('card_values') or {}
+        return overrides.get(card.__class__.__name__, card.get_base_value())
+
+    def setup_game(self, game_state: GameState, lineups, char_classes, card_classes, turn_order=None):
+        """
+        无交互开局：按阵容（角色类名列表）创建玩家，初始化牌库和队伍效果，
+        决定先手（默认随机）并开始第一个回合。
+        """
+        game_state.players = []
+        for player_idx, lineup in enumerate(lineups):
+            player = Player(player_idx + 1)
+            player.characters = [self.create_character(char_classes[name]) for name in lineup]
+            self.initialize_player_deck(player, card_classes, game_state.rng)
+            self.check_team_effects(player)
+            game_state.players.append(player)
+
+        if turn_order is None:
+            turn_order = [0, 1]
+            game_state.get_rng().shuffle(turn_order)
+        game_state.turn_order = list(turn_order)
+        self.process_turn_start(game_state)
+
+    def initialize_player_deck(self, player, card_classes, rng=None):
+        """根据配置初始化牌库；rng 为洗牌用的随机数发生器，默认全局 random"""
         deck = []
         for card_name, count in self.config['game_settings']['deck_composition'].items():
             card_class = card_classes[card_name]
             for _ in range(count):
                 deck.append(card_class())
-        random.shuffle(deck)
+        (rng or random).shuffle(deck)
         player.deck = deck
 
-    def draw_cards(self, player, count):
-        """为玩家抽牌"""
+    def draw_cards(self, player, count, rng=None):
+        """为玩家抽牌；牌库抽空时用 rng（默认全局 random）重洗弃牌堆"""
         for _ in range(count):
             if not player.deck and player.discard_pile:
                 player.deck = player.discard_pile
                 player.discard_pile = []
-                random.shuffle(player.deck)
+                (rng or random).shuffle(player.deck)
 
             if player.deck:
                 player.hand.append(player.deck.pop())
@@ -54,7 +88,7 @@ class GameEngine:
         for char in player.get_alive_characters():
             char.on_turn_start(game_state, player, self)
 
-        self.draw_cards(player, cards_to_draw)
+        self.draw_cards(player, cards_to_draw, game_state.rng)
         game_state.add_log(f"玩家{player.id} 回合开始，抽了{cards_to_draw}张牌。")
 
     def process_turn_end(self, game_state: GameState):
@@ -65,6 +99,52 @@ class GameEngine:
         
         game_state.add_log(f"玩家{player.id} 回合结束。")
 
+    def end_turn(self, game_state: GameState):
+        """结束当前玩家回合，切换到对手并开始其回合"""
+        self.process_turn_end(game_state)
+        game_state.switch_turn()
+        self.process_turn_start(game_state)
+
+    def get_action_targets(self, game_state: GameState, card: ActionCard):
+        """返回卡牌可选择的目标列表：攻击卡指向对手，其余指向己方"""
+        if card.action_type == ActionType.ATTACK:
+            return game_state.get_opponent_player().get_alive_characters()
+        return game_state.get_current_player().get_alive_characters()
+
+    def get_legal_moves(self, game_state: GameState):
+        """
+        列出当前玩家所有合法行动 (card_idx, user_char_idx, target_char_idx)。
+        同名卡牌效果相同，只保留手牌中第一张，以减少 AI 搜索的分支。
+        """
+        player = game_state.get_current_player()
+        users = player.get_alive_characters()
+        if game_state.game_over or not users:
+            return []
+
+        moves = []
+        seen_cards = set()
+        for card_idx, card in enumerate(player.hand):
+            card_key = card.__class__.__name__
+            if card_key in seen_cards:
+                continue
+            seen_cards.add(card_key)
+            targets = self.get_action_targets(game_state, card)
+            for user_idx in range(len(users)):
+                for target_idx in range(len(targets)):
+                    moves.append((card_idx, user_idx, target_idx))
+        return moves
+
+    def is_legal_move(self, game_state: GameState, move) -> bool:
+        """检查一个行动在当前状态下是否仍然可以执行"""
+        card_idx, user_char_idx, target_char_idx = move
+        player = game_state.get_current_player()
+        if game_state.game_over or not 0 <= card_idx < len(player.hand):
+            return False
+        if not 0 <= user_char_idx < len(player.get_alive_characters()):
+            return False
+        targets = self.get_action_targets(game_state, player.hand[card_idx])
+        return 0 <= target_char_idx < len(targets)
+
     def execute_action(self, game_state: GameState, card_idx: int, user_char_idx: int, target_char_idx: int):
         player = game_state.get_current_player()
         opponent = game_state.get_opponent_player()
@@ -87,7 +167,7 @@ class GameEngine:
         self.check_game_over(game_state)
 
     def _execute_attack(self, game_state, player, attacker, card, target):
-        damage = card.get_base_value()
+        damage = self.get_card_value(card)
 
         # 队伍效果
         # (此处省略了对 first_damage_dealt 状态的检查，实际应在角色状态中维护)
@@ -104,18 +184,22 @@ class GameEngine:
         # 造成伤害
         actual_damage = target.take_damage(adjusted_damage)
         game_state.add_log(f"{attacker.name} 对 {target.name} 使用攻击，造成 {actual_damage} 点伤害。")
+        for listener in self.damage_listeners:
+            listener(game_state, attacker, target, actual_damage)
 
         if counter_damage > 0:
-            attacker.take_damage(counter_damage)
+            actual_counter = attacker.take_damage(counter_damage)
             game_state.add_log(f"{target.name} 反击 {attacker.name}，造成 {counter_damage} 点伤害。")
+            for listener in self.damage_listeners:
+                listener(game_state, target, attacker, actual_counter)
 
     def _execute_heal(self, game_state, user, card, target):
-        heal_amount = card.get_base_value()
+        heal_amount = self.get_card_value(card)
         target.heal(heal_amount)
         game_state.add_log(f"{user.name} 对 {target.name} 使用治疗，恢复 {heal_amount} 点生命。")
 
     def _execute_defend(self, game_state, user, card, target):
-        def_amount = card.get_base_value()
+        def_amount = self.get_card_value(card)
         target.add_defense(def_amount)
         game_state.add_log(f"{user.name} 对 {target.name} 使用防御，增加 {def_amount} 点防御。")
 
@@ -1,8 +1,34 @@
 # LingCard/core/game_state.py
+import random
 import yaml
+from collections import deque
 from typing import List, Dict, Any, Optional
 from .player import Player
 
+LOG_LIMIT = 10 # 最多保留的日志条数
+HISTORY_LIMIT = 32 # diff() 可回溯的版本数，更旧的客户端需要完整重新同步
+
+
+class ChangeHistory:
+    """最近若干版本的状态快照，供 diff() 计算补丁；复制对局状态（AI 推演）时不随之复制"""
+
+    def __init__(self, limit: int = HISTORY_LIMIT):
+        self.snapshots = deque(maxlen=limit) # (版本号, 快照)
+
+    @property
+    def latest(self) -> Dict:
+        return self.snapshots[-1][1]
+
+    def find(self, version: int) -> Optional[Dict]:
+        for snapshot_version, snapshot in reversed(self.snapshots):
+            if snapshot_version == version:
+                return snapshot
+        return None
+
+    def __deepcopy__(self, memo):
+        return None
+
+
 class GameState:
     def __init__(self, state_file='game_status.yaml'):
         self.state_file = state_file
@@ -15,6 +41,17 @@ class GameState:
         self.game_over: bool = False
         self.winner: Optional[int] = None
         self.log: List[str] = [] # 游戏日志
+        self.log_count: int = 0 # 累计写入过的日志条数，用于计算新增日志
+        # --- 增量同步 ---
+        self.version: int = 0 # 状态版本号，commit() 发现状态有变化时加一
+        self.history: Optional[ChangeHistory] = None # 首次 commit() 时创建
+        # 本局专用的随机数发生器（random.Random），为 None 时使用全局 random。
+        # 复制状态时随之复制：在副本上推演不会推进真实对局的随机序列，但副本会按同一序列“预见”真实对局
+        # 之后的随机结果，因此搜索类 AI 要给推演副本换上新的发生器（见 RolloutAI.determinize）
+        self.rng: Optional[random.Random] = None
+
+    def get_rng(self):
+        return self.rng if self.rng is not None else random
 
     def get_current_player(self) -> Player:
         player_id = self.turn_order[self.current_player_idx]
@@ -32,9 +69,93 @@ class GameState:
 
     def add_log(self, message: str):
         self.log.append(message)
-        if len(self.log) > 10: # 最多保留10条日志
+        self.log_count += 1
+        if len(self.log) > LOG_LIMIT:
             self.log.pop(0)
 
+    # ---- 增量同步 ----
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """客户端可能关心的全部字段（未遮蔽），用于比较两个版本"""
+        return {
+            'round': self.current_round,
+            'current_player': self.get_current_player().id if self.turn_order else None,
+            'game_over': self.game_over,
+            'winner': self.winner,
+            'log_count': self.log_count,
+            'players': [{
+                'characters': [{'hp': c.current_hp, 'max_hp': c.max_hp, 'defense': c.defense_buff,
+                                'alive': c.is_alive, 'status': dict(c.status)} for c in p.characters],
+                'hand': [card.__class__.__name__ for card in p.hand],
+                'hand_count': len(p.hand),
+                'deck_count': len(p.deck),
+                'discard_count': len(p.discard_pile),
+                'team_effects': [effect.name for effect in p.team_effects],
+            } for p in self.players],
+        }
+
+    def commit(self) -> int:
+        """记录当前状态；与上一版本不同时版本号加一。返回当前版本号"""
+        snapshot = self._snapshot()
+        if self.history is None:
+            self.history = ChangeHistory()
+        elif snapshot == self.history.latest:
+            return self.version
+        else:
+            self.version += 1
+        self.history.snapshots.append((self.version, snapshot))
+        return self.version
+
+    def view(self, viewer: Optional[int] = None) -> Dict[str, Any]:
+        """viewer 视角下的完整状态：只有 viewer 自己的手牌可见（None 为观战视角，双方手牌都不可见）"""
+        version = self.commit()
+        snapshot = self.history.latest
+        players = []
+        for player, data in zip(self.players, snapshot['players']):
+            characters = [dict({'class': c.__class__.__name__, 'name': c.name}, **fields)
+                          for c, fields in zip(player.characters, data['characters'])]
+            players.append(dict(data, id=player.id, characters=characters,
+                                hand=data['hand'] if player.id == viewer else None))
+        state = {key: value for key, value in snapshot.items() if key != 'players'}
+        state.update(version=version, players=players, log=list(self.log))
+        return state
+
+    def diff(self, since_version: int, viewer: Optional[int] = None) -> Dict[str, Any]:
+        """
+        从 since_version 到当前版本的补丁（viewer 视角）：只含变化的回合信息、角色字段、
+        手牌/牌库/弃牌数量与新增日志。since_version 已超出保留的历史时返回完整状态
+        {'version': ..., 'full': True, 'state': view(viewer)}。客户端用 apply_patch() 应用。
+        """
+        version = self.commit()
+        old = self.history.find(since_version)
+        if old is None:
+            return {'version': version, 'full': True, 'state': self.view(viewer)}
+        new = self.history.latest
+        patch = {'version': version, 'since': since_version}
+        for key in ('round', 'current_player', 'game_over', 'winner', 'log_count'):
+            if new[key] != old[key]:
+                patch[key] = new[key]
+        characters, players = [], []
+        for player, old_p, new_p in zip(self.players, old['players'], new['players']):
+            for index, (old_c, new_c) in enumerate(zip(old_p['characters'], new_p['characters'])):
+                changed = {key: value for key, value in new_c.items() if old_c[key] != value}
+                if changed:
+                    characters.append(dict(changed, player=player.id, index=index))
+            changed = {key: new_p[key] for key in ('hand_count', 'deck_count', 'discard_count', 'team_effects')
+                       if new_p[key] != old_p[key]}
+            if player.id == viewer and new_p['hand'] != old_p['hand']:
+                changed['hand'] = new_p['hand']
+            if changed:
+                players.append(dict(changed, id=player.id))
+        if characters:
+            patch['characters'] = characters
+        if players:
+            patch['players'] = players
+        new_events = min(new['log_count'] - old['log_count'], len(self.log))
+        if new_events > 0:
+            patch['log'] = self.log[-new_events:]
+        return patch
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             'global_info': {
@@ -46,6 +167,8 @@ class GameState:
                 'current_player_idx': self.current_player_idx,
                 'game_over': self.game_over,
                 'winner': self.winner,
+                'version': self.version,
+                'log_count': self.log_count,
             },
             'players': [p.to_dict() for p in self.players],
             'log': self.log,
@@ -61,14 +184,48 @@ class GameState:
         try:
             with open(self.state_file, 'r', encoding='utf-8') as f:
                 data = yaml.safe_load(f)
-            
-            self.turn_order = data['global_info']['turn_order']
-            self.current_round = data['live_info']['current_round']
-            self.current_player_idx = data['live_info']['current_player_idx']
-            self.game_over = data['live_info']['game_over']
-            self.winner = data['live_info']['winner']
-            self.players = [Player.from_dict(pd, all_char_classes, all_card_classes) for pd in data['players']]
-            self.log = data.get('log', [])
+            self.load_dict(data, all_char_classes, all_card_classes)
             return True
         except (FileNotFoundError, KeyError):
-            return False
\ No newline at end of file
+            return False
+
+    def load_dict(self, data, all_char_classes, all_card_classes):
+        """从 to_dict() 的结果恢复游戏状态"""
+        self.turn_order = data['global_info']['turn_order']
+        self.current_round = data['live_info']['current_round']
+        self.current_player_idx = data['live_info']['current_player_idx']
+        self.game_over = data['live_info']['game_over']
+        self.winner = data['live_info']['winner']
+        self.players = [Player.from_dict(pd, all_char_classes, all_card_classes) for pd in data['players']]
+        self.log = data.get('log', [])
+        self.log_count = data['live_info'].get('log_count', len(self.log))
+        # 版本号延续下去；变更历史不保存，恢复前的版本号在 diff() 中得到完整状态
+        self.version = data['live_info'].get('version', 0)
+        self.history = None
+
+
+class ResyncRequired(Exception):
+    """补丁不是基于客户端当前版本生成的，需要重新获取完整状态（diff 的 since 传 -1）"""
+
+
+def apply_patch(state: Optional[Dict[str, Any]], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """客户端：把 GameState.diff() 的补丁应用到本地保存的状态（view() 的结构）上，返回新的状态"""
+    if patch.get('full'):
+        return patch['state']
+    if state is None or state.get('version') != patch.get('since'):
+        raise ResyncRequired(f"本地版本 {state and state.get('version')} 与补丁基准 {patch.get('since')} 不符")
+    players = {player['id']: player for player in state['players']}
+    for key, value in patch.items():
+        if key == 'characters':
+            for change in value:
+                fields = {k: v for k, v in change.items() if k not in ('player', 'index')}
+                players[change['player']]['characters'][change['index']].update(fields)
+        elif key == 'players':
+            for change in value:
+                players[change['id']].update(change)
+        elif key == 'log':
+            state['log'].extend(value)
+            del state['log'][:-LOG_LIMIT]
+        elif key != 'since':
+            state[key] = value
+    return state
@@ -1,4 +1,5 @@
 # LingCard/game_manager.py
+import os
 import yaml
 import random
 import time
@@ -6,8 +7,15 @@ from LingCard.utils.enums import GamePhase, ActionType
 from LingCard.core.game_state import GameState
 from LingCard.core.player import Player
 from LingCard.core.game_engine import GameEngine
-from LingCard.utils.loader import load_characters, load_cards
+from LingCard.core.flow import StrategyController, game_flow, run_flow
+from LingCard.utils.loader import load_characters, load_cards, load_strategies
 from LingCard.ui.tui import TUI
+from LingCard.ai.anytime import AnytimeAI
+from LingCard.ai.tablebase import EndgameTablebase
+from LingCard.ai.opening_book import OpeningBook
+from LingCard.ai.draft import DraftTable
+from LingCard.strategies.greedy import GreedyAI
+from LingCard.strategies.rollout import RolloutAI
 
 class GameManager:
     def __init__(self, config_path='config.yaml', state_path='game_status.yaml'):
@@ -24,6 +32,21 @@ class GameManager:
         self.phase = GamePhase.INITIALIZING
         self.vs_ai = False
 
+        ai_settings = self.config.get('ai_settings', {})
+        tablebase_dir = ai_settings.get('tablebase_dir', 'tablebases')
+        tablebase = EndgameTablebase(tablebase_dir, self.config) if os.path.isdir(tablebase_dir) else None
+        book_path = ai_settings.get('opening_book', 'opening_book.bin')
+        opening_book = OpeningBook(book_path, self.config) if os.path.exists(book_path) else None
+        strategy_name = ai_settings.get('strategy', RolloutAI.name)
+        if strategy_name == RolloutAI.name:
+            strategy = RolloutAI(self.engine, tablebase=tablebase, opening_book=opening_book)
+        else:
+            strategy = load_strategies()[strategy_name](self.engine)
+        self.ai = AnytimeAI(strategy, fallback=GreedyAI(self.engine),
+                            time_budget=ai_settings.get('time_budget', 1.0))
+        draft_path = ai_settings.get('draft_table', 'draft_table.json')
+        self.draft_table = DraftTable.load(draft_path, self.config) if os.path.exists(draft_path) else None
+
     def run(self):
         """游戏主状态机"""
         while self.phase != GamePhase.EXIT:
@@ -33,14 +56,8 @@ class GameManager:
                 self._phase_mode_selection()
             elif self.phase == GamePhase.CHARACTER_SELECTION:
                 self._phase_character_selection()
-            elif self.phase == GamePhase.PLAYER_TURN:
-                self._phase_player_turn()
-            # --- 新增 AI 回合处理 ---
-            elif self.phase == GamePhase.AI_TURN:
-                self._phase_ai_turn()
-            # ------------------------
-            elif self.phase == GamePhase.TURN_END:
-                self._phase_turn_end()
+            elif self.phase == GamePhase.GAME_LOOP:
+                self._phase_game_loop()
             elif self.phase == GamePhase.GAME_OVER:
                 self._phase_game_over()
         
@@ -64,7 +81,7 @@ class GameManager:
         self._select_chars_for_player(self.game_state.players[0], "玩家1")
         # 玩家2/AI选择
         if self.vs_ai:
-            self._ai_select_chars(self.game_state.players[1])
+            self._ai_select_chars(self.game_state.players[1], self.game_state.players[0])
         else:
             self._select_chars_for_player(self.game_state.players[1], "玩家2")
             
@@ -81,7 +98,7 @@ class GameManager:
         # 回合开始
         self.engine.process_turn_start(self.game_state)
         self.game_state.save()
-        self.phase = GamePhase.PLAYER_TURN
+        self.phase = GamePhase.GAME_LOOP
 
     def _select_chars_for_player(self, player, player_name):
         available_chars = list(self.all_characters.values())
@@ -91,32 +108,49 @@ class GameManager:
             choice_idx = self.tui.select_from_list(prompt, options)
             
             chosen_char_class = available_chars.pop(choice_idx)
-            char_instance = chosen_char_class()
-            # 从config加载HP
-            char_instance.max_hp = self.config['game_settings']['initial_hp']
-            char_instance.current_hp = char_instance.max_hp
-            player.characters.append(char_instance)
+            player.characters.append(self.engine.create_character(chosen_char_class))
 
-    def _ai_select_chars(self, player):
-        available_chars = list(self.all_characters.values())
-        random.shuffle(available_chars)
-        for i in range(self.config['game_settings']['characters_per_player']):
-            chosen_char_class = available_chars.pop(0)
-            char_instance = chosen_char_class()
-            char_instance.max_hp = self.config['game_settings']['initial_hp']
-            char_instance.current_hp = char_instance.max_hp
-            player.characters.append(char_instance)
+    def _ai_select_chars(self, player, opponent):
+        if self.draft_table is not None:
+            # 根据胜率表针对对手已选的角色挑选阵容
+            opponent_picks = [c.__class__.__name__ for c in opponent.characters]
+            chosen = [self.all_characters[name] for name in self.draft_table.best_response(opponent_picks)]
+        else:
+            available_chars = list(self.all_characters.values())
+            random.shuffle(available_chars)
+            chosen = available_chars[:self.config['game_settings']['characters_per_player']]
+        for chosen_char_class in chosen:
+            player.characters.append(self.engine.create_character(chosen_char_class))
         self.tui.show_message("AI 已选择角色。")
 
-    def _phase_player_turn(self):
+    def _phase_game_loop(self):
+        """回合规则由 game_flow 统一推进，本类只作为双方的行动来源（见 next_move）"""
+        self.ai_controller = StrategyController(self.ai)
+        self.ai_turn = None
+        self.ai_acted = False
+        controllers = {player.id: self for player in self.game_state.players}
+        run_flow(game_flow(self.engine, self.game_state), controllers)
+        self.game_state.save()
+        self.phase = GamePhase.GAME_OVER
+
+    def next_move(self, request):
+        """流程在此等待行动：人机对战时玩家2由 AI 行动，其余从终端读入；返回 None 表示结束回合"""
+        self.game_state.save()
+        if self.vs_ai and request.player_id == 2:
+            return self._ai_move(request)
+        return self._player_move(request)
+
+    def _player_move(self, request):
         player = self.game_state.get_current_player()
-        
+        if request.error:
+            self.tui.render_and_show_message(self.game_state, request.error, 2)
+
         while True:
             options = [f"使用: {card.name}" for card in player.hand] + ["结束回合"]
             card_choice = self.tui.select_from_list("选择你的行动", options, self.game_state)
             
             if card_choice == -1 or card_choice == len(player.hand): # 结束回合
-                break
+                return None
             
             # 使用卡牌
             card = player.hand[card_choice]
@@ -136,92 +170,31 @@ class GameManager:
             target_choice = self.tui.select_from_list(f"选择 '{card.name}' 的目标", target_options, self.game_state)
             if target_choice == -1: continue
 
-            # 执行
-            self.engine.execute_action(self.game_state, card_choice, user_choice, target_choice)
-            self.game_state.save()
-            
-            if self.game_state.game_over:
-                self.phase = GamePhase.GAME_OVER
-                return
-        
-        self.phase = GamePhase.TURN_END
+            return (card_choice, user_choice, target_choice)
 
-    # --- 新增 AI 回合完整逻辑 ---
-    def _phase_ai_turn(self):
+    def _ai_move(self, request):
         player = self.game_state.get_current_player()
-        opponent = self.game_state.get_opponent_player()
-        
-        self.tui.render_and_show_message(self.game_state, f"AI (玩家 {player.id}) 正在思考...", 1.5)
-
-        actions_taken = False
-        # 从后往前遍历手牌，这样在执行动作（pop牌）时不会影响后续遍历的索引
-        for card_idx, card in reversed(list(enumerate(player.hand))):
-            alive_ai_chars = player.get_alive_characters()
-            
-            if not alive_ai_chars:
-                break # AI没有存活角色，无法行动
-
-            # 简化：总是让第一个存活的角色使用卡牌
-            user_char = alive_ai_chars[0]
-            user_char_idx = 0
-            
-            target_char = None
-            target_idx = -1
-
-            if card.action_type == ActionType.ATTACK:
-                targets = opponent.get_alive_characters()
-                if targets:
-                    # 攻击血量最少的目标
-                    target_char = min(targets, key=lambda c: c.current_hp)
-                    target_idx = targets.index(target_char)
-
-            elif card.action_type == ActionType.HEAL:
-                targets = player.get_alive_characters()
-                # 寻找受伤最严重的角色
-                heal_candidates = [c for c in targets if c.current_hp < c.max_hp]
-                if heal_candidates:
-                    target_char = min(heal_candidates, key=lambda c: c.current_hp)
-                    target_idx = targets.index(target_char)
-            
-            elif card.action_type == ActionType.DEFEND:
-                targets = player.get_alive_characters()
-                if targets:
-                    # 防御血量最少的角色
-                    target_char = min(targets, key=lambda c: c.current_hp)
-                    target_idx = targets.index(target_char)
-
-            # 如果找到了合法的目标，则执行行动
-            if target_char and target_idx != -1:
-                actions_taken = True
-                msg = f"AI 使用 [{user_char.name}] 对 [{target_char.name}] 打出了 [{card.name}]"
-                self.tui.render_and_show_message(self.game_state, msg, 2)
-                
-                self.engine.execute_action(self.game_state, card_idx, user_char_idx, target_idx)
-                self.game_state.save()
-                
-                if self.game_state.game_over:
-                    self.phase = GamePhase.GAME_OVER
-                    return
-
-        if not actions_taken:
-            self.tui.render_and_show_message(self.game_state, "AI 选择不出牌，结束回合。", 2)
-        
-        self.phase = GamePhase.TURN_END
-    # --------------------------------
-
-    def _phase_turn_end(self):
-        self.engine.process_turn_end(self.game_state)
-        self.game_state.switch_turn()
-        self.engine.process_turn_start(self.game_state)
-        self.game_state.save()
-        
-        # --- 修改 AI 回合切换逻辑 ---
-        next_player = self.game_state.get_current_player()
-        if self.vs_ai and next_player.id == 2:
-            self.phase = GamePhase.AI_TURN
-        else:
-            self.phase = GamePhase.PLAYER_TURN
-        # ---------------------------
+        if request.turn != self.ai_turn:
+            self.ai_turn = request.turn
+            self.ai_acted = False
+            self.tui.render_and_show_message(self.game_state, f"AI (玩家 {player.id}) 正在思考...", 1.5)
+
+        # 琉璃的随机判定等可能让后续行动失效（角色倒下导致索引变化），此时控制器提前结束回合
+        move = self.ai_controller.next_move(request)
+        if move is None:
+            if not self.ai_acted:
+                self.tui.render_and_show_message(self.game_state, "AI 选择不出牌，结束回合。", 2)
+            return None
+
+        card_idx, user_char_idx, target_idx = move
+        card = player.hand[card_idx]
+        user_char = player.get_alive_characters()[user_char_idx]
+        target_char = self.engine.get_action_targets(self.game_state, card)[target_idx]
+
+        self.ai_acted = True
+        msg = f"AI 使用 [{user_char.name}] 对 [{target_char.name}] 打出了 [{card.name}]"
+        self.tui.render_and_show_message(self.game_state, msg, 2)
+        return move
 
     def _phase_game_over(self):
         winner_id = self.game_state.winner
@@ -0,0 +1,191 @@
+# LingCard/server/app.py
+"""
+多局并发的 HTTP 对局服务（Flask）。
+
+对局保存在进程内的 GameStore 中，每局一把锁；客户端持有哪些座位记录在服务端会话（Flask-Session 的文件后端，
+目录为 server_settings.session_dir）里，浏览器只保存随机生成的会话 id。
+多进程部署时需共用同一个会话目录。
+配置只在启动时读取一次，请求处理中不读写 YAML。
+
+  POST /games                     开局 {"lineup": [...], "opponent_lineup": [...], "mode": "ai"|"hotseat"|"online"}
+  GET  /games/<id>                本会话座位视角下的对局状态（?seat= 指定座位；?since=<version> 只返回该版本之后的补丁）
+  POST /games/<id>/join           online 模式下加入 2 号座位
+  POST /games/<id>/actions        出牌 {"card": 0, "user": 0, "target": 1}
+  POST /games/<id>/end_turn       结束回合
+  POST /games/<id>/ai_move        让 AI 完成它的回合
+  POST   /queue                   排队匹配 {"rating": 1500, "lineup": [...]}
+  GET    /queue                   匹配状态；配对成功时返回对局并获得座位
+  DELETE /queue                   取消匹配
+  GET    /stats                   对局缓存与匹配队列的统计
+
+用法: python -m LingCard.server.app --port 5000
+"""
+import argparse
+import os
+import uuid
+
+import yaml
+from flask import Flask, jsonify, request, session
+from flask_session.sessions import FileSystemSessionInterface
+
+from LingCard.server.matchmaking import Matchmaker
+from LingCard.server.sessions import GameError, GameStore
+
+MODES = ('ai', 'hotseat', 'online')
+MAX_SEAT_GAMES = 50 # 每个会话最多记录的对局数，超出时忘记最早的对局
+
+class SeatSessionInterface(FileSystemSessionInterface):
+    """
+    Flask-Session 的文件后端，但只在会话内容变化（获得座位）时写会话文件：
+    原实现每个请求都重写一次，读状态、出牌这类请求也要付出一次文件替换的开销。
+    """
+
+    def save_session(self, app, session, response):
+        if session.modified:
+            super().save_session(app, session, response)
+
+def create_app(config, store: GameStore = None) -> Flask:
+    app = Flask(__name__)
+    settings = config.get('server_settings', {})
+    app.config.update(SECRET_KEY=os.environ.get('LINGCARD_SECRET_KEY') or os.urandom(24).hex())
+    app.session_interface = SeatSessionInterface(
+        settings.get('session_dir', 'flask_session'), settings.get('max_sessions', 100000), 0o600, 'session:',
+        use_signer=False, permanent=True)
+    app.json.ensure_ascii = False
+    store = store or GameStore(config)
+    app.extensions['lingcard_store'] = store
+    matchmaker = Matchmaker.from_config(store, config)
+    app.extensions['lingcard_matchmaker'] = matchmaker
+    tick_interval = settings.get('matchmaking', {}).get('tick_interval', 1.0)
+    if tick_interval:
+        matchmaker.start(tick_interval)
+
+    # session['seats'] 为 {对局 id: [座位...]}，按获得座位的先后排列
+    def seats_of(game_id: str):
+        return session.get('seats', {}).get(game_id, [])
+
+    def grant(game_id: str, seats):
+        all_seats = {gid: held for gid, held in session.get('seats', {}).items() if gid != game_id}
+        all_seats[game_id] = sorted(set(seats_of(game_id)) | set(seats))
+        session['seats'] = dict(list(all_seats.items())[-MAX_SEAT_GAMES:])
+
+    def acting_seat(game):
+        """本会话在该局中可以行动的座位：持有当前行动座位时即为它"""
+        seats = seats_of(game.id)
+        if not seats:
+            raise GameError("你不在这局对局中", 403)
+        return game.current_seat if game.current_seat in seats else seats[0]
+
+    @app.errorhandler(GameError)
+    def game_error(error: GameError):
+        return jsonify({'error': error.message}), error.status
+
+    @app.post('/games')
+    def create_game():
+        data = request.get_json(silent=True) or {}
+        mode = data.get('mode', 'ai')
+        if mode not in MODES:
+            raise GameError(f"mode 只能是 {', '.join(MODES)}")
+        game = store.create([data.get('lineup'), data.get('opponent_lineup')],
+                            ai_seats=[2] if mode == 'ai' else [])
+        seats = [1, 2] if mode == 'hotseat' else [1]
+        game.claimed.update(seats)
+        grant(game.id, seats)
+        with game.lock:
+            return jsonify(store.view(game, acting_seat(game))), 201
+
+    @app.get('/games/<game_id>')
+    def get_game(game_id):
+        game = store.get(game_id)
+        seat = request.args.get('seat', type=int)
+        if seat is not None and seat not in seats_of(game_id):
+            raise GameError("你不持有该座位", 403)
+        since = request.args.get('since', type=int)
+        with game.lock:
+            seat = seat or acting_seat(game)
+            return jsonify(store.view(game, seat) if since is None else store.sync(game, seat, since))
+
+    @app.post('/games/<game_id>/join')
+    def join_game(game_id):
+        game = store.get(game_id)
+        with game.lock:
+            if 2 in game.ai_seats or 2 in game.claimed:
+                raise GameError("该对局没有空座位", 409)
+            game.claimed.add(2)
+            grant(game_id, [2])
+            return jsonify(store.view(game, 2))
+
+    @app.post('/games/<game_id>/actions')
+    def play_action(game_id):
+        game = store.get(game_id)
+        data = request.get_json(silent=True) or {}
+        try:
+            move = (data['card'], data['user'], data['target'])
+        except KeyError as error:
+            raise GameError(f"缺少字段 {error.args[0]}")
+        with game.lock:
+            seat = acting_seat(game)
+            store.play(game, seat, move)
+            return jsonify(store.view(game, seat))
+
+    @app.post('/games/<game_id>/end_turn')
+    def end_turn(game_id):
+        game = store.get(game_id)
+        with game.lock:
+            seat = acting_seat(game)
+            store.end_turn(game, seat)
+            return jsonify(store.view(game, seat))
+
+    @app.post('/games/<game_id>/ai_move')
+    def ai_move(game_id):
+        game = store.get(game_id)
+        with game.lock:
+            seat = acting_seat(game)
+            store.ai_move(game)
+            return jsonify(store.view(game, seat))
+
+    @app.get('/stats')
+    def stats():
+        return jsonify({'games': store.games.stats(), 'queued': len(matchmaker), 'matches': matchmaker.matches})
+
+    @app.post('/queue')
+    def join_queue():
+        data = request.get_json(silent=True) or {}
+        player = session.setdefault('player', uuid.uuid4().hex)
+        matchmaker.enqueue(player, data.get('rating', 1500), data.get('lineup')) # 非有限的 rating 返回 400
+        return jsonify({'status': 'queued', 'queued': len(matchmaker)}), 202
+
+    @app.get('/queue')
+    def queue_status():
+        ticket = matchmaker.poll(session.get('player', ''))
+        if ticket is None:
+            raise GameError("不在匹配队列中", 404)
+        if not ticket.matched:
+            return jsonify({'status': 'queued', 'rating': ticket.rating, 'queued': len(matchmaker)})
+        grant(ticket.game_id, [ticket.seat])
+        game = store.get(ticket.game_id)
+        with game.lock:
+            return jsonify(dict(store.view(game, ticket.seat), status='matched', waited=ticket.waited))
+
+    @app.delete('/queue')
+    def leave_queue():
+        matchmaker.cancel(session.get('player', ''))
+        return jsonify({'status': 'cancelled'})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多局并发的 HTTP 对局服务")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    # 开发服务器即可满足局域网使用；对外部署时请用 WSGI 服务器加载 create_app 并只开一个进程，对局保存在进程内存中
+    create_app(config).run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == "__main__":
+    main()
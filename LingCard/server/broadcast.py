@@ -0,0 +1,125 @@
+# LingCard/server/broadcast.py
+"""
+观战广播：一局对局可以有成百上千名观众。每次状态变化只生成一次观战视角（双方手牌都遮蔽），
+只序列化一次，同一份字节推送给所有观众。每名观众有一个有界缓冲，读得慢的观众丢弃较旧的帧，
+只保留最新的若干帧；推送从不等待观众，对局不会被拖慢。
+
+  channel = SpectatorChannel(buffer=4)
+  subscriber = channel.subscribe(wakeup=event.set)   # 新帧到达时调用 wakeup
+  channel.publish({'event': 'spectate', ...})        # 序列化一次，推给所有观众
+  frame = subscriber.pop()                           # 发送方取出下一帧（bytes），没有时为 None
+
+用法: python -m LingCard.server.broadcast --spectators 1 10 100 1000    比较每次更新的耗时
+"""
+import argparse
+import json
+import random
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import yaml
+
+
+class Subscriber:
+    """一名观众：最多保留 limit 帧，满了丢弃最旧的一帧"""
+
+    def __init__(self, limit: int, wakeup: Optional[Callable[[], None]] = None):
+        self.frames = deque(maxlen=limit)
+        self.wakeup = wakeup
+        self.dropped = 0
+        self.closed = False
+
+    def push(self, frame: bytes):
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+        self.frames.append(frame)
+        if self.wakeup:
+            self.wakeup()
+
+    def pop(self) -> Optional[bytes]:
+        return self.frames.popleft() if self.frames else None
+
+    def close(self):
+        """不再有新帧；缓冲中剩余的帧仍可取出"""
+        self.closed = True
+        if self.wakeup:
+            self.wakeup()
+
+
+class SpectatorChannel:
+    """一局对局的观众列表"""
+
+    def __init__(self, buffer: int = 4):
+        self.buffer = buffer
+        self.subscribers: List[Subscriber] = []
+        self.published = 0
+        self.last_frame: Optional[bytes] = None
+
+    def subscribe(self, wakeup: Optional[Callable[[], None]] = None) -> Subscriber:
+        """加入观战；已有画面时新观众立即收到最新一帧"""
+        subscriber = Subscriber(self.buffer, wakeup)
+        self.subscribers.append(subscriber)
+        if self.last_frame is not None:
+            subscriber.push(self.last_frame)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+        subscriber.close()
+
+    def publish(self, message: Dict) -> bytes:
+        """把一条消息序列化为一行 JSON，推给所有观众，返回这份字节"""
+        frame = json.dumps(message, ensure_ascii=False).encode('utf-8') + b"\n"
+        self.last_frame = frame
+        self.published += 1
+        for subscriber in self.subscribers:
+            subscriber.push(frame)
+        return frame
+
+    def close(self):
+        for subscriber in self.subscribers:
+            subscriber.close()
+        self.subscribers.clear()
+
+    @property
+    def dropped(self) -> int:
+        return sum(subscriber.dropped for subscriber in self.subscribers)
+
+
+def main():
+    from LingCard.server.sessions import GameStore
+
+    parser = argparse.ArgumentParser(description="观战广播：每次更新的耗时随观众数的变化")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--spectators', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--buffer', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    store = GameStore(config)
+    for count in args.spectators:
+        random.seed(args.seed)
+        session = store.create([None, None], ai_seats=[1, 2])
+        channel = SpectatorChannel(args.buffer)
+        subscribers = [channel.subscribe() for _ in range(count)]
+        updates, elapsed = 0, 0.0
+        while session.request is not None:
+            store.ai_move(session)
+            start = time.perf_counter()
+            channel.publish({'event': 'spectate', 'game': session.id, 'state': store.view(session, None)})
+            elapsed += time.perf_counter() - start
+            updates += 1
+            # 一半观众及时读取，另一半从不读取，只保留最新的几帧
+            for subscriber in subscribers[::2]:
+                while subscriber.pop() is not None:
+                    pass
+        print(f"{count:5d} 名观众: {updates} 次更新，每次 {elapsed / updates * 1e6:.0f} 微秒，"
+              f"丢弃 {channel.dropped} 帧，慢观众缓冲 {len(subscribers[-1].frames)} 帧")
+        store.remove(session.id)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# LingCard/server/cache.py
+"""
+常驻内存的对局缓存：按对局数和字节数限容，超出时把闲置的对局写入快照存储（SnapshotStore）并移出内存，
+再次访问时透明地重新载入。每局对局要么在内存中，要么在快照目录中。
+
+淘汰策略为 lru（最久未访问）或 lfu（访问次数最少）；一次淘汰到上限的 low_water 比例，避免每次入表都淘汰。
+读写快照文件不持有缓存锁：正在载入或写出的对局只阻塞对同一局的访问，其他对局照常命中。
+被钉住（pinned，如 TCP 服务中由 actor 持有）的对局、正在处理请求（锁被占用）的对局和 min_idle 秒内访问过的对局
+不会被淘汰，此时缓存可以暂时超出上限。字节数按入表时快照的大小估计，只在设置了 max_bytes 时计算。
+
+用法: python -m LingCard.server.cache --games 2000 --max-games 200 --policy lfu      模拟热点访问，统计命中率
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import yaml
+
+from LingCard.server.snapshots import SnapshotStore
+
+POLICIES = ('lru', 'lfu')
+
+
+class GameCache:
+    def __init__(self, snapshots: Optional[SnapshotStore], spill: Callable[[object], Dict],
+                 reload: Callable[[Dict], object], max_games: Optional[int] = None,
+                 max_bytes: Optional[int] = None, policy: str = 'lru', min_idle: float = 5.0,
+                 low_water: float = 0.9):
+        if policy not in POLICIES:
+            raise ValueError(f"淘汰策略只能是 {', '.join(POLICIES)}")
+        self.snapshots = snapshots # 为 None 时不限容
+        self.spill = spill # 对局 -> 快照
+        self.reload = reload # 快照 -> 对局
+        self.max_games = max_games
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.min_idle = min_idle
+        self.low_water = low_water
+        self.entries: 'OrderedDict[str, object]' = OrderedDict() # 按最近访问排序，最久未访问的在前
+        self.sizes: Dict[str, int] = {}
+        self.uses: Dict[str, int] = {}
+        self.bytes = 0
+        self.on_disk = sum(1 for _ in snapshots) if snapshots is not None else 0 # 含上次运行时留下的快照
+        self.hits = self.reloads = self.evictions = 0
+        self.spilled_bytes = 0
+        self.inflight: Dict[str, threading.Event] = {} # 正在载入、写出或删除快照的对局
+        self.lock = threading.Lock() # 只保护上面的表；快照文件的读写都在锁外进行
+
+    def __len__(self) -> int:
+        return len(self.entries) + self.on_disk
+
+    def get(self, game_id: str):
+        """返回对局并记一次访问；不在内存时从快照载入，都没有时为 None"""
+        while True:
+            with self.lock:
+                session = self.entries.get(game_id)
+                if session is not None:
+                    self.hits += 1
+                    self.entries.move_to_end(game_id)
+                    self.uses[game_id] += 1
+                    session.touch()
+                    return session
+                if self.snapshots is None:
+                    return None
+                event = self.inflight.get(game_id)
+                if event is None:
+                    event = self.inflight[game_id] = threading.Event()
+                    break
+            event.wait() # 这局对局正在载入或写出，等它完成后重新查找
+
+        # 读文件、重建对局都不持有缓存锁，其他对局的访问不受影响
+        session = None
+        try:
+            data = self.snapshots.load(game_id)
+            if data is not None:
+                session = self.reload(data)
+                self.snapshots.delete(game_id)
+        finally:
+            with self.lock:
+                del self.inflight[game_id]
+                if session is not None:
+                    self.on_disk -= 1
+                    self.reloads += 1
+                    self._admit(session)
+                    session.touch()
+            event.set()
+        if session is not None:
+            self._shrink()
+        return session
+
+    def add(self, session):
+        self.add_many([session])
+
+    def add_many(self, sessions):
+        with self.lock:
+            for session in sessions:
+                self._admit(session)
+        self._shrink()
+
+    def remove(self, game_id: str):
+        """移除对局，内存和快照目录中的都删除"""
+        while True:
+            with self.lock:
+                event = self.inflight.get(game_id)
+                if event is None:
+                    if game_id in self.entries:
+                        self._drop(game_id)
+                        return
+                    if self.snapshots is None:
+                        return
+                    event = self.inflight[game_id] = threading.Event()
+                    break
+            event.wait()
+        existed = False
+        try:
+            existed = game_id in self.snapshots
+            self.snapshots.delete(game_id)
+        finally:
+            with self.lock:
+                del self.inflight[game_id]
+                if existed:
+                    self.on_disk -= 1
+            event.set()
+
+    def _admit(self, session):
+        size = len(json.dumps(self.spill(session), ensure_ascii=False).encode('utf-8')) if self.max_bytes else 0
+        self.entries[session.id] = session
+        self.sizes[session.id] = size
+        self.uses[session.id] = 1
+        self.bytes += size
+
+    def _drop(self, game_id: str):
+        del self.entries[game_id], self.uses[game_id]
+        self.bytes -= self.sizes.pop(game_id)
+
+    def _over(self, scale: float = 1.0) -> bool:
+        return ((self.max_games is not None and len(self.entries) > self.max_games * scale)
+                or (self.max_bytes is not None and self.bytes > self.max_bytes * scale))
+
+    def _shrink(self):
+        """超出上限时在锁内挑出要淘汰的对局并移出对局表，再在锁外逐个写快照"""
+        with self.lock:
+            if self.snapshots is None or not self._over():
+                return
+            candidates = list(self.entries)
+            if self.policy == 'lfu':
+                candidates.sort(key=self.uses.__getitem__) # 稳定排序：次数相同时先淘汰最久未访问的
+            now = time.time()
+            victims = []
+            for game_id in candidates:
+                if not self._over(self.low_water):
+                    break
+                session = self.entries[game_id]
+                if getattr(session, 'pinned', False) or now - session.last_access < self.min_idle:
+                    continue
+                if not session.lock.acquire(blocking=False):
+                    continue
+                self._drop(game_id)
+                self.inflight[game_id] = threading.Event()
+                victims.append(session)
+
+        error = None
+        for session in victims:
+            written = None
+            try:
+                written = self.snapshots.save(session.id, self.spill(session))
+            except Exception as exc: # 写不出去的对局留在内存中
+                error = exc
+            finally:
+                session.lock.release()
+                with self.lock:
+                    event = self.inflight.pop(session.id)
+                    if written is None:
+                        self._admit(session)
+                    else:
+                        self.spilled_bytes += written
+                        self.on_disk += 1
+                        self.evictions += 1
+                event.set()
+        if error is not None:
+            raise error
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.reloads
+        return {
+            'resident': len(self.entries),
+            'resident_bytes': self.bytes,
+            'on_disk': self.on_disk,
+            'hits': self.hits,
+            'reloads': self.reloads,
+            'hit_rate': self.hits / lookups if lookups else None,
+            'evictions': self.evictions,
+            'spilled_bytes': self.spilled_bytes,
+            'policy': self.policy,
+        }
+
+
+def main():
+    from LingCard.server.sessions import GameStore
+
+    parser = argparse.ArgumentParser(description="模拟热点对局访问，比较淘汰策略的命中率与延迟")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--games', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--max-games', type=int, default=200)
+    parser.add_argument('--max-bytes', type=int, default=None)
+    parser.add_argument('--policy', choices=POLICIES, nargs='+', default=list(POLICIES))
+    parser.add_argument('--zipf', type=float, default=1.1, help="访问分布的 Zipf 指数，越大越集中在少数热点对局")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(args.games)]
+    for policy in args.policy:
+        random.seed(args.seed)
+        directory = tempfile.mkdtemp(prefix='lingcard_snapshots_')
+        config['server_settings']['game_cache'] = {
+            'snapshot_dir': directory, 'max_games': args.max_games, 'max_bytes': args.max_bytes,
+            'policy': policy, 'min_idle': 0}
+        store = GameStore(config)
+        game_ids = [session.id for session in store.create_many([([None, None], [1, 2], None)] * args.games)]
+        random.shuffle(game_ids)
+        hit_time = miss_time = 0.0
+        before = store.games.reloads
+        for game_id in random.choices(game_ids, weights, k=args.requests):
+            reloads = store.games.reloads
+            start = time.perf_counter()
+            session = store.get(game_id)
+            with session.lock:
+                if session.request is not None:
+                    store.ai_move(session)
+            elapsed = time.perf_counter() - start
+            if store.games.reloads > reloads:
+                miss_time += elapsed
+            else:
+                hit_time += elapsed
+        stats = store.games.stats()
+        misses = stats['reloads'] - before
+        print(f"{policy}: 命中率 {stats['hit_rate']:.1%}，淘汰 {stats['evictions']} 次，常驻 {stats['resident']} 局，"
+              f"磁盘 {stats['on_disk']} 局（{len(os.listdir(directory))} 个文件），"
+              f"命中请求平均 {hit_time / max(1, args.requests - misses) * 1000:.2f} 毫秒，"
+              f"载入请求平均 {miss_time / max(1, misses) * 1000:.2f} 毫秒")
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    main()
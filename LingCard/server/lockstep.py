@@ -0,0 +1,283 @@
+# LingCard/server/lockstep.py
+"""
+确定性锁步联机：双方各自在本地完整模拟对局，网络上只传行动与定期的状态校验和，不传状态快照。
+
+开局时主机把随机种子和双方阵容发给对方，双方用同一种子创建本局专用的随机数发生器（GameState.rng），
+洗牌、先手与琉璃判定都取自它；AI 在状态副本上推演，不会推进这条随机序列，因此双方状态逐步一致。
+每 checksum_every 个回合及对局结束时，双方交换状态校验和，不一致即报告失步（DesyncError）。
+
+消息格式（开局握手之后）:
+  b'M' + 3 字节 (card, user, target)      出牌，4 字节
+  b'E'                                   结束回合，1 字节
+  b'C' + 4 字节回合号 + 8 字节校验和        状态校验，13 字节；回合号 0xFFFFFFFF 表示对局结束
+
+用法: python -m LingCard.server.lockstep demo --seed 42                 本机两个进程经 socketpair 对战
+      python -m LingCard.server.lockstep demo --desync-at 6             故意在第 6 回合改动一方状态，演示失步检测
+      python -m LingCard.server.lockstep host --port 7100 --lineup Jun Liuli
+      python -m LingCard.server.lockstep join --connect 192.168.1.10:7100   （阵容与种子由主机决定）
+"""
+import argparse
+import hashlib
+import json
+import random
+import socket
+import struct
+from multiprocessing import Process
+from typing import Dict, List, Optional
+
+import yaml
+
+from LingCard.core.flow import StrategyController, game_flow
+from LingCard.core.game_engine import GameEngine
+from LingCard.core.game_state import GameState
+from LingCard.strategies.greedy import GreedyAI
+from LingCard.utils.digest import config_digest
+from LingCard.utils.loader import load_cards, load_characters, load_strategies
+
+FINAL_TURN = 0xFFFFFFFF
+_CHECKSUM = struct.Struct('>IQ')
+
+
+class DesyncError(Exception):
+    """双方状态失步：同一回合的校验和不同，或对方的行动在本地不合法"""
+
+    def __init__(self, message: str, turn: int):
+        super().__init__(message)
+        self.turn = turn
+
+
+def state_checksum(game_state: GameState) -> int:
+    """对影响后续进程的全部状态求 64 位摘要：角色、手牌、牌库顺序、弃牌堆、回合信息与随机数发生器"""
+    parts = [game_state.current_round, game_state.current_player_idx, game_state.turn_order,
+             game_state.game_over, game_state.winner]
+    for player in game_state.players:
+        parts.append([(c.__class__.__name__, c.current_hp, c.max_hp, c.defense_buff, c.is_alive, sorted(c.status.items()))
+                      for c in player.characters])
+        parts.append([card.__class__.__name__ for card in player.hand])
+        parts.append([card.__class__.__name__ for card in player.deck])
+        parts.append([card.__class__.__name__ for card in player.discard_pile])
+        parts.append(sorted(player.status.items()))
+    if game_state.rng is not None:
+        parts.append(game_state.rng.getstate())
+    digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class _Stream:
+    """在套接字上按字节数读写，统计收发字节"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.sent = 0
+        self.received = 0
+
+    def send(self, data: bytes):
+        self.sock.sendall(data)
+        self.sent += len(data)
+
+    def recv(self, size: int) -> bytes:
+        chunks = []
+        while size:
+            chunk = self.sock.recv(size)
+            if not chunk:
+                raise ConnectionError("对方断开了连接")
+            chunks.append(chunk)
+            size -= len(chunk)
+        data = b"".join(chunks)
+        self.received += len(data)
+        return data
+
+    def send_line(self, message: Dict):
+        self.send(json.dumps(message, ensure_ascii=False).encode('utf-8') + b"\n")
+
+    def recv_line(self) -> Dict:
+        data = bytearray()
+        while not data.endswith(b"\n"):
+            data += self.recv(1)
+        return json.loads(data.decode('utf-8'))
+
+
+class LockstepPeer:
+    """锁步对局的一方。seat 为本方玩家 id，controller 提供本方行动（next_move(request)）"""
+
+    def __init__(self, config, sock: socket.socket, seat: int, controller, checksum_every: int = 4,
+                 max_rounds: Optional[int] = 100):
+        self.config = config
+        self.engine = GameEngine(config)
+        self.stream = _Stream(sock)
+        self.seat = seat
+        self.controller = controller
+        self.checksum_every = checksum_every
+        self.max_rounds = max_rounds
+        self.game_state: Optional[GameState] = None
+        self.local_sums: Dict[int, int] = {}
+        self.remote_sums: Dict[int, int] = {}
+        self.final_received = False
+        self.actions = 0
+
+    # ---- 开局握手 ----
+
+    def host(self, seed: int, lineups: List[List[str]]):
+        """主机决定种子与双方阵容"""
+        self.stream.send_line({'config': config_digest(self.config, 'game_settings', 'team_effects'),
+                               'seed': seed, 'lineups': lineups})
+        reply = self.stream.recv_line()
+        if not reply.get('ok'):
+            raise ConnectionError(f"对方拒绝开局: {reply.get('error')}")
+        self._setup(seed, lineups)
+
+    def join(self):
+        setup = self.stream.recv_line()
+        if setup['config'] != config_digest(self.config, 'game_settings', 'team_effects'):
+            self.stream.send_line({'ok': False, 'error': "对局设置不一致"})
+            raise ConnectionError("与主机的对局设置（config.yaml）不一致")
+        self.stream.send_line({'ok': True})
+        self._setup(setup['seed'], setup['lineups'])
+
+    def _setup(self, seed: int, lineups: List[List[str]]):
+        self.game_state = GameState(state_file=None)
+        self.game_state.rng = random.Random(seed)
+        self.engine.setup_game(self.game_state, lineups, load_characters(), load_cards())
+
+    # ---- 对局 ----
+
+    def run(self) -> Optional[int]:
+        """打完整局并完成最后一次校验，返回胜者 id（超过轮数上限为 None）"""
+        flow = game_flow(self.engine, self.game_state, self.max_rounds)
+        try:
+            request = next(flow)
+            while True:
+                if request.player_id == self.seat:
+                    move = self.controller.next_move(request)
+                    self.stream.send(b'E' if move is None else b'M' + bytes(move))
+                else:
+                    move = self._receive_action()
+                self.actions += 1
+                request = flow.send(move)
+                if request.error and request.player_id != self.seat:
+                    raise DesyncError(f"第 {request.turn} 回合对方的行动 {list(move)} 在本地不合法", request.turn)
+                if move is None and request.turn % self.checksum_every == 0:
+                    self._checkpoint(request.turn)
+        except StopIteration as stop:
+            winner = stop.value
+        self._checkpoint(FINAL_TURN)
+        while not self.final_received:
+            self._receive_action(expect_checksum=True)
+        return winner
+
+    def _checkpoint(self, turn: int):
+        checksum = state_checksum(self.game_state)
+        self.local_sums[turn] = checksum
+        self.stream.send(b'C' + _CHECKSUM.pack(turn, checksum))
+        self._compare(turn)
+
+    def _compare(self, turn: int):
+        if turn in self.local_sums and turn in self.remote_sums:
+            local, remote = self.local_sums.pop(turn), self.remote_sums.pop(turn)
+            if local != remote:
+                where = "对局结束时" if turn == FINAL_TURN else f"第 {turn} 回合"
+                raise DesyncError(f"{where}状态失步：本地 {local:016x}，对方 {remote:016x}", turn)
+
+    def _receive_action(self, expect_checksum: bool = False):
+        """读取对方的下一个行动；途中收到的校验和随即比对"""
+        while True:
+            kind = self.stream.recv(1)
+            if kind == b'C':
+                turn, checksum = _CHECKSUM.unpack(self.stream.recv(_CHECKSUM.size))
+                self.remote_sums[turn] = checksum
+                self.final_received = turn == FINAL_TURN
+                self._compare(turn)
+                if expect_checksum:
+                    return None
+            elif kind == b'M':
+                return tuple(self.stream.recv(3))
+            elif kind == b'E':
+                return None
+            else:
+                raise ConnectionError(f"无法识别的消息类型: {kind!r}")
+
+
+class _TamperingController:
+    """演示失步检测：在指定回合（或其后本方的第一个回合）悄悄改动本地状态"""
+
+    def __init__(self, inner, turn: int):
+        self.inner = inner
+        self.turn = turn
+
+    def next_move(self, request):
+        if self.turn is not None and request.turn >= self.turn:
+            request.game_state.players[0].characters[0].defense_buff += 1
+            self.turn = None
+        return self.inner.next_move(request)
+
+
+def _play(config, sock, seat, strategy_name, seed, lineups, checksum_every, desync_at=None, results=None):
+    """打一局并打印结果；给出 results（multiprocessing.Queue）时另把 (seat, 结果) 放入其中：
+    ('ok', 胜者, 最终校验和) 或 ('desync', 回合号)"""
+    strategy = load_strategies()[strategy_name]
+    peer = LockstepPeer(config, sock, seat, None, checksum_every)
+    peer.controller = StrategyController(strategy(peer.engine))
+    if desync_at is not None:
+        peer.controller = _TamperingController(peer.controller, desync_at)
+    if seat == 1:
+        peer.host(seed, lineups)
+    else:
+        peer.join()
+    try:
+        winner = peer.run()
+        print(f"玩家{seat}: 对局结束，胜者 {winner}，{peer.actions} 个行动，"
+              f"发送 {peer.stream.sent} 字节，接收 {peer.stream.received} 字节，校验全部一致")
+        outcome = ('ok', winner, state_checksum(peer.game_state))
+    except DesyncError as error:
+        print(f"玩家{seat}: {error}")
+        outcome = ('desync', error.turn)
+    finally:
+        sock.close()
+    if results is not None:
+        results.put((seat, outcome))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="确定性锁步联机对局")
+    parser.add_argument('mode', choices=['demo', 'host', 'join'])
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--lineup', nargs='+', default=None, help="host/demo：玩家1的阵容，默认随机")
+    parser.add_argument('--opponent-lineup', nargs='+', default=None, help="host/demo：玩家2的阵容，默认随机")
+    parser.add_argument('--strategy', default=GreedyAI.name, help="本方 AI 策略")
+    parser.add_argument('--checksum-every', type=int, default=4, help="每隔多少回合交换一次校验和")
+    parser.add_argument('--desync-at', type=int, default=None, help="demo：在该回合人为制造失步")
+    parser.add_argument('--port', type=int, default=7100)
+    parser.add_argument('--connect', default='127.0.0.1:7100')
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    seed = args.seed if args.seed is not None else random.getrandbits(32)
+    per_player = config['game_settings']['characters_per_player']
+    names = sorted(load_characters())
+    picker = random.Random(seed)
+    lineups = [args.lineup or picker.sample(names, per_player), args.opponent_lineup or picker.sample(names, per_player)]
+
+    if args.mode == 'demo':
+        left, right = socket.socketpair()
+        peers = [Process(target=_play, args=(config, left, 1, args.strategy, seed, lineups, args.checksum_every)),
+                 Process(target=_play, args=(config, right, 2, args.strategy, seed, lineups, args.checksum_every,
+                                             args.desync_at))]
+        for process in peers:
+            process.start()
+        left.close()
+        right.close()
+        for process in peers:
+            process.join()
+    elif args.mode == 'host':
+        with socket.create_server(('', args.port)) as server:
+            print(f"等待对方连接端口 {args.port}，种子 {seed}")
+            sock, address = server.accept()
+        _play(config, sock, 1, args.strategy, seed, lineups, args.checksum_every)
+    else:
+        host, _, port = args.connect.rpartition(':')
+        _play(config, socket.create_connection((host, int(port))), 2, args.strategy, seed, lineups, args.checksum_every)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# LingCard/server/sessions.py
+"""
+托管对局：在一个进程内保存任意多局对局，供 HTTP 等服务端入口共用。
+
+配置、引擎和角色/卡牌类只在启动时加载一次。对局表是一个 GameCache：配置 server_settings.game_cache 后，
+常驻内存的对局数/字节数有上限，闲置对局写入快照目录，再次访问时自动载入；未配置时所有对局常驻内存。
+对局表的锁只保护表本身，每局对局另有自己的锁，不同对局的请求互不阻塞。座位即玩家 id（1 或 2），可由人或 AI 控制。
+对局按 core.flow.game_flow 推进：人类的出牌/结束回合与 AI 的行动都经由同一个流程生成器送入。
+"""
+import random
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from LingCard.core.flow import AwaitMove, StrategyController, game_flow
+from LingCard.core.game_engine import GameEngine
+from LingCard.core.game_state import GameState
+from LingCard.server.cache import GameCache
+from LingCard.server.snapshots import SnapshotStore
+from LingCard.utils.loader import load_cards, load_characters, load_strategies
+
+class GameError(Exception):
+    """对局请求无法执行；status 为对应的 HTTP 状态码"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class GameSession:
+    """一局托管对局"""
+
+    def __init__(self, game_id: str, game_state: GameState, ai_seats: Dict[int, StrategyController], flow):
+        self.id = game_id
+        self.game_state = game_state
+        self.ai_seats = ai_seats # {座位: AI 行动来源}
+        self.flow = flow
+        try:
+            self.request: Optional[AwaitMove] = next(flow) # 流程当前的挂起点，对局结束后为 None
+        except StopIteration:
+            self.request = None
+        self.claimed = set() # 已有客户端入座的人类座位
+        self.pinned = False # 为 True 时不会被移出内存（对局对象被长期持有，如 TCP 服务的 actor）
+        self.lock = threading.RLock()
+        self.created = self.last_access = time.time()
+
+    def touch(self):
+        self.last_access = time.time()
+
+    @property
+    def current_seat(self) -> int:
+        return self.game_state.get_current_player().id
+
+
+class GameStore:
+    """进程内的对局表"""
+
+    def __init__(self, config, ai_strategy: Optional[str] = None):
+        self.config = config
+        self.engine = GameEngine(config)
+        self.char_classes = load_characters()
+        self.card_classes = load_cards()
+        settings = config.get('server_settings', {})
+        self.strategy_class = load_strategies()[ai_strategy or settings.get('ai_strategy', 'greedy')]
+        cache = settings.get('game_cache') or {}
+        self.games = GameCache(SnapshotStore(cache['snapshot_dir']) if cache.get('snapshot_dir') else None,
+                               self.snapshot, self.restore, max_games=cache.get('max_games'),
+                               max_bytes=cache.get('max_bytes'), policy=cache.get('policy', 'lru'),
+                               min_idle=cache.get('min_idle', 5.0))
+
+    # ---- 对局表 ----
+
+    def create(self, lineups: Sequence[Sequence[str]], ai_seats: Iterable[int] = (),
+               turn_order: Optional[List[int]] = None) -> GameSession:
+        """
+        开一局新对局。lineups[i] 为玩家 i+1 的角色类名列表，为空时随机选取；
+        ai_seats 中的座位由服务器 AI 控制。先手默认随机。
+        """
+        return self.create_many([(lineups, ai_seats, turn_order)])[0]
+
+    def create_many(self, specs: Iterable[tuple]) -> List[GameSession]:
+        """批量开局：specs 为 (lineups, ai_seats, turn_order) 列表。全部开局（含初始化牌库）后一次性加入对局表"""
+        sessions = [self._new_session(*spec) for spec in specs]
+        self.games.add_many(sessions)
+        return sessions
+
+    def validate_lineup(self, lineup: Sequence[str]) -> List[str]:
+        per_player = self.config['game_settings']['characters_per_player']
+        lineup = list(lineup)
+        unknown = [name for name in lineup if name not in self.char_classes]
+        if unknown:
+            raise GameError(f"未知的角色: {', '.join(unknown)}")
+        if len(lineup) != per_player or len(set(lineup)) != per_player:
+            raise GameError(f"每方需要选择 {per_player} 个不同的角色")
+        return lineup
+
+    def _new_session(self, lineups: Sequence[Sequence[str]], ai_seats: Iterable[int] = (),
+                     turn_order: Optional[List[int]] = None) -> GameSession:
+        per_player = self.config['game_settings']['characters_per_player']
+        lineups = [self.validate_lineup(lineup) if lineup else random.sample(sorted(self.char_classes), per_player)
+                   for lineup in (list(lineups) + [None, None])[:2]]
+        game_state = GameState(state_file=None)
+        self.engine.setup_game(game_state, lineups, self.char_classes, self.card_classes, turn_order)
+        controllers = {seat: StrategyController(self.strategy_class(self.engine)) for seat in ai_seats}
+        return GameSession(uuid.uuid4().hex, game_state, controllers, game_flow(self.engine, game_state))
+
+    def get(self, game_id: str) -> GameSession:
+        session = self.games.get(game_id)
+        if session is None:
+            raise GameError(f"对局 {game_id} 不存在", 404)
+        return session
+
+    def remove(self, game_id: str):
+        self.games.remove(game_id)
+
+    def __len__(self) -> int:
+        return len(self.games)
+
+    # ---- 快照 ----
+
+    def snapshot(self, session: GameSession) -> Dict:
+        """对局的可序列化快照；AI 的规划与流程的挂起点不保存，载入后从当前回合继续"""
+        gs = session.game_state
+        gs.commit() # 上次 view() 之后的改动先记为新版本，载入后客户端才会拿到这些改动
+        data = {'id': session.id, 'game_state': gs.to_dict(), 'ai_seats': sorted(session.ai_seats),
+                'claimed': sorted(session.claimed), 'created': session.created}
+        if gs.rng is not None:
+            data['rng'] = gs.rng.getstate()
+        return data
+
+    def restore(self, data: Dict) -> GameSession:
+        game_state = GameState(state_file=None)
+        game_state.load_dict(data['game_state'], self.char_classes, self.card_classes)
+        if 'rng' in data:
+            version, internal, gauss = data['rng']
+            game_state.rng = random.Random()
+            game_state.rng.setstate((version, tuple(internal), gauss))
+        controllers = {seat: StrategyController(self.strategy_class(self.engine)) for seat in data['ai_seats']}
+        session = GameSession(data['id'], game_state, controllers, game_flow(self.engine, game_state))
+        session.claimed.update(data['claimed'])
+        session.created = data['created']
+        return session
+
+    # ---- 对局操作（调用方需持有 session.lock） ----
+
+    def _check_turn(self, session: GameSession, seat: int):
+        if session.request is None:
+            raise GameError("对局已结束", 409)
+        if session.request.player_id != seat:
+            raise GameError(f"现在是玩家 {session.request.player_id} 的回合", 409)
+
+    def _advance(self, session: GameSession, move) -> None:
+        try:
+            session.request = session.flow.send(move)
+        except StopIteration:
+            session.request = None
+
+    def play(self, session: GameSession, seat: int, move) -> None:
+        """座位 seat 打出一张牌，move 为 (手牌索引, 使用角色索引, 目标索引)"""
+        self._check_turn(session, seat)
+        try:
+            move = tuple(int(x) for x in move)
+        except (TypeError, ValueError):
+            raise GameError(f"不合法的行动: {move}")
+        if len(move) != 3:
+            raise GameError(f"不合法的行动: {list(move)}")
+        self._advance(session, move)
+        if session.request is not None and session.request.error:
+            raise GameError(session.request.error)
+
+    def end_turn(self, session: GameSession, seat: int) -> None:
+        self._check_turn(session, seat)
+        self._advance(session, None)
+
+    def ai_move(self, session: GameSession) -> None:
+        """由 AI 打完当前座位的整个回合并结束回合"""
+        if session.request is None:
+            raise GameError("对局已结束", 409)
+        seat = session.request.player_id
+        controller = session.ai_seats.get(seat)
+        if controller is None:
+            raise GameError(f"玩家 {seat} 不由 AI 控制", 409)
+        while session.request is not None and session.request.player_id == seat:
+            self._advance(session, controller.next_move(session.request))
+
+    # ---- 视图 ----
+
+    def view(self, session: GameSession, viewer: Optional[int]) -> Dict:
+        """viewer 视角下的对局：只有 viewer 自己的手牌可见，轮到 viewer 时附带合法行动"""
+        state = session.game_state.view(viewer)
+        for player in state['players']:
+            player['ai'] = player['id'] in session.ai_seats
+        state.update(id=session.id, viewer=viewer, legal_moves=self._legal_moves(session, viewer))
+        return state
+
+    def sync(self, session: GameSession, viewer: Optional[int], since: int) -> Dict:
+        """客户端持有 since 版本的视图时，返回把它更新到当前版本的补丁（太旧时为完整视图），见 GameState.diff"""
+        patch = session.game_state.diff(since, viewer)
+        if patch.get('full'):
+            patch['state'] = self.view(session, viewer)
+        else:
+            patch['legal_moves'] = self._legal_moves(session, viewer)
+        return patch
+
+    def _legal_moves(self, session: GameSession, viewer: Optional[int]) -> List[List[int]]:
+        gs = session.game_state
+        if gs.game_over or viewer != session.current_seat:
+            return []
+        return [list(m) for m in self.engine.get_legal_moves(gs)]
@@ -0,0 +1,51 @@
+# LingCard/server/snapshots.py
+"""
+对局快照存储：每局一个 JSON 文件，文件名为对局 id。写入先写临时文件再替换，进程中途退出也不会留下半个快照。
+"""
+import json
+import os
+from typing import Dict, Iterator, Optional
+
+
+class SnapshotStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, game_id: str) -> str:
+        if not game_id.isalnum():
+            raise ValueError(f"不合法的对局 id: {game_id!r}")
+        return os.path.join(self.directory, f"{game_id}.json")
+
+    def save(self, game_id: str, data: Dict) -> int:
+        """保存快照，返回写入的字节数"""
+        encoded = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        path = self._path(game_id)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(encoded)
+        os.replace(path + '.tmp', path)
+        return len(encoded)
+
+    def load(self, game_id: str) -> Optional[Dict]:
+        try:
+            with open(self._path(game_id), 'rb') as f:
+                return json.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def delete(self, game_id: str):
+        try:
+            os.remove(self._path(game_id))
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def __contains__(self, game_id: str) -> bool:
+        try:
+            return os.path.exists(self._path(game_id))
+        except ValueError:
+            return False
+
+    def __iter__(self) -> Iterator[str]:
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                yield name[:-len('.json')]
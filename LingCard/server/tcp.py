@@ -0,0 +1,337 @@
+# LingCard/server/tcp.py
+"""
+asyncio TCP 对局服务，协议为换行分隔的 JSON（NDJSON），适合低延迟客户端与机器人。
+
+所有连接共用一个事件循环，不为连接开线程。每局对局是一个 actor 任务，只有它修改该局状态；
+连接把请求放进对局的有界收件队列，队列满时连接暂停读取，背压经 TCP 传回客户端。
+每个连接另有有界的发件队列，客户端读得太慢导致队列溢出时直接断开，不拖慢对局。
+AI 回合在线程池中计算，事件循环不会被阻塞。
+观众经 server.broadcast.SpectatorChannel 接收观战画面：每次更新只序列化一次，读得慢的观众丢弃旧帧。
+
+请求（可带 "id"，回复原样带回）:
+  {"op": "create", "mode": "ai"|"hotseat"|"online", "lineup": [...], "opponent_lineup": [...]}
+  {"op": "join", "game": "<id>"}                       online 模式下加入 2 号座位
+  {"op": "state", "game": "<id>", "since": <version>}  带 since 时回复 {"patch": {...}}，只含该版本之后的变化
+  {"op": "play", "game": "<id>", "move": [card, user, target]}
+  {"op": "end_turn", "game": "<id>"}
+  {"op": "watch", "game": "<id>"}                       观战，之后推送 {"event": "spectate", ...}
+  {"op": "leave", "game": "<id>"}                       离开座位或停止观战
+回复 {"id": ..., "ok": true, "state": {...}} 或 {"id": ..., "ok": false, "error": "..."}；
+对局状态被他人（对手或 AI）改变时推送 {"event": "state", "game": "<id>", "state": {...}}。
+
+用法: python -m LingCard.server.tcp --port 7000
+"""
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Set
+
+import yaml
+
+from LingCard.server.broadcast import SpectatorChannel, Subscriber
+from LingCard.server.sessions import GameError, GameSession, GameStore
+
+MODES = ('ai', 'hotseat', 'online')
+
+
+class Connection:
+    """一个客户端连接及其有界发件队列"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, outbox: int):
+        self.reader = reader
+        self.writer = writer
+        self.outbox: asyncio.Queue = asyncio.Queue(outbox)
+        self.actors: Dict[str, 'GameActor'] = {}
+        self.watching: Dict[str, Subscriber] = {}
+        self.closed = False
+        self.tasks: Set[asyncio.Task] = set() # 事件循环只弱引用任务，由这里持有直到任务结束
+
+    def spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def send(self, message: Dict):
+        """不等待的发送；发件队列满说明客户端跟不上，断开它"""
+        if self.closed:
+            return
+        try:
+            self.outbox.put_nowait(json.dumps(message, ensure_ascii=False).encode('utf-8') + b"\n")
+        except asyncio.QueueFull:
+            self.close()
+
+    async def write_loop(self):
+        try:
+            while True:
+                data = await self.outbox.get()
+                if data is None:
+                    break
+                self.writer.write(data)
+                await self.writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.close()
+
+    async def spectate_loop(self, subscriber: Subscriber):
+        """把观战帧写给客户端；写得慢时帧留在 subscriber 的有界缓冲里，旧帧被丢弃"""
+        wake = asyncio.Event()
+        subscriber.wakeup = wake.set
+        try:
+            while not self.closed:
+                frame = subscriber.pop()
+                if frame is None:
+                    if subscriber.closed:
+                        break
+                    wake.clear()
+                    await wake.wait()
+                    continue
+                self.writer.write(frame)
+                await self.writer.drain()
+        except ConnectionError:
+            self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+
+
+class GameActor:
+    """一局对局的 actor：串行处理收件队列中的请求，并把状态变化推送给其他座位"""
+
+    def __init__(self, server: 'GameServer', session: GameSession, inbox: int, spectator_buffer: int):
+        self.server = server
+        self.session = session
+        self.queue: asyncio.Queue = asyncio.Queue(inbox)
+        self.seats: Dict[Connection, Set[int]] = {}
+        self.spectators = SpectatorChannel(spectator_buffer)
+        self.watchers: Set[Connection] = set()
+
+    def leave(self, conn: Connection):
+        """连接断开：立即让出座位；没人在座时唤醒 actor 以便它退出"""
+        self.seats.pop(conn, None)
+        conn.actors.pop(self.session.id, None)
+        if not self.seats:
+            try:
+                self.queue.put_nowait((None, None))
+            except asyncio.QueueFull:
+                pass # actor 处理完积压的请求后会发现已无人在座
+
+    def acting_seat(self, conn: Connection) -> int:
+        seats = self.seats.get(conn)
+        if not seats:
+            raise GameError("你不在这局对局中", 403)
+        current = self.session.current_seat
+        return current if current in seats else min(seats)
+
+    def view(self, seat: int) -> Dict:
+        with self.session.lock:
+            return self.server.store.view(self.session, seat)
+
+    def broadcast(self, skip: Optional[Connection] = None):
+        for conn, seats in list(self.seats.items()):
+            if conn is not skip:
+                seat = self.session.current_seat if self.session.current_seat in seats else min(seats)
+                conn.send({'event': 'state', 'game': self.session.id, 'state': self.view(seat)})
+        if self.spectators.subscribers:
+            self.spectators.publish({'event': 'spectate', 'game': self.session.id, 'state': self.view(None)})
+
+    def watch(self, conn: Connection, request: Dict):
+        if self.session.id in conn.watching:
+            raise GameError("已经在观战这局对局", 409)
+        if self.spectators.last_frame is None:
+            self.spectators.publish({'event': 'spectate', 'game': self.session.id, 'state': self.view(None)})
+        conn.send({'id': request.get('id'), 'ok': True})
+        subscriber = self.spectators.subscribe()
+        conn.watching[self.session.id] = subscriber
+        self.watchers.add(conn)
+        conn.spawn(conn.spectate_loop(subscriber))
+
+    def unwatch(self, conn: Connection):
+        subscriber = conn.watching.pop(self.session.id, None)
+        self.watchers.discard(conn)
+        if subscriber is not None:
+            self.spectators.unsubscribe(subscriber)
+
+    async def run(self):
+        try:
+            await self._play_ai()
+            while self.seats and not self.session.game_state.game_over:
+                conn, request = await self.queue.get()
+                if conn is None:
+                    continue
+                try:
+                    changed = self.handle(conn, request)
+                except GameError as error:
+                    conn.send({'id': request.get('id'), 'ok': False, 'error': error.message})
+                    continue
+                if changed:
+                    self.broadcast(skip=conn)
+                    await self._play_ai()
+        finally:
+            self.server.finish(self)
+            self.spectators.close()
+
+    def handle(self, conn: Connection, request: Dict) -> bool:
+        """处理一条请求并回复，返回对局状态是否改变"""
+        op, store, session = request.get('op'), self.server.store, self.session
+        if op == 'watch':
+            self.watch(conn, request)
+            return False
+        if op == 'leave':
+            self.unwatch(conn)
+            self.leave(conn)
+            conn.send({'id': request.get('id'), 'ok': True})
+            return False
+        if op == 'join':
+            if 2 in session.ai_seats or 2 in session.claimed:
+                raise GameError("该对局没有空座位", 409)
+            session.claimed.add(2)
+            self.seats.setdefault(conn, set()).add(2)
+            conn.actors[session.id] = self
+            seat, changed = 2, False
+        else:
+            seat = self.acting_seat(conn)
+            with session.lock:
+                if op == 'play':
+                    move = request.get('move')
+                    if not isinstance(move, list):
+                        raise GameError("move 应为 [card, user, target]")
+                    store.play(session, seat, move)
+                elif op == 'end_turn':
+                    store.end_turn(session, seat)
+                elif op != 'state':
+                    raise GameError(f"未知的操作: {op}")
+            changed = op != 'state'
+        if op == 'state' and isinstance(request.get('since'), int):
+            with session.lock:
+                patch = store.sync(session, seat, request['since'])
+            conn.send({'id': request.get('id'), 'ok': True, 'patch': patch})
+        else:
+            conn.send({'id': request.get('id'), 'ok': True, 'state': self.view(seat)})
+        return changed
+
+    async def _play_ai(self):
+        """轮到 AI 座位时在线程池中打完它的回合，每个回合后推送一次"""
+        loop = asyncio.get_running_loop()
+        while not self.session.game_state.game_over and self.session.current_seat in self.session.ai_seats:
+            await loop.run_in_executor(self.server.executor, self._ai_turn)
+            self.broadcast()
+
+    def _ai_turn(self):
+        with self.session.lock:
+            self.server.store.ai_move(self.session)
+
+
+class GameServer:
+    def __init__(self, config, inbox: int = 32, outbox: int = 64, ai_workers: int = 4,
+                 line_limit: int = 64 * 1024, spectator_buffer: int = 4):
+        self.store = GameStore(config)
+        self.executor = ThreadPoolExecutor(ai_workers)
+        self.actors: Dict[str, GameActor] = {}
+        self.inbox = inbox
+        self.outbox = outbox
+        self.line_limit = line_limit
+        self.spectator_buffer = spectator_buffer
+        self.tasks: Set[asyncio.Task] = set() # 对局 actor 任务，事件循环只弱引用任务
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle_connection, host, port, limit=self.line_limit)
+
+    def finish(self, actor: GameActor):
+        """对局结束或所有人离开：移除对局，并解除仍在座连接与它的关联"""
+        self.actors.pop(actor.session.id, None)
+        self.store.remove(actor.session.id)
+        for conn in actor.seats:
+            conn.actors.pop(actor.session.id, None)
+        for conn in actor.watchers:
+            conn.watching.pop(actor.session.id, None)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        conn = Connection(reader, writer, self.outbox)
+        writer_task = asyncio.create_task(conn.write_loop())
+        try:
+            while not conn.closed:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError
+                except ValueError:
+                    conn.send({'ok': False, 'error': "请求应为一行 JSON 对象"})
+                    continue
+                await self.dispatch(conn, request)
+        except (ConnectionError, ValueError): # ValueError: 单行超过 line_limit
+            pass
+        finally:
+            conn.close()
+            writer_task.cancel()
+            for actor in list(conn.actors.values()):
+                actor.leave(conn)
+            for game_id in list(conn.watching):
+                if game_id in self.actors:
+                    self.actors[game_id].unwatch(conn)
+
+    async def dispatch(self, conn: Connection, request: Dict):
+        if request.get('op') == 'create':
+            try:
+                self.create(conn, request)
+            except GameError as error:
+                conn.send({'id': request.get('id'), 'ok': False, 'error': error.message})
+            return
+        actor = self.actors.get(request.get('game'))
+        if actor is None:
+            conn.send({'id': request.get('id'), 'ok': False, 'error': f"对局 {request.get('game')} 不存在"})
+            return
+        # 收件队列满时在此等待，连接随之暂停读取
+        await actor.queue.put((conn, request))
+
+    def create(self, conn: Connection, request: Dict):
+        mode = request.get('mode', 'ai')
+        if mode not in MODES:
+            raise GameError(f"mode 只能是 {', '.join(MODES)}")
+        session = self.store.create([request.get('lineup'), request.get('opponent_lineup')],
+                                    ai_seats=[2] if mode == 'ai' else [])
+        seats = {1, 2} if mode == 'hotseat' else {1}
+        session.claimed.update(seats)
+        session.pinned = True # actor 一直持有这局对局，不能被移出内存
+        actor = GameActor(self, session, self.inbox, self.spectator_buffer)
+        actor.seats[conn] = seats
+        conn.actors[session.id] = actor
+        self.actors[session.id] = actor
+        conn.send({'id': request.get('id'), 'ok': True, 'state': actor.view(actor.acting_seat(conn))})
+        task = asyncio.create_task(actor.run())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+
+async def serve(config, host: str, port: int, ai_workers: int, spectator_buffer: int):
+    server = GameServer(config, ai_workers=ai_workers, spectator_buffer=spectator_buffer)
+    listener = await server.start(host, port)
+    print(f"对局服务监听 {host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="asyncio TCP 对局服务（NDJSON 协议）")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7000)
+    parser.add_argument('--ai-workers', type=int, default=4, help="计算 AI 回合的线程数")
+    parser.add_argument('--spectator-buffer', type=int, default=4, help="每名观众最多积压的帧数，超出丢弃旧帧")
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    try:
+        asyncio.run(serve(config, args.host, args.port, args.ai_workers, args.spectator_buffer))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# LingCard/sim/aggregate.py
+"""
+基于共享内存的模拟结果汇总：每个工作进程在同一块共享内存中拥有自己的一行计数器，
+逐局写入对局结果、对局轮数直方图和各角色的伤害统计，不经过管道回传结果。
+
+各进程只写自己那一行，无需加锁；父进程随时把所有行按列求和即得到当前汇总，
+可以在工作进程运行期间定时读取进度，结束时再读一次作为最终结果。
+每局的伤害先在进程内累计，整局结束后才写入共享计数器，最后递增已完成局数，
+因此进度读数最多与正在写入的那一局相差一局。
+
+用法: python -m LingCard.sim.aggregate --games 2000 --jobs 4
+"""
+import argparse
+import hashlib
+import os
+import random
+from itertools import combinations
+from multiprocessing import Process
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import yaml
+
+from LingCard.core.flow import StrategyController, game_flow, run_flow
+from LingCard.core.game_engine import GameEngine
+from LingCard.core.game_state import GameState
+from LingCard.sim.shared import SharedArrays
+from LingCard.strategies.greedy import GreedyAI
+from LingCard.utils.loader import load_cards, load_characters, load_strategies
+
+OUTCOMES = ['first_player', 'second_player', 'draw']
+
+
+class SimulationCounters:
+    """
+    共享内存中的计数器，每个工作进程一行：
+      games        已完成局数
+      outcomes     先手胜 / 后手胜 / 平局 局数
+      rounds       对局轮数直方图，下标为轮数，最后一格为超过轮数上限判平的对局
+      appearances  各角色出场局数
+      damage_dealt 各角色造成的伤害（含反击）
+      damage_taken 各角色受到的伤害
+    """
+
+    def __init__(self, workers: int, char_names: List[str], max_rounds: int, name: Optional[str] = None):
+        self.workers = workers
+        self.char_names = list(char_names)
+        self.max_rounds = max_rounds
+        chars = len(self.char_names)
+        specs = {
+            'games': ((workers,), 'int64'),
+            'outcomes': ((workers, len(OUTCOMES)), 'int64'),
+            'rounds': ((workers, max_rounds + 2), 'int64'),
+            'appearances': ((workers, chars), 'int64'),
+            'damage_dealt': ((workers, chars), 'int64'),
+            'damage_taken': ((workers, chars), 'int64'),
+        }
+        self._shared = SharedArrays(specs, name)
+        if name is None:
+            for array in self._shared.arrays.values():
+                array[...] = 0
+
+    @property
+    def name(self) -> str:
+        return self._shared.shm.name
+
+    def row(self, worker: int) -> Dict[str, np.ndarray]:
+        """某个工作进程可写的那一行（视图）"""
+        return {key: array[worker, ...] for key, array in self._shared.arrays.items()}
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """所有行求和后的副本，工作进程运行中也可调用"""
+        return {key: array.sum(axis=0) for key, array in self._shared.arrays.items()}
+
+    def close(self, unlink: bool = False):
+        self._shared.close(unlink)
+
+
+def summarize(totals: Dict[str, np.ndarray], char_names: List[str]) -> Dict:
+    """把计数器汇总成先手胜率、平局率、对局长度分位数与各角色场均伤害"""
+    games = int(totals['games'])
+    hist = totals['rounds']
+    counted = int(hist.sum())
+    summary = {'games': games}
+    for i, outcome in enumerate(OUTCOMES):
+        summary[f"{outcome}_rate"] = totals['outcomes'][i] / games if games else 0.0
+    if counted:
+        lengths = np.arange(len(hist))
+        cumulative = np.cumsum(hist)
+        summary['avg_rounds'] = float((hist * lengths).sum() / counted)
+        for q in (50, 90):
+            summary[f"p{q}_rounds"] = int(np.searchsorted(cumulative, counted * q / 100))
+    else:
+        summary.update({'avg_rounds': 0.0, 'p50_rounds': 0, 'p90_rounds': 0})
+    summary['characters'] = {}
+    for i, name in enumerate(char_names):
+        played = int(totals['appearances'][i])
+        summary['characters'][name] = {
+            'games': played,
+            'damage_dealt': totals['damage_dealt'][i] / played if played else 0.0,
+            'damage_taken': totals['damage_taken'][i] / played if played else 0.0,
+        }
+    return summary
+
+
+def _worker(name, worker, workers, char_names, max_rounds, config, games, seed, strategy_name):
+    """打第 worker, worker+workers, ... 局，结果写入共享计数器中属于本进程的一行"""
+    counters = SimulationCounters(workers, char_names, max_rounds, name)
+    row = counters.row(worker)
+    engine = GameEngine(config)
+    char_classes, card_classes = load_characters(), load_cards()
+    strategy_class = load_strategies()[strategy_name]
+    strategies = [strategy_class(engine), strategy_class(engine)]
+    lineups = list(combinations(char_names, config['game_settings']['characters_per_player']))
+    index = {name: i for i, name in enumerate(char_names)}
+
+    dealt = np.zeros(len(char_names), dtype=np.int64)
+    taken = np.zeros(len(char_names), dtype=np.int64)
+    game_state = None
+
+    def record_damage(state, source, target, amount):
+        # 策略在状态副本上试算时也会经过引擎，只统计真实对局
+        if state is game_state:
+            dealt[index[source.__class__.__name__]] += amount
+            taken[index[target.__class__.__name__]] += amount
+    engine.damage_listeners.append(record_damage)
+
+    try:
+        for game_idx in range(worker, games, workers):
+            digest = hashlib.sha1(f"{seed}|{game_idx}".encode('utf-8')).digest()
+            rng = random.Random(int.from_bytes(digest[:4], 'little'))
+            pair = [rng.choice(lineups), rng.choice(lineups)]
+            turn_order = [0, 1] if game_idx % 2 == 0 else [1, 0]
+
+            dealt[:] = 0
+            taken[:] = 0
+            game_state = GameState()
+            game_state.rng = random.Random(rng.getrandbits(32))
+            engine.setup_game(game_state, pair, char_classes, card_classes, turn_order)
+            controllers = {player.id: StrategyController(strategy, in_place=True)
+                           for player, strategy in zip(game_state.players, strategies)}
+            winner = run_flow(game_flow(engine, game_state, max_rounds), controllers)
+
+            winner = winner - 1 if winner is not None else None
+            row['outcomes'][2 if winner is None else int(winner != turn_order[0])] += 1
+            row['rounds'][min(game_state.current_round, max_rounds + 1)] += 1
+            for lineup in pair:
+                for name in lineup:
+                    row['appearances'][index[name]] += 1
+            row['damage_dealt'] += dealt
+            row['damage_taken'] += taken
+            row['games'] += 1
+    finally:
+        row = None
+        counters.close()
+
+
+def run_simulations(config, games: int, jobs: int = 1, seed: int = 0, strategy: str = GreedyAI.name,
+                    max_rounds: int = 100, progress: Optional[Callable[[Dict], None]] = None,
+                    interval: float = 1.0) -> Dict:
+    """
+    用 jobs 个进程模拟 games 局随机阵容对局（先后手轮换），返回 summarize 的汇总结果。
+    progress 不为空时，每隔 interval 秒以当前汇总调用一次，工作进程无需停顿。
+    """
+    char_names = sorted(load_characters())
+    counters = SimulationCounters(jobs, char_names, max_rounds)
+    workers = [Process(target=_worker, args=(counters.name, w, jobs, char_names, max_rounds,
+                                             config, games, seed, strategy), daemon=True)
+               for w in range(jobs)]
+    try:
+        for process in workers:
+            process.start()
+        while any(process.is_alive() for process in workers):
+            wait([process.sentinel for process in workers if process.is_alive()], timeout=interval)
+            if progress:
+                progress(summarize(counters.snapshot(), char_names))
+        failed = [w for w, process in enumerate(workers) if process.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"模拟进程 {failed} 异常退出")
+        return summarize(counters.snapshot(), char_names)
+    finally:
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+        counters.close(unlink=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程模拟随机阵容对局，经共享内存汇总结果")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--strategy', default=GreedyAI.name, help="双方使用的策略名")
+    parser.add_argument('--max-rounds', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--interval', type=float, default=1.0, help="进度刷新间隔（秒）")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+
+    def show(summary):
+        print(f"\r{summary['games']}/{args.games} 局，先手胜率 {summary['first_player_rate']:.1%}，"
+              f"平均 {summary['avg_rounds']:.1f} 轮", end="", flush=True)
+
+    summary = run_simulations(config, args.games, args.jobs, args.seed, args.strategy,
+                              args.max_rounds, show, args.interval)
+    print()
+    print(f"先手胜 {summary['first_player_rate']:.1%}，后手胜 {summary['second_player_rate']:.1%}，"
+          f"平局 {summary['draw_rate']:.1%}")
+    print(f"对局轮数：平均 {summary['avg_rounds']:.1f}，中位数 {summary['p50_rounds']}，90% 分位 {summary['p90_rounds']}")
+    print(f"{'角色':<12}{'出场':>8}{'场均造成伤害':>14}{'场均受到伤害':>14}")
+    for name, row in summary['characters'].items():
+        print(f"{name:<12}{row['games']:>8}{row['damage_dealt']:>14.1f}{row['damage_taken']:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+# LingCard/sim/cluster.py
+"""
+多机模拟：一个协调者把“阵容组合 × 局号区间”任务分发给任意多个工作者，工作者只回传可合并的
+MatchupStats（胜/负/平与轮数统计），协调者合并后输出阵容对阵矩阵。
+
+任务键 = 阵容组合缓存键（含对局设置与源码摘要，见 matchups.pairing_key）+ 种子 + 局号区间。
+每局的随机种子由任务键和局号推出，同一任务无论由谁、执行几次结果都相同，因此：
+  * 工作者断线或租约超时，其任务重新排队，迟到的重复结果直接丢弃；
+  * 完成的任务追加写入日志文件，协调者重启后只分发尚未完成的任务。
+工作者收到任务时用自己的源码重新计算组合键，与协调者不一致（代码或配置版本不同）即拒绝执行。
+
+通信使用 multiprocessing.connection 的 TCP 连接，握手时以 --authkey（或环境变量 LINGCARD_CLUSTER_KEY）
+做 HMAC 认证；连接上的消息以 pickle 传输，知道密钥的一方即可在对方进程中执行代码，因此密钥必须自行设置，
+没有默认值，协调者默认也只监听本机。
+单机时用 --local-workers 启动若干本地工作进程代替其他主机，接入更多主机无需改动。
+
+用法: python -m LingCard.sim.cluster coordinator --authkey <密钥> --games 400 --local-workers 2
+      python -m LingCard.sim.cluster coordinator --authkey <密钥> --bind 0.0.0.0:6000     接受其他主机的工作者
+      python -m LingCard.sim.cluster worker --authkey <密钥> --connect 192.168.1.10:6000
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import socket
+import threading
+import time
+from collections import deque
+from itertools import combinations
+from multiprocessing import Process
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from LingCard.core.game_engine import GameEngine
+from LingCard.sim.matchups import MatchupMatrix, all_lineups, pairing_key
+from LingCard.sim.simulator import play_game
+from LingCard.sim.stats import MatchupStats
+from LingCard.strategies.greedy import GreedyAI
+from LingCard.utils.loader import load_cards, load_characters, load_strategies
+
+AUTHKEY_ENV = 'LINGCARD_CLUSTER_KEY'
+
+def parse_address(text: str) -> Tuple[str, int]:
+    host, _, port = text.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+def task_key(pairing: str, seed: int, start: int, count: int) -> str:
+    return f"{pairing}|{seed}|{start}+{count}"
+
+def simulate_task(engine, strategies, char_classes, card_classes, task: Dict) -> MatchupStats:
+    """按任务键为每局播种并模拟，结果只取决于任务本身"""
+    stats = MatchupStats()
+    for game_idx in range(task['start'], task['start'] + task['count']):
+        digest = hashlib.sha1(f"{task['key']}|{game_idx}".encode('utf-8')).digest()
+        turn_order = [0, 1] if game_idx % 2 == 0 else [1, 0]
+        result = play_game(engine, task['lineups'], strategies, char_classes, card_classes, turn_order=turn_order,
+                           rng=random.Random(int.from_bytes(digest[:4], 'little')))
+        stats.record(result['winner'], result['rounds'])
+    return stats
+
+
+class _Lease:
+    def __init__(self, task: Dict, worker: str, deadline: float):
+        self.task = task
+        self.worker = worker
+        self.deadline = deadline
+
+
+class Coordinator:
+    """
+    任务队列与结果日志。pending 为待分发任务，leases 为已分发未完成的任务；
+    连接断开或超过 lease_timeout 未回报的任务回到队列。
+    """
+
+    def __init__(self, config, games: int = 200, batch_size: int = 20, seed: int = 0,
+                 strategy: str = GreedyAI.name, lease_timeout: float = 600.0):
+        self.config = config
+        self.strategy = strategy
+        self.seed = seed
+        self.lease_timeout = lease_timeout
+        batch_size = max(2, batch_size + batch_size % 2) # 偶数局，先后手各半
+        char_classes, card_classes = load_characters(), load_cards()
+        strategy_class = load_strategies()[strategy]
+
+        self.lineups = all_lineups(config, char_classes)
+        self.tasks: Dict[str, Dict] = {}
+        for a, b in combinations(self.lineups, 2):
+            pairing = pairing_key(config, strategy_class, a, b, char_classes, card_classes)
+            for start in range(0, games, batch_size):
+                count = min(batch_size, games - start)
+                key = task_key(pairing, seed, start, count)
+                self.tasks[key] = {'key': key, 'pairing': pairing, 'lineups': [list(a), list(b)],
+                                   'start': start, 'count': count}
+
+        self.results: Dict[str, Dict] = {}
+        self.pending = deque()
+        self.leases: Dict[str, _Lease] = {}
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self._log = None
+
+    # ---- 日志 ----
+
+    def load_journal(self, journal: str):
+        """读回已完成的任务；截掉中断时写了一半的最后一行。其他参数下的任务键不会匹配，直接忽略"""
+        if os.path.exists(journal):
+            valid_size = 0
+            with open(journal, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line.decode('utf-8'))
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    valid_size += len(line)
+                    if record['key'] in self.tasks:
+                        self.results[record['key']] = record['stats']
+            with open(journal, 'r+b') as f:
+                f.truncate(valid_size)
+        self.pending = deque(key for key in self.tasks if key not in self.results)
+        if not self.pending:
+            self.finished.set()
+        self._log = open(journal, 'a', encoding='utf-8')
+
+    def close(self):
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    # ---- 任务分发 ----
+
+    def _expire_leases(self):
+        now = time.time()
+        for key, lease in list(self.leases.items()):
+            if lease.deadline < now:
+                print(f"任务 {key[:8]}…@{lease.task['start']} 在 {lease.worker} 上超时，重新排队")
+                del self.leases[key]
+                self.pending.appendleft(key)
+
+    def acquire(self, worker: str) -> Optional[Dict]:
+        """取一个任务；队列已空但仍有在途任务时返回 None（稍后再问）"""
+        with self.lock:
+            self._expire_leases()
+            while self.pending:
+                key = self.pending.popleft()
+                if key in self.results:
+                    continue
+                self.leases[key] = _Lease(self.tasks[key], worker, time.time() + self.lease_timeout)
+                return self.tasks[key]
+            return None
+
+    def complete(self, key: str, stats: Dict) -> bool:
+        """记录任务结果；重复或未知的结果返回 False"""
+        with self.lock:
+            self.leases.pop(key, None)
+            if key not in self.tasks or key in self.results:
+                return False
+            self.results[key] = stats
+            self._log.write(json.dumps({'key': key, 'stats': stats}, ensure_ascii=False) + "\n")
+            self._log.flush()
+            if len(self.results) == len(self.tasks):
+                self.finished.set()
+            return True
+
+    def release(self, worker: str):
+        """工作者断线：它持有的任务立即重新排队"""
+        with self.lock:
+            for key, lease in list(self.leases.items()):
+                if lease.worker == worker:
+                    del self.leases[key]
+                    if key not in self.results:
+                        self.pending.appendleft(key)
+
+    # ---- 网络 ----
+
+    def serve(self, address: Tuple[str, int], authkey: bytes):
+        """在后台线程中接受工作者连接，每个连接一个线程"""
+        listener = Listener(address, authkey=authkey)
+
+        def accept():
+            while not self.finished.is_set():
+                try:
+                    conn = listener.accept()
+                except OSError:
+                    return
+                except Exception as error: # 认证失败等，不影响其他连接
+                    print(f"拒绝连接: {error}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+        threading.Thread(target=accept, daemon=True).start()
+        return listener
+
+    def _handle(self, conn):
+        worker = None
+        try:
+            hello = conn.recv()
+            worker = f"{hello['worker']}#{id(conn)}"
+            conn.send({'config': self.config, 'strategy': self.strategy})
+            while True:
+                message = conn.recv()
+                if message['type'] == 'result':
+                    self.complete(message['key'], message['stats'])
+                elif message['type'] == 'error':
+                    print(f"{worker} 拒绝任务: {message['message']}")
+                    self.release(worker)
+                    return
+                if self.finished.is_set():
+                    conn.send({'type': 'done'})
+                    return
+                task = self.acquire(worker)
+                conn.send({'type': 'task', 'task': task} if task else {'type': 'wait', 'seconds': 1.0})
+        except (EOFError, OSError):
+            pass
+        finally:
+            if worker:
+                self.release(worker)
+            conn.close()
+
+    # ---- 汇总 ----
+
+    def entries(self) -> List[Dict]:
+        merged: Dict[str, MatchupStats] = {}
+        lineups: Dict[str, List] = {}
+        for key, stats in self.results.items():
+            task = self.tasks[key]
+            merged.setdefault(task['pairing'], MatchupStats()).merge(MatchupStats.from_dict(stats))
+            lineups[task['pairing']] = task['lineups']
+        return [{'lineups': lineups[p], 'strategy': self.strategy, **s.to_dict()} for p, s in merged.items()]
+
+    def run(self, address: Tuple[str, int], authkey: bytes, journal: str, local_workers: int = 0,
+            verbose: bool = True) -> List[Dict]:
+        self.load_journal(journal)
+        if verbose:
+            print(f"共 {len(self.tasks)} 个任务，日志中已完成 {len(self.results)} 个")
+        listener = self.serve(address, authkey)
+        connect = ('127.0.0.1' if address[0] in ('', '0.0.0.0') else address[0], listener.address[1])
+        if verbose:
+            print(f"协调者监听 {listener.address[0]}:{listener.address[1]}")
+        workers = [Process(target=run_worker, args=(connect, authkey, f"local-{i}"), daemon=True)
+                   for i in range(local_workers)]
+        for process in workers:
+            process.start()
+        try:
+            last = -1
+            while not self.finished.wait(2.0):
+                done = len(self.results)
+                if verbose and done != last:
+                    print(f"已完成 {done}/{len(self.tasks)} 个任务，在途 {len(self.leases)} 个")
+                    last = done
+        finally:
+            listener.close()
+            for process in workers:
+                process.join(5.0)
+                if process.is_alive():
+                    process.terminate()
+            self.close()
+        return self.entries()
+
+
+def run_worker(address: Tuple[str, int], authkey: bytes, name: Optional[str] = None, retry: float = 30.0):
+    """连接协调者并循环领取、执行任务，直到协调者宣布全部完成；协调者尚未启动时最多重试 retry 秒"""
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+    deadline = time.time() + retry
+    while True:
+        try:
+            conn = Client(address, authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.time() > deadline:
+                raise
+            time.sleep(1.0)
+
+    with conn:
+        conn.send({'worker': name})
+        setup = conn.recv()
+        config = setup['config']
+        engine = GameEngine(config)
+        char_classes, card_classes = load_characters(), load_cards()
+        strategy_class = load_strategies()[setup['strategy']]
+        strategies = [strategy_class(engine), strategy_class(engine)]
+
+        conn.send({'type': 'ready'})
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                return
+            if message['type'] == 'done':
+                return
+            if message['type'] == 'wait':
+                time.sleep(message['seconds'])
+                conn.send({'type': 'ready'})
+                continue
+            task = message['task']
+            a, b = task['lineups']
+            if pairing_key(config, strategy_class, a, b, char_classes, card_classes) != task['pairing']:
+                conn.send({'type': 'error', 'message': "本机源码或配置与协调者不一致"})
+                return
+            stats = simulate_task(engine, strategies, char_classes, card_classes, task)
+            conn.send({'type': 'result', 'key': task['key'], 'stats': stats.to_dict()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多机阵容对阵模拟：协调者分发任务，工作者执行并回传统计")
+    sub = parser.add_subparsers(dest='role', required=True)
+
+    coordinator = sub.add_parser('coordinator', help="分发任务并汇总结果")
+    coordinator.add_argument('--config', default='config.yaml')
+    coordinator.add_argument('--bind', default='127.0.0.1:6000', help="监听地址 host:port；接受其他主机时用 0.0.0.0:6000")
+    coordinator.add_argument('--games', type=int, default=200, help="每个阵容组合的局数")
+    coordinator.add_argument('--batch-size', type=int, default=20, help="每个任务包含的局数")
+    coordinator.add_argument('--strategy', default=GreedyAI.name)
+    coordinator.add_argument('--seed', type=int, default=0)
+    coordinator.add_argument('--lease-timeout', type=float, default=600.0, help="任务超过该秒数未回报即重新分发")
+    coordinator.add_argument('--journal', default='cluster.jsonl', help="已完成任务的日志，用于断点续跑")
+    coordinator.add_argument('--local-workers', type=int, default=0, help="在本机启动的工作进程数")
+    coordinator.add_argument('--authkey', default=os.environ.get(AUTHKEY_ENV), help=f"认证密钥，默认取环境变量 {AUTHKEY_ENV}")
+
+    worker = sub.add_parser('worker', help="连接协调者执行任务")
+    worker.add_argument('--connect', default='127.0.0.1:6000', help="协调者地址 host:port")
+    worker.add_argument('--processes', type=int, default=1, help="本机启动的工作进程数")
+    worker.add_argument('--authkey', default=os.environ.get(AUTHKEY_ENV), help=f"认证密钥，默认取环境变量 {AUTHKEY_ENV}")
+    args = parser.parse_args()
+
+    if not args.authkey:
+        parser.error(f"需要认证密钥：请使用 --authkey 或设置环境变量 {AUTHKEY_ENV}")
+    authkey = args.authkey.encode('utf-8')
+    if args.role == 'worker':
+        address = parse_address(args.connect)
+        processes = [Process(target=run_worker, args=(address, authkey)) for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        return
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    runner = Coordinator(config, args.games, args.batch_size, args.seed, args.strategy, args.lease_timeout)
+    entries = runner.run(parse_address(args.bind), authkey, args.journal, args.local_workers)
+    MatchupMatrix(runner.lineups, entries).print_table()
+
+if __name__ == "__main__":
+    main()
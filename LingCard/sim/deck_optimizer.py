@@ -0,0 +1,246 @@
+# LingCard/sim/deck_optimizer.py
+"""
+牌库构成优化：在总张数固定的前提下搜索 deck_composition 的各卡数量，以模拟胜率为目标。
+
+两种目标：
+  balance  让所有阵容的胜率尽量接近 50%：最小化各阵容胜率偏离 50% 的均方根加上平局率。
+           平局在胜率中记半场，不另加平局率的话，打不出胜负的构成会显得最“平衡”
+  strength 最大化指定阵容对随机对手阵容的胜率
+
+搜索使用逐次减半（successive halving）：随机生成一批候选构成，每轮给存活候选补足模拟局数，
+保留目标最好的 1/eta，下一轮局数乘以 eta，把模拟预算集中在有希望的候选上。
+每个构成的模拟结果按 (构成, 目标, 配置与源码摘要) 缓存在磁盘上，局号固定播种，
+再次运行或候选重复出现时只补模拟缺少的局。
+
+用法: python -m LingCard.sim.deck_optimizer --objective balance --candidates 32 --games 20
+      python -m LingCard.sim.deck_optimizer --objective strength --lineup Jun Liuli
+"""
+import argparse
+import copy
+import hashlib
+import json
+import math
+import os
+import random
+from collections import defaultdict
+from itertools import combinations
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import yaml
+
+from LingCard.cards.action_card import ActionCard
+from LingCard.characters.character import Character
+from LingCard.core.game_engine import GameEngine
+from LingCard.sim import simulator
+from LingCard.sim.simulator import play_game
+from LingCard.sim.stats import RunningStats, wilson_interval
+from LingCard.strategies.greedy import GreedyAI
+from LingCard.utils.digest import config_digest, source_digest
+from LingCard.utils.loader import load_cards, load_characters, load_strategies
+
+CACHE_VERSION = 1
+DRAWS = '_draws' # 评估结果中记录平局率的键
+Composition = Tuple[int, ...]
+
+
+def random_compositions(count: int, total: int, types: int, min_count: int, rng) -> List[Composition]:
+    """在 各类卡 >= min_count 且总数为 total 的构成中均匀抽取（隔板法），去重"""
+    spare = total - types * min_count
+    if spare < 0:
+        raise ValueError(f"总张数 {total} 不足以让 {types} 类卡各有 {min_count} 张")
+    space = math.comb(spare + types - 1, types - 1)
+    found = set()
+    while len(found) < min(count, space):
+        cuts = sorted(rng.sample(range(spare + types - 1), types - 1))
+        bounds = [-1] + cuts + [spare + types - 1]
+        found.add(tuple(min_count + bounds[i + 1] - bounds[i] - 1 for i in range(types)))
+    return sorted(found)
+
+
+def _simulate(task) -> Dict:
+    """为一个构成模拟第 start 到 start+count-1 局，返回各阵容得分的流式统计"""
+    config, card_names, composition, target, start, count, seed, strategy_name = task
+    config = copy.deepcopy(config)
+    config['game_settings']['deck_composition'] = dict(zip(card_names, composition))
+    engine = GameEngine(config)
+    char_classes, card_classes = load_characters(), load_cards()
+    strategy_class = load_strategies()[strategy_name]
+    strategies = [strategy_class(engine), strategy_class(engine)]
+    lineups = list(combinations(sorted(char_classes), config['game_settings']['characters_per_player']))
+
+    scores = defaultdict(RunningStats)
+    for game_idx in range(start, start + count):
+        digest = hashlib.sha1(f"{seed}|{composition}|{target}|{game_idx}".encode('utf-8')).digest()
+        rng = random.Random(int.from_bytes(digest[:4], 'little'))
+        pair = [tuple(target) if target else rng.choice(lineups), rng.choice(lineups)]
+        turn_order = [0, 1] if game_idx % 2 == 0 else [1, 0]
+        winner = play_game(engine, pair, strategies, char_classes, card_classes, turn_order=turn_order,
+                           rng=random.Random(rng.getrandbits(32)))['winner']
+        scores[DRAWS].push(float(winner is None))
+        for side, lineup in enumerate(pair):
+            if target and side == 1:
+                continue
+            scores["-".join(lineup)].push(0.5 if winner is None else float(winner == side))
+    return {name: stats.to_dict() for name, stats in scores.items()}
+
+
+class Evaluation:
+    """一个构成在某个目标下的累计模拟结果"""
+
+    def __init__(self, games: int = 0, scores: Dict[str, RunningStats] = None):
+        self.games = games
+        self.scores = scores or {}
+
+    def merge(self, count: int, result: Dict):
+        self.games += count
+        for name, data in result.items():
+            self.scores.setdefault(name, RunningStats()).merge(RunningStats.from_dict(data))
+
+    def objective(self, target) -> float:
+        """越大越好：strength 为目标阵容胜率，balance 为负的（胜率偏离均方根 + 平局率）"""
+        if target:
+            stats = self.scores.get("-".join(target))
+            return stats.mean if stats else 0.5
+        deviations = [(stats.mean - 0.5) ** 2 for name, stats in self.scores.items() if name != DRAWS and stats.n]
+        if not deviations:
+            return 0.0
+        return -(math.sqrt(sum(deviations) / len(deviations)) + self.scores[DRAWS].mean)
+
+    def to_dict(self) -> Dict:
+        return {'games': self.games, 'scores': {name: s.to_dict() for name, s in self.scores.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Evaluation':
+        return cls(data['games'], {name: RunningStats.from_dict(s) for name, s in data['scores'].items()})
+
+
+class DeckOptimizer:
+    """逐次减半搜索牌库构成"""
+
+    def __init__(self, config, target: Optional[Sequence[str]] = None, total: Optional[int] = None,
+                 min_count: int = 1, seed: int = 0, strategy: str = GreedyAI.name, cache_path: str = None):
+        self.config = config
+        composition = config['game_settings']['deck_composition']
+        self.card_names = sorted(composition)
+        self.current = tuple(composition[name] for name in self.card_names)
+        self.total = total if total is not None else sum(self.current)
+        self.target = tuple(sorted(target)) if target else None
+        self.min_count = min_count
+        self.seed = seed
+        self.strategy = strategy
+        self.cache_path = cache_path
+        self.cache = self._read_cache()
+
+        # 缓存键中不含牌库构成本身，构成单独作为键的一部分
+        settings = {k: v for k, v in config['game_settings'].items() if k != 'deck_composition'}
+        char_classes, card_classes = load_characters(), load_cards()
+        self._digest = hashlib.sha1("|".join([
+            config_digest({'game_settings': settings, 'team_effects': config.get('team_effects')}),
+            source_digest(GameEngine, Character, ActionCard, simulator, load_strategies()[strategy],
+                          *card_classes.values(), *char_classes.values()),
+            str(seed), strategy,
+        ]).encode('utf-8')).hexdigest()
+
+    def _key(self, composition: Composition) -> str:
+        cards = ",".join(f"{name}={n}" for name, n in zip(self.card_names, composition))
+        return f"{self._digest}|{'-'.join(self.target) if self.target else 'balance'}|{cards}"
+
+    def _read_cache(self) -> Dict[str, Dict]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        with open(self.cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('evaluations', {}) if data.get('version') == CACHE_VERSION else {}
+
+    def _write_cache(self):
+        if self.cache_path:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'evaluations': self.cache}, f, ensure_ascii=False)
+
+    def evaluation(self, composition: Composition) -> Evaluation:
+        data = self.cache.get(self._key(composition))
+        return Evaluation.from_dict(data) if data else Evaluation()
+
+    def evaluate(self, compositions: List[Composition], games: int, pool, batch_size: int = 20):
+        """把每个构成的累计局数补足到 games，缓存中已有的局不再重复模拟"""
+        evaluations = {c: self.evaluation(c) for c in compositions}
+        tasks = []
+        for composition, evaluation in evaluations.items():
+            for start in range(evaluation.games, games, batch_size):
+                count = min(batch_size, games - start)
+                tasks.append((self.config, self.card_names, composition, self.target,
+                              start, count, self.seed, self.strategy))
+        for task, result in zip(tasks, pool.imap(_simulate, tasks)):
+            evaluations[task[2]].merge(task[5], result)
+        for composition, evaluation in evaluations.items():
+            self.cache[self._key(composition)] = evaluation.to_dict()
+        self._write_cache()
+        return evaluations
+
+    def run(self, candidates: int = 32, games: int = 20, max_games: int = 640, eta: int = 2,
+            jobs: int = 1, verbose: bool = False) -> List[Tuple[Composition, Evaluation]]:
+        """返回最后一轮存活的候选（按目标从好到坏排序）及其评估"""
+        rng = random.Random(self.seed)
+        pool_size = candidates - 1 if sum(self.current) == self.total else candidates
+        survivors = random_compositions(pool_size, self.total, len(self.card_names), self.min_count, rng)
+        if sum(self.current) == self.total and self.current not in survivors:
+            survivors.append(self.current)
+
+        with Pool(jobs) as pool:
+            while True:
+                evaluations = self.evaluate(survivors, games, pool)
+                ranked = sorted(survivors, key=lambda c: -evaluations[c].objective(self.target))
+                if verbose:
+                    best = ranked[0]
+                    print(f"{len(survivors)} 个候选 × {games} 局：最佳 {self.describe(best)}，"
+                          f"目标值 {evaluations[best].objective(self.target):.3f}")
+                if len(ranked) <= 1 or games >= max_games:
+                    return [(c, evaluations[c]) for c in ranked]
+                survivors = ranked[:max(1, math.ceil(len(ranked) / eta))]
+                games = min(games * eta, max_games)
+
+    def describe(self, composition: Composition) -> str:
+        return ", ".join(f"{name}={n}" for name, n in zip(self.card_names, composition))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以模拟胜率为目标优化牌库构成")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--objective', choices=['balance', 'strength'], default='balance')
+    parser.add_argument('--lineup', nargs='+', default=None, help="strength 目标下要加强的阵容")
+    parser.add_argument('--total', type=int, default=None, help="牌库总张数，默认与当前配置相同")
+    parser.add_argument('--min-count', type=int, default=1, help="每类卡至少的张数")
+    parser.add_argument('--candidates', type=int, default=32, help="初始候选数")
+    parser.add_argument('--games', type=int, default=20, help="第一轮每个候选的模拟局数")
+    parser.add_argument('--max-games', type=int, default=640, help="每个候选最多模拟的局数")
+    parser.add_argument('--eta', type=int, default=2, help="每轮保留 1/eta 的候选，局数乘以 eta")
+    parser.add_argument('--strategy', default=GreedyAI.name)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cache', default='deck_optimizer.json', help="构成评估缓存")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    if args.objective == 'strength' and not args.lineup:
+        parser.error("strength 目标需要用 --lineup 指定阵容")
+    optimizer = DeckOptimizer(config, args.lineup if args.objective == 'strength' else None, args.total,
+                              args.min_count, args.seed, args.strategy, args.cache)
+    target = optimizer.target
+    results = optimizer.run(args.candidates, args.games, args.max_games, args.eta, args.jobs, verbose=True)
+
+    print(f"{'构成':<40}{'局数':>8}{'目标值':>10}")
+    for composition, evaluation in results:
+        print(f"{optimizer.describe(composition):<40}{evaluation.games:>8}{evaluation.objective(target):>10.3f}")
+    best, evaluation = results[0]
+    if target:
+        stats = evaluation.scores.get("-".join(optimizer.target))
+        low, high = wilson_interval(stats.mean * stats.n, stats.n) if stats else (0.0, 1.0)
+        print(f"阵容 {'-'.join(optimizer.target)} 胜率 {evaluation.objective(target):.1%} [{low:.1%}, {high:.1%}]")
+    print("deck_composition:")
+    for name, count in zip(optimizer.card_names, best):
+        print(f"  {name}: {count}")
+
+if __name__ == "__main__":
+    main()
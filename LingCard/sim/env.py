@@ -0,0 +1,283 @@
+# LingCard/sim/env.py
+"""
+强化学习用的 reset/step 环境接口。
+
+智能体固定控制 1 号玩家，对手由指定策略代打。动作编码为整数：
+  action = (卡牌类索引 * 角色数 + 使用者槽位) * 角色数 + 目标槽位，最后一个动作表示结束回合；
+卡牌类按 deck_composition 的类名排序，总是打出手牌中第一张该类卡。
+奖励只在终局给出：胜 +1，负 -1，超过回合上限判平 0。
+
+VectorEnv 在进程内批量步进 M 个环境；SubprocVectorEnv 把环境分给子进程，
+观测、奖励、结束标志和动作掩码都放在共享内存里，父进程不做任何序列化。
+"""
+import random
+from itertools import combinations
+from multiprocessing import Pipe, Process
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from LingCard.ai.features import StateEncoder
+from LingCard.core.flow import AwaitMove, StrategyController, game_flow
+from LingCard.core.game_engine import GameEngine
+from LingCard.core.game_state import GameState
+from LingCard.sim.shared import SharedArrays
+from LingCard.strategies.greedy import GreedyAI
+from LingCard.utils.loader import load_cards, load_characters
+
+class ActionSpace:
+    """整数动作编码，掩码与解码都针对当前行动的玩家"""
+
+    def __init__(self, card_names, chars_per_player: int):
+        self.card_names = list(card_names)
+        self.chars = chars_per_player
+        self.size = len(self.card_names) * self.chars * self.chars + 1
+        self.end_turn = self.size - 1
+
+    @classmethod
+    def from_config(cls, config) -> 'ActionSpace':
+        settings = config['game_settings']
+        return cls(sorted(settings['deck_composition']), settings['characters_per_player'])
+
+    def encode(self, game_state, move) -> int:
+        """把 (手牌索引, 使用者, 目标) 编码为整数动作，move 为 None 表示结束回合"""
+        if move is None:
+            return self.end_turn
+        card_idx, user, target = move
+        card_name = game_state.get_current_player().hand[card_idx].__class__.__name__
+        return (self.card_names.index(card_name) * self.chars + user) * self.chars + target
+
+    def decode(self, engine, game_state, action: int) -> Optional[Tuple[int, int, int]]:
+        """整数动作对应的行动；结束回合或非法动作返回 None"""
+        if action == self.end_turn:
+            return None
+        rest, target = divmod(action, self.chars)
+        card_type, user = divmod(rest, self.chars)
+        card_name = self.card_names[card_type]
+        hand = game_state.get_current_player().hand
+        card_idx = next((i for i, c in enumerate(hand) if c.__class__.__name__ == card_name), None)
+        if card_idx is None:
+            return None
+        move = (card_idx, user, target)
+        return move if engine.is_legal_move(game_state, move) else None
+
+    def mask(self, engine, game_state, out: Optional[np.ndarray] = None) -> np.ndarray:
+        mask = out if out is not None else np.zeros(self.size, dtype=bool)
+        mask[:] = False
+        if game_state.game_over:
+            return mask
+        mask[self.end_turn] = True
+        player = game_state.get_current_player()
+        users = len(player.get_alive_characters())
+        for card_type, card_name in enumerate(self.card_names):
+            card = next((c for c in player.hand if c.__class__.__name__ == card_name), None)
+            if card is None:
+                continue
+            targets = len(engine.get_action_targets(game_state, card))
+            for user in range(users):
+                base = (card_type * self.chars + user) * self.chars
+                mask[base:base + targets] = True
+        return mask
+
+
+class CardGameEnv:
+    """单局环境，经由 game_flow 推进对局，对手回合在 step 内部自动完成"""
+
+    def __init__(self, config, lineups=None, opponent_class=GreedyAI, max_rounds: int = 100, seed: Optional[int] = None):
+        self.config = config
+        self.engine = GameEngine(config)
+        self.char_classes = load_characters()
+        self.card_classes = load_cards()
+        self.encoder = StateEncoder.from_config(config, self.char_classes)
+        self.opponent = opponent_class(self.engine)
+        self.fixed_lineups = lineups
+        self.max_rounds = max_rounds
+        self.rng = random.Random(seed)
+
+        self.actions = ActionSpace.from_config(config)
+        chars_per_player = config['game_settings']['characters_per_player']
+        self.all_lineups = list(combinations(sorted(self.char_classes), chars_per_player))
+        self.action_count = self.actions.size
+        self.end_turn_action = self.actions.end_turn
+        self.observation_size = self.encoder.size
+        self.game_state: Optional[GameState] = None
+        self.flow = None
+        self.request: Optional[AwaitMove] = None # 智能体的挂起点，对局结束后为 None
+
+    def reset(self) -> Tuple[np.ndarray, Dict]:
+        if self.fixed_lineups:
+            lineups = self.fixed_lineups
+        else:
+            lineups = [self.rng.choice(self.all_lineups), self.rng.choice(self.all_lineups)]
+        turn_order = [0, 1] if self.rng.random() < 0.5 else [1, 0]
+        # 每局用环境自己的随机源派生本局的发生器，同一进程中的多个环境互不干扰
+        self.game_state = GameState()
+        self.game_state.rng = random.Random(self.rng.getrandbits(32))
+        self.engine.setup_game(self.game_state, lineups, self.char_classes, self.card_classes, turn_order)
+        self.flow = game_flow(self.engine, self.game_state, self.max_rounds)
+        self.opponent_controller = StrategyController(self.opponent, in_place=True)
+        self._resume(start=True)
+        return self.observe(), {'action_mask': self.action_mask()}
+
+    def step(self, action: int) -> Tuple[np.ndarray, float, bool, Dict]:
+        game_state = self.game_state
+        if self.request is None:
+            raise ValueError("对局已结束，请先调用 reset()")
+        move = None
+        if action != self.end_turn_action:
+            move = self.actions.decode(self.engine, game_state, action)
+            if move is None:
+                raise ValueError(f"非法动作: {action}")
+        self._resume(move)
+
+        done = self.request is None
+        reward = 0.0
+        if game_state.game_over:
+            reward = 1.0 if game_state.winner == 1 else -1.0
+        return self.observe(), reward, done, {'action_mask': self.action_mask()}
+
+    def observe(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        if out is None:
+            return self.encoder.encode(self.game_state, perspective_id=1)
+        out[:] = 0
+        self.encoder.encode_into(out[np.newaxis], 0, self.game_state, perspective_id=1)
+        return out
+
+    def action_mask(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        if self.request is None:
+            mask = out if out is not None else np.zeros(self.action_count, dtype=bool)
+            mask[:] = False
+            return mask
+        return self.actions.mask(self.engine, self.game_state, out)
+
+    def _resume(self, move=None, start: bool = False):
+        """把智能体的行动送回流程，对手回合由策略代打，直到轮到智能体或对局结束"""
+        try:
+            request = next(self.flow) if start else self.flow.send(move)
+            while request.player_id != 1:
+                request = self.flow.send(self.opponent_controller.next_move(request))
+        except StopIteration:
+            request = None
+        self.request = request
+
+
+class VectorEnv:
+    """进程内同时步进 M 个环境，结束的环境自动重置"""
+
+    def __init__(self, config, num_envs: int, seed: int = 0, **env_kwargs):
+        self.envs = [CardGameEnv(config, seed=seed + i, **env_kwargs) for i in range(num_envs)]
+        first = self.envs[0]
+        self.num_envs = num_envs
+        self.action_count = first.action_count
+        self.observation_size = first.observation_size
+        self.observations = np.zeros((num_envs, self.observation_size), dtype=np.float32)
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.dones = np.zeros(num_envs, dtype=bool)
+        self.masks = np.zeros((num_envs, self.action_count), dtype=bool)
+
+    def reset(self) -> Tuple[np.ndarray, np.ndarray]:
+        for i, env in enumerate(self.envs):
+            env.reset()
+            env.observe(self.observations[i])
+            env.action_mask(self.masks[i])
+        return self.observations, self.masks
+
+    def step(self, actions) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """返回 (observations, rewards, dones, action_masks)；结束的环境返回的是重置后的新局面"""
+        _step_slice(self.envs, actions, self.observations, self.rewards, self.dones, self.masks)
+        return self.observations, self.rewards, self.dones, self.masks
+
+    def close(self):
+        pass
+
+
+def _step_slice(envs, actions, observations, rewards, dones, masks):
+    for i, env in enumerate(envs):
+        _, reward, done, _ = env.step(int(actions[i]))
+        if done:
+            env.reset()
+        rewards[i] = reward
+        dones[i] = done
+        env.observe(observations[i])
+        env.action_mask(masks[i])
+
+
+def _subproc_worker(conn, config, start: int, stop: int, seed: int, shm_name: str, specs, env_kwargs):
+    shared = SharedArrays(specs, shm_name)
+    arrays = shared.arrays
+    envs = [CardGameEnv(config, seed=seed + i, **env_kwargs) for i in range(start, stop)]
+    views = {key: array[start:stop] for key, array in arrays.items()}
+    try:
+        while True:
+            command = conn.recv()
+            if command == 'step':
+                _step_slice(envs, views['actions'], views['observations'], views['rewards'],
+                            views['dones'], views['masks'])
+            elif command == 'reset':
+                for i, env in enumerate(envs):
+                    env.reset()
+                    env.observe(views['observations'][i])
+                    env.action_mask(views['masks'][i])
+            elif command == 'close':
+                break
+            conn.send(True)
+    finally:
+        views.clear()
+        shared.close()
+        conn.close()
+
+
+class SubprocVectorEnv:
+    """把 M 个环境分给多个子进程步进，数据经共享内存交换，管道里只传命令"""
+
+    def __init__(self, config, num_envs: int, num_workers: int = 2, seed: int = 0, **env_kwargs):
+        probe = CardGameEnv(config, **env_kwargs)
+        self.num_envs = num_envs
+        self.action_count = probe.action_count
+        self.observation_size = probe.observation_size
+        specs = {
+            'observations': ((num_envs, self.observation_size), 'float32'),
+            'rewards': ((num_envs,), 'float32'),
+            'dones': ((num_envs,), 'bool'),
+            'masks': ((num_envs, self.action_count), 'bool'),
+            'actions': ((num_envs,), 'int64'),
+        }
+        self._shared = SharedArrays(specs)
+        arrays = self._shared.arrays
+        self.observations, self.rewards = arrays['observations'], arrays['rewards']
+        self.dones, self.masks, self._actions = arrays['dones'], arrays['masks'], arrays['actions']
+
+        num_workers = max(1, min(num_workers, num_envs))
+        bounds = [num_envs * w // num_workers for w in range(num_workers + 1)]
+        self._conns: List = []
+        self._procs: List[Process] = []
+        for w in range(num_workers):
+            parent, child = Pipe()
+            proc = Process(target=_subproc_worker, daemon=True, args=(
+                child, config, bounds[w], bounds[w + 1], seed, self._shared.shm.name, specs, env_kwargs))
+            proc.start()
+            self._conns.append(parent)
+            self._procs.append(proc)
+
+    def _broadcast(self, command: str):
+        for conn in self._conns:
+            conn.send(command)
+        for conn in self._conns:
+            conn.recv()
+
+    def reset(self) -> Tuple[np.ndarray, np.ndarray]:
+        self._broadcast('reset')
+        return self.observations, self.masks
+
+    def step(self, actions) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        self._actions[:] = actions
+        self._broadcast('step')
+        return self.observations, self.rewards, self.dones, self.masks
+
+    def close(self):
+        for conn in self._conns:
+            conn.send('close')
+        for proc in self._procs:
+            proc.join()
+        self.observations = self.rewards = self.dones = self.masks = self._actions = None
+        self._shared.close(unlink=True)
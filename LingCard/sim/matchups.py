@@ -0,0 +1,254 @@
+# LingCard/sim/matchups.py
+"""
+阵容对阵分析：模拟由当前角色池组成的所有阵容两两对阵，输出胜率矩阵、95% 置信区间与平均对局轮数。
+
+结果按阵容组合缓存（与选角胜率表共用同一个缓存文件）。每个组合的键包含 config.yaml 的对局设置、
+引擎/模拟器/卡牌/策略源码（连同它们导入的 LingCard 模块），以及这两个阵容中各角色的源码摘要；只改动一个角色后重新运行，
+只会重新模拟包含该角色的组合。
+
+对局分批派给工作进程，每批结果返回后立即合并；指定 --target-width 或 --stop-decided 时，
+胜率区间足够窄或已明显偏离 50%（序贯边界，见 sim.stats）的组合提前停止，--games 只作为上限。
+缓存条目的 stop 字段记录停止原因；因“已分出高下”提前停止的组合胜率估计偏向极端，
+选角胜率表不使用这类条目，以固定局数重新运行时会在原有结果上补足局数。
+
+用法: python -m LingCard.sim.matchups --games 400 --target-width 0.1 --stop-decided --csv matchups.csv
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import queue
+from collections import deque
+from itertools import combinations
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from LingCard.cards.action_card import ActionCard
+from LingCard.characters.character import Character
+from LingCard.core.game_engine import GameEngine
+from LingCard.sim import simulator
+from LingCard.sim.simulator import play_game
+from LingCard.sim.stats import MatchupStats, StopRule
+from LingCard.strategies.greedy import GreedyAI
+from LingCard.utils.digest import config_digest, source_digest
+from LingCard.utils.loader import load_cards, load_characters, load_strategies
+
+CACHE_VERSION = 4
+Lineup = Tuple[str, ...]
+
+def pairing_key(config, strategy_class, lineup_a, lineup_b, char_classes, card_classes) -> str:
+    """阵容组合的缓存键，与两个阵容的先后顺序无关"""
+    a, b = sorted([tuple(sorted(lineup_a)), tuple(sorted(lineup_b))])
+    parts = [
+        config_digest(config, 'game_settings', 'team_effects'),
+        source_digest(GameEngine, Character, ActionCard, simulator, strategy_class, *card_classes.values()),
+        "-".join(a), "-".join(b),
+    ] + [source_digest(char_classes[name]) for name in a + b]
+    return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()
+
+def _simulate_batch(args) -> Dict:
+    """模拟一个组合的一批对局，按全局局号轮换先后手，返回可合并的 MatchupStats"""
+    config, lineup_a, lineup_b, start, count, strategy_class = args
+    engine = GameEngine(config)
+    char_classes, card_classes = load_characters(), load_cards()
+    strategies = [strategy_class(engine), strategy_class(engine)]
+    stats = MatchupStats()
+    for game_idx in range(start, start + count):
+        turn_order = [0, 1] if game_idx % 2 == 0 else [1, 0]
+        result = play_game(engine, [lineup_a, lineup_b], strategies, char_classes, card_classes, turn_order=turn_order)
+        stats.record(result['winner'], result['rounds'])
+    return stats.to_dict()
+
+def all_lineups(config, char_classes) -> List[Lineup]:
+    return list(combinations(sorted(char_classes), config['game_settings']['characters_per_player']))
+
+def read_cache(path: str) -> Dict[str, Dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != CACHE_VERSION:
+        return {}
+    return data.get('pairings', {})
+
+class _PairingRun:
+    """调度中的一个组合：已合并的结果与在途批次"""
+
+    def __init__(self, key: str, lineups, stats: MatchupStats):
+        self.key = key
+        self.lineups = lineups
+        self.stats = stats
+        self.in_flight = 0 # 在途对局数
+        self.reason: Optional[str] = None
+
+def simulate_pairings(config, path: str, games: int = 200, jobs: int = 1, strategy_class=GreedyAI,
+                      verbose: bool = False, stop_rule: Optional[StopRule] = None,
+                      batch_size: int = 10) -> Tuple[List[Lineup], List[Dict]]:
+    """
+    增量模拟所有阵容组合。对局按 batch_size 分批派给进程池，每批返回后立即合并，
+    由 stop_rule 决定该组合是否继续加局（默认固定 games 局）。
+    缓存中已满足停止规则的组合直接复用，不满足的在原有结果上继续补局。
+    返回 (全部阵容, 各组合的统计)。写回缓存时只清除本策略的过期条目，其他策略的结果原样保留。
+    """
+    stop_rule = stop_rule or StopRule(games, min_games=games)
+    batch_size = max(2, batch_size + batch_size % 2) # 偶数局，先后手各半
+    char_classes, card_classes = load_characters(), load_cards()
+    lineups = all_lineups(config, char_classes)
+    cache = read_cache(path)
+
+    runs = []
+    for a, b in combinations(lineups, 2):
+        key = pairing_key(config, strategy_class, a, b, char_classes, card_classes)
+        stats = MatchupStats.from_dict(cache[key]) if key in cache else MatchupStats()
+        run = _PairingRun(key, (a, b), stats)
+        run.reason = stop_rule.check(stats)
+        runs.append(run)
+    active = deque(run for run in runs if run.reason is None)
+    if verbose:
+        print(f"共 {len(runs)} 个组合，复用缓存 {len(runs) - len(active)} 个，需要模拟 {len(active)} 个")
+
+    total = len(active)
+    finished = queue.Queue()
+    pending = 0
+    done_count = 0
+    with Pool(jobs) as pool:
+        def submit():
+            # 轮流给仍需加局的组合派批次，在途批次数保持为进程数的两倍
+            nonlocal pending
+            for _ in range(len(active)):
+                if pending >= 2 * jobs:
+                    return
+                run = active.popleft()
+                count = min(batch_size, stop_rule.max_games - run.stats.games - run.in_flight)
+                if count <= 0:
+                    continue
+                active.append(run)
+                args = (config, run.lineups[0], run.lineups[1], run.stats.games + run.in_flight, count, strategy_class)
+                run.in_flight += count
+                pending += 1
+                pool.apply_async(_simulate_batch, (args,),
+                                 callback=lambda result, run=run, count=count: finished.put((run, count, result)),
+                                 error_callback=lambda error, run=run, count=count: finished.put((run, count, error)))
+
+        submit()
+        while pending:
+            run, count, result = finished.get()
+            pending -= 1
+            if isinstance(result, BaseException):
+                raise result
+            run.in_flight -= count
+            run.stats.merge(MatchupStats.from_dict(result))
+            if run.reason is None:
+                run.reason = stop_rule.check(run.stats)
+                if run.reason is not None and run in active:
+                    active.remove(run)
+            if run.reason is not None and run.in_flight == 0:
+                done_count += 1
+                if verbose:
+                    low, high = run.stats.interval(stop_rule.z)
+                    print(f"[{done_count}/{total}] {'-'.join(run.lineups[0])} vs {'-'.join(run.lineups[1])}: "
+                          f"{run.stats.wins[0]}胜 {run.stats.wins[1]}负 {run.stats.draws}平，"
+                          f"胜率 {run.stats.win_rate:.1%} [{low:.1%}, {high:.1%}]（{run.reason}）")
+            submit()
+
+    pairings = {run.key: {'lineups': [list(lineup) for lineup in run.lineups], 'strategy': strategy_class.name,
+                          'stop': run.reason, **run.stats.to_dict()} for run in runs}
+    others = {key: entry for key, entry in cache.items() if entry.get('strategy') != strategy_class.name}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'pairings': {**others, **pairings}}, f, ensure_ascii=False, indent=1)
+    return lineups, list(pairings.values())
+
+
+class MatchupMatrix:
+    """阵容对阵矩阵：行阵容对列阵容的胜率（平局记半场）、置信区间与平均轮数"""
+
+    def __init__(self, lineups: List[Lineup], entries: List[Dict]):
+        self.lineups = lineups
+        self.cells: Dict[Tuple[Lineup, Lineup], Dict] = {}
+        for entry in entries:
+            a, b = (tuple(sorted(lineup)) for lineup in entry['lineups'])
+            stats = MatchupStats.from_dict(entry)
+            low, high = stats.interval()
+            shared = {'games': stats.games, 'rounds': stats.rounds.mean, 'rounds_std': stats.rounds.std}
+            self.cells[(a, b)] = {'win_rate': stats.win_rate, 'low': low, 'high': high, **shared}
+            self.cells[(b, a)] = {'win_rate': 1 - stats.win_rate, 'low': 1 - high, 'high': 1 - low, **shared}
+
+    def cell(self, lineup, opponent) -> Dict:
+        return self.cells.get((tuple(sorted(lineup)), tuple(sorted(opponent))))
+
+    def overall(self, lineup) -> float:
+        """对其余所有阵容的平均胜率"""
+        rates = [self.cells[(tuple(lineup), opp)]['win_rate'] for opp in self.lineups
+                 if (tuple(lineup), opp) in self.cells]
+        return sum(rates) / len(rates) if rates else 0.5
+
+    def rows(self) -> List[Dict]:
+        rows = []
+        for lineup in self.lineups:
+            for opponent in self.lineups:
+                cell = self.cell(lineup, opponent)
+                if cell is not None:
+                    rows.append({'lineup': "-".join(lineup), 'opponent': "-".join(opponent), **cell})
+        return rows
+
+    def print_table(self):
+        labels = ["-".join(lineup) for lineup in self.lineups]
+        width = max(len(label) for label in labels) + 2
+        print(" " * (width + 4) + "".join(f"{i:>8}" for i in range(len(labels))) + f"{'平均':>8}")
+        for i, lineup in enumerate(self.lineups):
+            cells = []
+            for opponent in self.lineups:
+                cell = self.cell(lineup, opponent)
+                cells.append(f"{cell['win_rate']:>8.1%}" if cell else f"{'-':>8}")
+            print(f"{labels[i]:<{width}}{i:>4}" + "".join(cells) + f"{self.overall(lineup):>8.1%}")
+
+        print()
+        print(f"{'阵容':<{width}}{'对手':<{width}}{'胜率':>8}{'95% 区间':>18}{'局数':>6}{'平均轮数':>10}")
+        for a, b in combinations(self.lineups, 2):
+            cell = self.cell(a, b)
+            if cell is None:
+                continue
+            interval = f"[{cell['low']:.1%}, {cell['high']:.1%}]"
+            print(f"{'-'.join(a):<{width}}{'-'.join(b):<{width}}{cell['win_rate']:>8.1%}{interval:>18}"
+                  f"{cell['games']:>6}{cell['rounds']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="阵容两两对阵的胜率矩阵")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--cache', default='draft_table.json', help="组合结果缓存，与选角胜率表共用")
+    parser.add_argument('--games', type=int, default=200, help="每个阵容组合最多模拟的局数")
+    parser.add_argument('--target-width', type=float, default=None, help="胜率 95%% 区间窄于该宽度即停止，如 0.1")
+    parser.add_argument('--stop-decided', action='store_true', help="胜率明显偏离 50%% 即停止（序贯边界）")
+    parser.add_argument('--alpha', type=float, default=0.05, help="--stop-decided 把五五开的组合误判为分出高下的总概率")
+    parser.add_argument('--min-games', type=int, default=20, help="提前停止前至少模拟的局数")
+    parser.add_argument('--batch-size', type=int, default=10, help="每次派给工作进程的局数")
+    parser.add_argument('--strategy', default=GreedyAI.name, help="双方使用的策略名")
+    parser.add_argument('--csv', default=None, help="把每个格子的胜率、置信区间与平均轮数写入 CSV")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    strategy_class = load_strategies()[args.strategy]
+    stop_rule = None
+    if args.target_width is not None or args.stop_decided:
+        stop_rule = StopRule(args.games, args.target_width, min_games=args.min_games,
+                             stop_when_decided=args.stop_decided, alpha=args.alpha)
+    lineups, entries = simulate_pairings(config, args.cache, args.games, args.jobs, strategy_class,
+                                         verbose=True, stop_rule=stop_rule, batch_size=args.batch_size)
+    matrix = MatchupMatrix(lineups, entries)
+    matrix.print_table()
+
+    if args.csv:
+        with open(args.csv, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['lineup', 'opponent', 'win_rate', 'low', 'high', 'games', 'rounds', 'rounds_std'])
+            writer.writeheader()
+            writer.writerows(matrix.rows())
+        print(f"已写入 {args.csv}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+# LingCard/sim/selfplay.py
+"""
+自对弈数据集生成：多个生产进程用任意策略对局，把每一步的
+(局面编码, 动作掩码, 所选动作, 终局结果) 写入压缩分片，并在清单中登记。
+
+局面编码见 LingCard.ai.features.StateEncoder，动作编码与掩码见 LingCard.sim.env.ActionSpace；
+结果以行动方视角给出：胜 1，负 -1，平 0。
+
+第 w 个生产进程负责第 w, w+P, w+2P... 局，每局的随机种子只由总种子和局号决定。
+分片只含完整的对局：一局结束后缓冲区满 shard_size 条就整体写出，因此每个分片至少 shard_size 条、
+最多再多一局。清单每行记录一个分片以及写完它之后该进程的下一局序号，中断后用相同参数重新运行即从断点继续，
+没写完的那一局整局重打（设置了思考时间时重打的对局可能与中断前不同，但不会与中断前的半局拼在一起）。
+内存中最多只保留一个分片加一局的记录。
+
+开启去重时，同一进程内重复出现的局面只保留第一次。已见过的局面记在固定大小的布隆过滤器（PositionFilter）中，
+内存占用与局面数无关：按 dedup_capacity 个不同局面、误判率 dedup_error 确定大小（每个局面约
+-ln(dedup_error) / ln(2)^2 位，默认 1000 万个局面、0.1% 误判约 17 MB）。误判的代价是把一个新局面当作重复丢弃；
+插入的局面超过 dedup_capacity 后误判率逐渐升高。过滤器随每个分片写成检查点文件，在清单中登记，续跑时直接载入。
+
+用法: python -m LingCard.sim.selfplay greedy rollout --games 100000 --producers 4 --output selfplay
+"""
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import random
+from itertools import combinations
+from multiprocessing import Process, Queue
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import yaml
+
+from LingCard.ai.anytime import AnytimeAI
+from LingCard.ai.features import StateEncoder
+from LingCard.core.flow import StrategyController, game_flow, run_flow
+from LingCard.core.game_engine import GameEngine
+from LingCard.core.game_state import GameState
+from LingCard.sim.env import ActionSpace
+from LingCard.strategies.greedy import GreedyAI
+from LingCard.utils.loader import load_cards, load_characters, load_strategies
+
+MANIFEST = 'manifest.jsonl'
+
+def position_key(features: np.ndarray, mask: np.ndarray) -> int:
+    digest = hashlib.blake2b(features.tobytes() + mask.tobytes(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+def game_seed(seed: int, game: int) -> int:
+    return int.from_bytes(hashlib.sha1(f"{seed}|{game}".encode('utf-8')).digest()[:4], 'little')
+
+
+class PositionFilter:
+    """布隆过滤器：判断 64 位局面键是否出现过，可能误判为出现过，不会漏判"""
+
+    def __init__(self, capacity: int, error: float):
+        self.size = max(8, math.ceil(-capacity * math.log(error) / math.log(2) ** 2)) # 位数
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0 # 已插入的不同局面数（不含误判为重复的）
+
+    def add(self, key: int) -> bool:
+        """加入局面键，返回加入前是否（可能）已经出现过"""
+        # 双重散列：由键的高低 32 位派生 hashes 个位置
+        low, step = key & 0xFFFFFFFF, (key >> 32) | 1
+        seen = True
+        for i in range(self.hashes):
+            bit = (low + i * step) % self.size
+            mask = 1 << (bit & 7)
+            if not self.bits[bit >> 3] & mask:
+                self.bits[bit >> 3] |= mask
+                seen = False
+        if not seen:
+            self.count += 1
+        return seen
+
+    def save(self, path: str):
+        with open(path + '.tmp', 'wb') as f:
+            f.write(self.count.to_bytes(8, 'little'))
+            f.write(self.bits)
+        os.replace(path + '.tmp', path)
+
+    def load(self, path: str):
+        with open(path, 'rb') as f:
+            self.count = int.from_bytes(f.read(8), 'little')
+            if f.readinto(self.bits) != len(self.bits):
+                raise ValueError(f"{path} 与当前的去重参数不符")
+
+
+class _RecordingController(StrategyController):
+    """交出每个行动（含结束回合）之前记录当时的局面"""
+
+    def __init__(self, strategy, record):
+        super().__init__(strategy)
+        self.record = record
+
+    def next_move(self, request):
+        move = super().next_move(request)
+        self.record(request, move)
+        return move
+
+
+class _Producer:
+    """单个生产进程：对局、记录、去重，攒够 shard_size 条后在对局边界写出分片"""
+
+    def __init__(self, config, params: Dict, producer: int, output: str, queue):
+        self.params = params
+        self.producer = producer
+        self.output = output
+        self.queue = queue
+        self.engine = GameEngine(config)
+        self.char_classes, self.card_classes = load_characters(), load_cards()
+        self.encoder = StateEncoder.from_config(config, self.char_classes)
+        self.actions = ActionSpace.from_config(config)
+        self.lineups = list(combinations(sorted(self.char_classes), config['game_settings']['characters_per_player']))
+
+        strategy_classes = load_strategies()
+        names = params['strategies']
+        self.strategies = []
+        for name in (names * 2)[:2]:
+            strategy = strategy_classes[name](self.engine)
+            if params['time_budget'] is not None:
+                strategy = AnytimeAI(strategy, GreedyAI(self.engine), params['time_budget'])
+            self.strategies.append(strategy)
+        self.buffer: List[tuple] = []
+        self.seen: Optional[PositionFilter] = None
+        if params['dedup']:
+            self.seen = PositionFilter(params['dedup_capacity'], params['dedup_error'])
+
+    def run(self, seq: int, next_game: int, checkpoint: Optional[str]):
+        if self.seen is not None and checkpoint is not None:
+            self.seen.load(os.path.join(self.output, checkpoint))
+
+        producers = self.params['producers']
+        index = next_game
+        while index * producers + self.producer < self.params['games']:
+            game = index * producers + self.producer
+            for ply, record in enumerate(self._play(game)):
+                if self.seen is not None and self.seen.add(record[-1]):
+                    continue
+                self.buffer.append((ply,) + record)
+            index += 1
+            # 只在一局结束后写分片：分片与过滤器检查点都停在对局边界上
+            if len(self.buffer) >= self.params['shard_size']:
+                seq = self._flush(seq, index)
+        if self.buffer:
+            self._flush(seq, index)
+        self.queue.put({'type': 'done', 'producer': self.producer})
+
+    def _play(self, game: int) -> List[tuple]:
+        rng = random.Random(game_seed(self.params['seed'], game))
+        lineups = [rng.choice(self.lineups), rng.choice(self.lineups)]
+        turn_order = [0, 1] if rng.random() < 0.5 else [1, 0]
+
+        engine = self.engine
+        game_state = GameState()
+        game_state.rng = random.Random(rng.getrandbits(32))
+        engine.setup_game(game_state, lineups, self.char_classes, self.card_classes, turn_order)
+        steps = []
+        record = lambda request, move: steps.append(self._snapshot(request.game_state, move) + (request.player_id,))
+        controllers = {player.id: _RecordingController(strategy, record)
+                       for player, strategy in zip(game_state.players, self.strategies)}
+        run_flow(game_flow(engine, game_state, self.params['max_rounds']), controllers)
+
+        records = []
+        for features, mask, action, player_id in steps:
+            if game_state.winner is None:
+                outcome = 0
+            else:
+                outcome = 1 if game_state.winner == player_id else -1
+            records.append((game, features, mask, action, outcome, position_key(features, mask)))
+        return records
+
+    def _snapshot(self, game_state, move):
+        features = self.encoder.encode(game_state)
+        mask = self.actions.mask(self.engine, game_state)
+        return features, mask, self.actions.encode(game_state, move)
+
+    def _flush(self, seq: int, next_index: int) -> int:
+        """把缓冲区中的完整对局写成一个分片；next_index 之前的局都已写完"""
+        rows, self.buffer = self.buffer, []
+
+        name = f"shard-{self.producer:03d}-{seq:06d}.npz"
+        data = io.BytesIO()
+        np.savez_compressed(
+            data,
+            features=np.stack([row[2] for row in rows]),
+            masks=np.stack([row[3] for row in rows]),
+            actions=np.array([row[4] for row in rows], dtype=np.int16),
+            outcomes=np.array([row[5] for row in rows], dtype=np.int8),
+            games=np.array([row[1] for row in rows], dtype=np.int64),
+            plies=np.array([row[0] for row in rows], dtype=np.int32),
+            keys=np.array([row[6] for row in rows], dtype=np.uint64),
+        )
+        path = os.path.join(self.output, name)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data.getbuffer())
+        os.replace(path + '.tmp', path)
+
+        checkpoint = None
+        if self.seen is not None:
+            checkpoint = f"dedup-{self.producer:03d}-{seq:06d}.bin"
+            self.seen.save(os.path.join(self.output, checkpoint))
+        self.queue.put({'type': 'shard', 'file': name, 'records': len(rows), 'producer': self.producer,
+                        'seq': seq, 'next_game': next_index, 'dedup': checkpoint})
+        return seq + 1
+
+def _run_producer(config, params, producer, output, queue, seq, next_game, checkpoint):
+    _Producer(config, params, producer, output, queue).run(seq, next_game, checkpoint)
+
+
+class SelfPlayGenerator:
+    """调度生产进程并维护清单"""
+
+    def __init__(self, config, strategies: List[str], games: int, output: str, producers: int = 1,
+                 shard_size: int = 65536, seed: int = 0, dedup: bool = False,
+                 time_budget: Optional[float] = None, max_rounds: int = 100,
+                 dedup_capacity: int = 10_000_000, dedup_error: float = 0.001):
+        self.config = config
+        self.output = output
+        self.params = {
+            'strategies': list(strategies), 'games': games, 'producers': producers,
+            'shard_size': shard_size, 'seed': seed, 'dedup': dedup,
+            'time_budget': time_budget, 'max_rounds': max_rounds,
+        }
+        if dedup:
+            self.params.update(dedup_capacity=dedup_capacity, dedup_error=dedup_error)
+        self.shards: List[Dict] = []
+
+    def run(self, verbose: bool = False) -> int:
+        """生成（或续跑）数据集，返回清单中的记录总数"""
+        os.makedirs(self.output, exist_ok=True)
+        manifest_path = os.path.join(self.output, MANIFEST)
+        self._load_manifest(manifest_path)
+
+        queue = Queue()
+        procs = []
+        for producer in range(self.params['producers']):
+            own = [s for s in self.shards if s['producer'] == producer]
+            last = own[-1] if own else {'next_game': 0, 'dedup': None}
+            proc = Process(target=_run_producer, daemon=True, args=(
+                self.config, self.params, producer, self.output, queue,
+                len(own), last['next_game'], last['dedup']))
+            proc.start()
+            procs.append(proc)
+
+        with open(manifest_path, 'a', encoding='utf-8') as manifest:
+            if os.path.getsize(manifest_path) == 0:
+                self._write(manifest, {'type': 'header', 'params': self.params})
+            running = len(procs)
+            while running:
+                record = queue.get()
+                if record['type'] == 'done':
+                    running -= 1
+                    continue
+                previous = next((s for s in reversed(self.shards) if s['producer'] == record['producer']), None)
+                self.shards.append(record)
+                self._write(manifest, record)
+                # 新检查点已登记，上一个检查点不再需要
+                if previous is not None and previous['dedup']:
+                    os.remove(os.path.join(self.output, previous['dedup']))
+                if verbose:
+                    print(f"进程 {record['producer']} 写出 {record['file']}（{record['records']} 条），"
+                          f"累计 {self.total_records()} 条")
+        for proc in procs:
+            proc.join()
+        return self.total_records()
+
+    def total_records(self) -> int:
+        return sum(shard['records'] for shard in self.shards)
+
+    def _load_manifest(self, path: str):
+        self.shards = []
+        if not os.path.exists(path):
+            return
+        valid_size = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                valid_size += len(line)
+                if record['type'] == 'header' and record['params'] != self.params:
+                    raise ValueError(f"{path} 属于参数不同的另一个数据集，请换一个输出目录")
+                elif record['type'] == 'shard':
+                    self.shards.append(record)
+        # 截掉中断时写了一半的最后一行
+        with open(path, 'r+b') as f:
+            f.truncate(valid_size)
+
+    @staticmethod
+    def _write(manifest, record: Dict):
+        manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+        manifest.flush()
+
+
+def iter_shards(directory: str) -> Iterator[Dict[str, np.ndarray]]:
+    """按清单顺序逐个读出分片，每次只有一个分片在内存中"""
+    with open(os.path.join(directory, MANIFEST), 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record['type'] != 'shard':
+                continue
+            with np.load(os.path.join(directory, record['file'])) as shard:
+                yield {key: shard[key] for key in shard.files}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成自对弈训练数据")
+    parser.add_argument('strategies', nargs='+', help="双方使用的策略名，只给一个时双方相同")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--output', default='selfplay')
+    parser.add_argument('--producers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shard-size', type=int, default=65536, help="每个分片的记录数")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dedup', action='store_true', help="丢弃重复出现的局面")
+    parser.add_argument('--dedup-capacity', type=int, default=10_000_000,
+                        help="每个生产进程预计的不同局面数，决定去重过滤器的大小")
+    parser.add_argument('--dedup-error', type=float, default=0.001, help="去重过滤器的误判率（新局面被当作重复丢弃）")
+    parser.add_argument('--time-budget', type=float, default=None, help="每回合思考时间上限（秒）")
+    parser.add_argument('--max-rounds', type=int, default=100)
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    generator = SelfPlayGenerator(config, args.strategies, args.games, args.output, args.producers,
+                                  args.shard_size, args.seed, args.dedup, args.time_budget, args.max_rounds,
+                                  args.dedup_capacity, args.dedup_error)
+    total = generator.run(verbose=True)
+    print(f"数据集 {args.output} 共 {len(generator.shards)} 个分片，{total} 条记录")
+
+if __name__ == "__main__":
+    main()
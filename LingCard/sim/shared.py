@@ -0,0 +1,27 @@
+# LingCard/sim/shared.py
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+class SharedArrays:
+    """一组位于同一块共享内存中的 NumPy 数组"""
+
+    def __init__(self, specs: Dict[str, Tuple[Tuple[int, ...], str]], name: Optional[str] = None):
+        self.specs = specs
+        layout, offset = {}, 0
+        for key, (shape, dtype) in specs.items():
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            layout[key] = offset
+            offset += -(-nbytes // 8) * 8
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=max(offset, 8))
+        self.arrays = {
+            key: np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=layout[key])
+            for key, (shape, dtype) in specs.items()
+        }
+
+    def close(self, unlink: bool = False):
+        self.arrays = {}
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
@@ -0,0 +1,20 @@
+# LingCard/sim/simulator.py
+from typing import Dict, Any
+from LingCard.core.flow import StrategyController, game_flow, run_flow
+from LingCard.core.game_state import GameState
+
+def play_game(engine, lineups, strategies, char_classes, card_classes,
+              max_rounds: int = 100, turn_order=None, rng=None) -> Dict[str, Any]:
+    """
+    无界面地打完一局。strategies[i] 控制 lineups[i] 对应的玩家。
+    rng 为本局专用的随机数发生器（random.Random），默认使用全局 random。
+    返回 {'winner': 获胜玩家索引（0/1，超过 max_rounds 判平局为 None）, 'rounds': 进行的轮数}
+    """
+    game_state = GameState()
+    game_state.rng = rng
+    engine.setup_game(game_state, lineups, char_classes, card_classes, turn_order)
+    # 能直接在真实状态上行动的策略（如贪心）省去一次状态复制
+    controllers = {player.id: StrategyController(strategy, in_place=True)
+                   for player, strategy in zip(game_state.players, strategies)}
+    winner = run_flow(game_flow(engine, game_state, max_rounds), controllers)
+    return {'winner': winner - 1 if winner is not None else None, 'rounds': game_state.current_round}
@@ -0,0 +1,173 @@
+# LingCard/sim/stats.py
+"""
+模拟批次的在线统计与序贯停止规则。
+
+RunningStats 用 Welford 算法流式累计均值与方差，并能与其他工作进程的统计合并（Chan 合并公式）；
+MatchupStats 累计一个对阵的胜/平/负与对局轮数；StopRule 决定一个对阵何时可以停止加局：
+胜率区间已足够窄，或已明显偏离 50%，或用完局数上限。
+
+“明显偏离 50%”不能每批都拿固定 95% 区间去判断：反复查看会让胜率其实是 50% 的对阵被误判为分出高下的概率
+远超 5%。这里改用连续监测的 O'Brien-Fleming 边界：把局数上限 N 当作全部信息量，在打了 n 局时，
+当累计得分与 n/2 之差超过 c·0.5·√N 时停止，c 取使布朗运动在 [0, 1] 上越过 ±c 的概率为 alpha 的值
+（alpha=0.05 时 c≈2.24）。得分方差按不超过 0.25 计算，只在批次之间检查，因此实际误判率不超过 alpha。
+边界在早期很严、接近上限时接近固定样本的临界值。提前停止的对阵胜率估计仍偏向极端，使用者应区别对待（见 matchups）。
+"""
+import math
+from typing import Dict, Optional, Tuple
+
+def _normal_sf(x: float) -> float:
+    return 0.5 * math.erfc(x / math.sqrt(2))
+
+def crossing_boundary(alpha: float = 0.05) -> float:
+    """布朗运动在 [0, 1] 上 |B(t)| 越过 c 的概率恰为 alpha 的 c（连续监测的 O'Brien-Fleming 边界）"""
+    def crossing(c):
+        return 4 * sum((-1) ** k * _normal_sf((2 * k + 1) * c) for k in range(20))
+    low, high = 0.1, 10.0
+    for _ in range(100):
+        mid = (low + high) / 2
+        if crossing(mid) > alpha:
+            low = mid
+        else:
+            high = mid
+    return high
+
+def wilson_interval(score: float, n: int, z: float = 1.96) -> Tuple[float, float]:
+    """胜率的 Wilson 置信区间；score 可以含平局记的半场"""
+    if n == 0:
+        return 0.0, 1.0
+    p = score / n
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class RunningStats:
+    """流式均值/方差"""
+
+    def __init__(self, n: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    def push(self, x: float):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def merge(self, other: 'RunningStats'):
+        if other.n == 0:
+            return
+        total = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / total
+        self.m2 += other.m2 + delta * delta * self.n * other.n / total
+        self.n = total
+
+    @property
+    def variance(self) -> float:
+        """样本方差（n-1 为分母）"""
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict:
+        return {'n': self.n, 'mean': self.mean, 'm2': self.m2}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RunningStats':
+        return cls(data['n'], data['mean'], data['m2'])
+
+
+class MatchupStats:
+    """一个对阵（A 对 B）的累计结果，胜率以 A 为准，平局记半场"""
+
+    def __init__(self):
+        self.wins = [0, 0]
+        self.draws = 0
+        self.rounds = RunningStats()
+
+    @property
+    def games(self) -> int:
+        return self.wins[0] + self.wins[1] + self.draws
+
+    @property
+    def score(self) -> float:
+        return self.wins[0] + 0.5 * self.draws
+
+    @property
+    def win_rate(self) -> float:
+        return self.score / self.games if self.games else 0.5
+
+    @property
+    def score_variance(self) -> float:
+        """单局得分（1/0.5/0）的样本方差"""
+        n = self.games
+        if n < 2:
+            return 0.0
+        mean = self.win_rate
+        total_sq = self.wins[0] + 0.25 * self.draws
+        return max(0.0, (total_sq - n * mean * mean) / (n - 1))
+
+    def record(self, winner: Optional[int], rounds: int):
+        """winner 为 0（A 胜）、1（B 胜）或 None（平局）"""
+        if winner is None:
+            self.draws += 1
+        else:
+            self.wins[winner] += 1
+        self.rounds.push(rounds)
+
+    def merge(self, other: 'MatchupStats'):
+        self.wins[0] += other.wins[0]
+        self.wins[1] += other.wins[1]
+        self.draws += other.draws
+        self.rounds.merge(other.rounds)
+
+    def interval(self, z: float = 1.96) -> Tuple[float, float]:
+        return wilson_interval(self.score, self.games, z)
+
+    def to_dict(self) -> Dict:
+        return {'wins': list(self.wins), 'draws': self.draws, 'games': self.games,
+                'rounds': self.rounds.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'MatchupStats':
+        stats = cls()
+        stats.wins = list(data['wins'])
+        stats.draws = data['draws']
+        stats.rounds = RunningStats.from_dict(data['rounds'])
+        return stats
+
+
+class StopRule:
+    """
+    序贯停止规则。max_games 为局数上限；target_width 为区间宽度目标（None 表示不按宽度停止）；
+    stop_when_decided 时得分越过 O'Brien-Fleming 边界（总误判率 alpha，见模块说明）即停止。
+    至少打满 min_games 局才检查前两条。
+    """
+
+    def __init__(self, max_games: int, target_width: Optional[float] = None, z: float = 1.96,
+                 min_games: int = 20, stop_when_decided: bool = False, alpha: float = 0.05):
+        self.max_games = max_games
+        self.target_width = target_width
+        self.z = z
+        self.min_games = min_games
+        self.stop_when_decided = stop_when_decided
+        # 得分与 n/2 之差的停止阈值，在整个局数上限内不变
+        self.decided_margin = crossing_boundary(alpha) * 0.5 * math.sqrt(max_games)
+
+    def check(self, stats: MatchupStats) -> Optional[str]:
+        """返回停止原因（'budget' / 'precise' / 'decided'），还需加局时返回 None"""
+        if stats.games >= self.max_games:
+            return 'budget'
+        if stats.games < self.min_games:
+            return None
+        low, high = stats.interval(self.z)
+        if self.target_width is not None and high - low <= self.target_width:
+            return 'precise'
+        if self.stop_when_decided and abs(stats.score - stats.games / 2) >= self.decided_margin:
+            return 'decided'
+        return None
@@ -0,0 +1,235 @@
+# LingCard/sim/sweep.py
+"""
+配置参数扫描：按网格、随机或拉丁超立方设计生成一组 game_settings 取值，
+每个取值点并行模拟若干局，把平衡性指标写入同一个 CSV 文件。
+
+参数名是 game_settings 下的点分路径，例如
+  initial_hp、initial_hand_size、characters_per_player、
+  deck_composition.AttackCard、card_values.AttackCard（见 GameEngine.get_card_value）
+取值写成 "a,b,c"（离散取值）或 "lo:hi"（闭区间，两端都是整数时取整数）。
+
+CSV 本身就是检查点：每完成一个点追加一行，中断后用相同参数重新运行即跳过已完成的点。
+
+用法: python -m LingCard.sim.sweep --param initial_hp=10:20 --param deck_composition.AttackCard=6,8,10,12 \\
+          --design lhs --points 40 --games 200 --output sweep.csv
+"""
+import argparse
+import copy
+import csv
+import hashlib
+import os
+import random
+from collections import defaultdict
+from itertools import combinations, product
+from multiprocessing import Pool
+from typing import Dict, List, Sequence
+
+import yaml
+
+from LingCard.core.game_engine import GameEngine
+from LingCard.sim.simulator import play_game
+from LingCard.sim.stats import MatchupStats, RunningStats
+from LingCard.utils.loader import load_cards, load_characters, load_strategies
+
+METRICS = ['games', 'first_player_win_rate', 'first_player_low', 'first_player_high', 'draw_rate',
+           'avg_rounds', 'rounds_std', 'char_win_rate_std', 'char_win_rate_min', 'char_win_rate_max']
+
+
+class Parameter:
+    """一个扫描维度：离散取值列表或数值区间"""
+
+    def __init__(self, name: str, values: Sequence = None, low=None, high=None):
+        self.name = name
+        self.values = list(values) if values is not None else None
+        self.low, self.high = low, high
+
+    @classmethod
+    def parse(cls, text: str) -> 'Parameter':
+        """解析 "name=a,b,c" 或 "name=lo:hi" """
+        name, _, spec = text.partition('=')
+        if not spec:
+            raise ValueError(f"参数格式应为 name=a,b,c 或 name=lo:hi: {text}")
+        if ':' in spec:
+            low, high = (yaml.safe_load(part) for part in spec.split(':', 1))
+            return cls(name.strip(), low=low, high=high)
+        return cls(name.strip(), values=[yaml.safe_load(part) for part in spec.split(',')])
+
+    @property
+    def is_integer(self) -> bool:
+        return isinstance(self.low, int) and isinstance(self.high, int)
+
+    def grid_values(self) -> List:
+        if self.values is not None:
+            return self.values
+        if not self.is_integer:
+            raise ValueError(f"网格设计中的连续区间参数 {self.name} 需要改写为离散取值")
+        return list(range(self.low, self.high + 1))
+
+    def from_unit(self, u: float):
+        """把 [0, 1) 上的数映射为该参数的一个取值"""
+        if self.values is not None:
+            return self.values[min(int(u * len(self.values)), len(self.values) - 1)]
+        if self.is_integer:
+            return min(self.low + int(u * (self.high - self.low + 1)), self.high)
+        return self.low + u * (self.high - self.low)
+
+
+def make_design(params: List[Parameter], design: str, points: int = 0, seed: int = 0) -> List[Dict]:
+    """生成设计点列表 [{参数名: 取值}]，同样的参数与种子总是得到同样的列表"""
+    names = [p.name for p in params]
+    if design == 'grid':
+        return [dict(zip(names, combo)) for combo in product(*(p.grid_values() for p in params))]
+
+    rng = random.Random(seed)
+    if design == 'random':
+        return [{p.name: p.from_unit(rng.random()) for p in params} for _ in range(points)]
+    if design == 'lhs':
+        # 拉丁超立方：每个维度的 points 个分层各取一次
+        columns = []
+        for p in params:
+            strata = list(range(points))
+            rng.shuffle(strata)
+            columns.append([p.from_unit((s + rng.random()) / points) for s in strata])
+        return [dict(zip(names, row)) for row in zip(*columns)]
+    raise ValueError(f"未知的设计类型: {design}")
+
+def apply_point(config, point: Dict) -> Dict:
+    """返回把 point 写入 game_settings 后的配置副本"""
+    config = copy.deepcopy(config)
+    for name, value in point.items():
+        node = config['game_settings']
+        *parents, leaf = name.split('.')
+        for key in parents:
+            if not isinstance(node.get(key), dict):
+                node[key] = {}
+            node = node[key]
+        node[leaf] = value
+    return config
+
+
+def _run_point(task) -> Dict:
+    """在一个设计点上模拟 games 局：随机阵容、先后手轮换，统计先手胜率、对局长度与各角色胜率"""
+    index, point, config, games, seed, strategy_name = task
+    config = apply_point(config, point)
+    engine = GameEngine(config)
+    char_classes, card_classes = load_characters(), load_cards()
+    strategy_class = load_strategies()[strategy_name]
+    strategies = [strategy_class(engine), strategy_class(engine)]
+    lineups = list(combinations(sorted(char_classes), config['game_settings']['characters_per_player']))
+
+    first_player = MatchupStats() # “A”为先手方
+    char_scores = defaultdict(RunningStats)
+    for game_idx in range(games):
+        digest = hashlib.sha1(f"{seed}|{index}|{game_idx}".encode('utf-8')).digest()
+        rng = random.Random(int.from_bytes(digest[:4], 'little'))
+        pair = [rng.choice(lineups), rng.choice(lineups)]
+        turn_order = [0, 1] if game_idx % 2 == 0 else [1, 0]
+        result = play_game(engine, pair, strategies, char_classes, card_classes, turn_order=turn_order,
+                           rng=random.Random(rng.getrandbits(32)))
+
+        winner = result['winner']
+        first_player.record(None if winner is None else int(winner != turn_order[0]), result['rounds'])
+        for side, lineup in enumerate(pair):
+            score = 0.5 if winner is None else float(winner == side)
+            for name in lineup:
+                char_scores[name].push(score)
+
+    low, high = first_player.interval()
+    char_rates = [stats.mean for stats in char_scores.values()]
+    char_spread = RunningStats()
+    for rate in char_rates:
+        char_spread.push(rate)
+    return {
+        'point': index, **point,
+        'games': games,
+        'first_player_win_rate': first_player.win_rate,
+        'first_player_low': low, 'first_player_high': high,
+        'draw_rate': first_player.draws / games if games else 0.0,
+        'avg_rounds': first_player.rounds.mean, 'rounds_std': first_player.rounds.std,
+        'char_win_rate_std': char_spread.std,
+        'char_win_rate_min': min(char_rates, default=0.0), 'char_win_rate_max': max(char_rates, default=0.0),
+    }
+
+
+class Sweep:
+    """扫描调度：CSV 既是结果表也是检查点"""
+
+    def __init__(self, config, params: List[Parameter], design: str = 'grid', points: int = 0,
+                 games: int = 200, seed: int = 0, strategy: str = 'greedy'):
+        self.config = config
+        self.params = params
+        self.games = games
+        self.seed = seed
+        self.strategy = strategy
+        self.points = make_design(params, design, points, seed)
+        self.columns = ['point'] + [p.name for p in params] + METRICS
+
+    def run(self, output: str, jobs: int = 1, verbose: bool = False) -> List[Dict]:
+        done = self._load(output)
+        tasks = [(i, point, self.config, self.games, self.seed, self.strategy)
+                 for i, point in enumerate(self.points) if i not in done]
+        if verbose:
+            print(f"共 {len(self.points)} 个设计点，已完成 {len(done)} 个，需要模拟 {len(tasks)} 个")
+
+        new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+        with open(output, 'a', encoding='utf-8', newline='') as f, Pool(jobs) as pool:
+            writer = csv.DictWriter(f, fieldnames=self.columns)
+            if new_file:
+                writer.writeheader()
+            for i, row in enumerate(pool.imap_unordered(_run_point, tasks)):
+                writer.writerow(row)
+                f.flush()
+                done[row['point']] = row
+                if verbose:
+                    values = ", ".join(f"{p.name}={row[p.name]}" for p in self.params)
+                    print(f"[{i + 1}/{len(tasks)}] {values}: 先手胜率 {row['first_player_win_rate']:.1%}，"
+                          f"平局 {row['draw_rate']:.1%}，平均 {row['avg_rounds']:.1f} 轮")
+        return [done[i] for i in sorted(done)]
+
+    def _load(self, output: str) -> Dict[int, Dict]:
+        """读取已完成的点；截掉中断时写了一半的最后一行，并确认这些点属于同一个扫描"""
+        if not os.path.exists(output):
+            return {}
+        with open(output, 'rb') as f:
+            data = f.read()
+        valid = data[:data.rfind(b"\n") + 1]
+        if len(valid) != len(data):
+            with open(output, 'r+b') as f:
+                f.truncate(len(valid))
+
+        rows = list(csv.DictReader(valid.decode('utf-8').splitlines()))
+        if valid and rows and list(rows[0].keys()) != self.columns:
+            raise ValueError(f"{output} 的列与本次扫描不同，请换一个输出文件")
+        done = {}
+        for row in rows:
+            index = int(row['point'])
+            expected = self.points[index] if index < len(self.points) else None
+            if expected is None or int(row['games']) != self.games \
+                    or any(str(expected[p.name]) != row[p.name] for p in self.params):
+                raise ValueError(f"{output} 第 {index} 个点与本次扫描的设计不一致，请换一个输出文件")
+            done[index] = row
+        return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="config.yaml 参数扫描")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--param', action='append', required=True, help="name=a,b,c 或 name=lo:hi，可重复")
+    parser.add_argument('--design', choices=['grid', 'random', 'lhs'], default='grid')
+    parser.add_argument('--points', type=int, default=20, help="random / lhs 设计的点数")
+    parser.add_argument('--games', type=int, default=200, help="每个点模拟的局数")
+    parser.add_argument('--strategy', default='greedy', help="双方使用的策略名")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='sweep.csv')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    params = [Parameter.parse(text) for text in args.param]
+    sweep = Sweep(config, params, args.design, args.points, args.games, args.seed, args.strategy)
+    rows = sweep.run(args.output, args.jobs, verbose=True)
+    print(f"已写入 {args.output}（{len(rows)} 个点）")
+
+if __name__ == "__main__":
+    main()
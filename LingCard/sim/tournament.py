@@ -0,0 +1,269 @@
+# LingCard/sim/tournament.py
+"""
+AI 策略锦标赛：循环赛或瑞士轮，进程池并行对局，按 Bradley-Terry 模型拟合 Elo 等级分，
+并用自助法（bootstrap）给出 95% 置信区间。
+
+每局结果追加写入日志文件，中断后用相同参数重新运行即从断点继续。
+双方总是使用同一个随机阵容，并轮换先后手，以抵消阵容与先手带来的差异。
+
+用法: python -m LingCard.sim.tournament greedy legacy lookup --format swiss --rounds 5 --games 50
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+from itertools import combinations
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from LingCard.ai.anytime import AnytimeAI
+from LingCard.core.game_engine import GameEngine
+from LingCard.sim.simulator import play_game
+from LingCard.strategies.greedy import GreedyAI
+from LingCard.utils.loader import load_cards, load_characters, load_strategies
+
+_worker = {} # 每个工作进程内复用的引擎与策略实例
+
+def _init_worker(config, time_budget: Optional[float]):
+    engine = GameEngine(config)
+    _worker.update({
+        'engine': engine,
+        'characters': load_characters(),
+        'cards': load_cards(),
+        'strategy_classes': load_strategies(),
+        'time_budget': time_budget,
+        'strategies': {},
+    })
+
+def _get_strategy(name: str):
+    if name not in _worker['strategies']:
+        engine = _worker['engine']
+        strategy = _worker['strategy_classes'][name](engine)
+        if _worker['time_budget'] is not None:
+            strategy = AnytimeAI(strategy, GreedyAI(engine), _worker['time_budget'])
+        _worker['strategies'][name] = strategy
+    return _worker['strategies'][name]
+
+def _play(task: Dict) -> Dict:
+    players = [task['a'], task['b']]
+    result = play_game(
+        _worker['engine'], [task['lineup'], task['lineup']], [_get_strategy(name) for name in players],
+        _worker['characters'], _worker['cards'], turn_order=task['turn_order'], rng=random.Random(task['seed']),
+    )
+    winner = players[result['winner']] if result['winner'] is not None else None
+    return {'type': 'game', 'id': task['id'], 'a': task['a'], 'b': task['b'],
+            'winner': winner, 'rounds': result['rounds']}
+
+
+def fit_elo(games: List[Dict], names: List[str], iterations: int = 200) -> Dict[str, float]:
+    """
+    Bradley-Terry 极大似然（MM 迭代），平局记双方各半场胜利。
+    每名选手额外与一个 1500 分的虚拟对手战平一局作为先验，避免全胜/全负时发散。
+    """
+    wins = {name: 0.5 for name in names}
+    pair_games: Dict[Tuple[str, str], int] = {}
+    for game in games:
+        a, b = game['a'], game['b']
+        if game['winner'] is None:
+            wins[a] += 0.5
+            wins[b] += 0.5
+        else:
+            wins[game['winner']] += 1
+        pair_games[(a, b)] = pair_games.get((a, b), 0) + 1
+        pair_games[(b, a)] = pair_games.get((b, a), 0) + 1
+
+    gamma = {name: 1.0 for name in names}
+    for _ in range(iterations):
+        for name in names:
+            denominator = 1 / (gamma[name] + 1.0) # 虚拟对手
+            for other in names:
+                count = pair_games.get((name, other), 0)
+                if count:
+                    denominator += count / (gamma[name] + gamma[other])
+            gamma[name] = wins[name] / denominator
+    return {name: 1500 + 400 * math.log10(gamma[name]) for name in names}
+
+def elo_with_intervals(games: List[Dict], names: List[str], samples: int = 200,
+                       seed: int = 0) -> Dict[str, Tuple[float, float, float]]:
+    """返回 {策略名: (Elo, 95%下限, 95%上限)}，区间由对局重采样得到"""
+    ratings = fit_elo(games, names)
+    rng = random.Random(seed)
+    resampled = {name: [] for name in names}
+    for _ in range(samples if games else 0):
+        boot = fit_elo([rng.choice(games) for _ in games], names)
+        for name in names:
+            resampled[name].append(boot[name])
+
+    result = {}
+    for name in names:
+        values = sorted(resampled[name]) or [ratings[name]]
+        low = values[int(0.025 * (len(values) - 1))]
+        high = values[int(0.975 * (len(values) - 1))]
+        result[name] = (ratings[name], low, high)
+    return result
+
+
+class Tournament:
+    """锦标赛调度与断点续跑"""
+
+    def __init__(self, config, names: List[str], fmt: str = 'round-robin', rounds: int = 1,
+                 games: int = 20, seed: int = 0, time_budget: Optional[float] = None):
+        self.config = config
+        self.names = list(names)
+        self.format = fmt
+        self.rounds = rounds if fmt == 'swiss' else 1
+        self.games = games
+        self.seed = seed
+        self.time_budget = time_budget
+        chars_per_player = config['game_settings']['characters_per_player']
+        self.lineups = list(combinations(sorted(load_characters()), chars_per_player))
+        self.results: Dict[str, Dict] = {}
+        self.pairings: Dict[int, List[List[str]]] = {}
+
+    def params(self) -> Dict:
+        return {'names': self.names, 'format': self.format, 'rounds': self.rounds,
+                'games': self.games, 'seed': self.seed, 'time_budget': self.time_budget}
+
+    def _task_seed(self, *parts) -> int:
+        text = "|".join(str(p) for p in (self.seed,) + parts)
+        return int.from_bytes(hashlib.sha1(text.encode('utf-8')).digest()[:4], 'little')
+
+    def _tasks(self, round_idx: int, pairings: List[List[str]]) -> List[Dict]:
+        tasks = []
+        for a, b in pairings:
+            for game_idx in range(self.games):
+                # 相邻两局使用同一阵容并交换先手
+                lineup_rng = random.Random(self._task_seed(round_idx, a, b, game_idx // 2))
+                tasks.append({
+                    'id': f"{round_idx}:{a}:{b}:{game_idx}",
+                    'a': a, 'b': b,
+                    'lineup': list(lineup_rng.choice(self.lineups)),
+                    'turn_order': [0, 1] if game_idx % 2 == 0 else [1, 0],
+                    'seed': self._task_seed(round_idx, a, b, game_idx),
+                })
+        return tasks
+
+    def _swiss_pairings(self, round_idx: int) -> List[List[str]]:
+        """按当前积分排序后相邻配对，尽量避免重复对阵；人数为奇数时由尚未轮空过的最低积分者轮空"""
+        points = {name: 0.0 for name in self.names}
+        met = set()
+        for game in self.results.values():
+            met.add(frozenset((game['a'], game['b'])))
+            if game['winner'] is None:
+                points[game['a']] += 0.5
+                points[game['b']] += 0.5
+            else:
+                points[game['winner']] += 1
+        rng = random.Random(self._task_seed('swiss', round_idx))
+        order = sorted(self.names, key=lambda n: (-points[n], rng.random()))
+        if len(order) % 2:
+            had_bye = {name for r, pairings in self.pairings.items() if r < round_idx
+                       for name in self.names if all(name not in pair for pair in pairings)}
+            bye = next((n for n in reversed(order) if n not in had_bye), order[-1])
+            order.remove(bye)
+
+        pairings = []
+        while order:
+            a = order.pop(0)
+            partner = next((b for b in order if frozenset((a, b)) not in met), order[0])
+            order.remove(partner)
+            pairings.append([a, partner])
+        return pairings
+
+    def run(self, journal: str, jobs: int = 1, verbose: bool = False):
+        self._load_journal(journal)
+        with open(journal, 'a', encoding='utf-8') as log, \
+                Pool(jobs, initializer=_init_worker, initargs=(self.config, self.time_budget)) as pool:
+            if os.path.getsize(journal) == 0:
+                self._write(log, {'type': 'header', 'params': self.params()})
+
+            for round_idx in range(self.rounds):
+                if round_idx not in self.pairings:
+                    if self.format == 'swiss':
+                        pairings = self._swiss_pairings(round_idx)
+                    else:
+                        pairings = [list(pair) for pair in combinations(self.names, 2)]
+                    self.pairings[round_idx] = pairings
+                    self._write(log, {'type': 'round', 'round': round_idx, 'pairings': pairings})
+
+                tasks = [t for t in self._tasks(round_idx, self.pairings[round_idx]) if t['id'] not in self.results]
+                for i, game in enumerate(pool.imap_unordered(_play, tasks)):
+                    self.results[game['id']] = game
+                    self._write(log, game)
+                    if verbose and (i + 1) % 50 == 0:
+                        print(f"第 {round_idx + 1}/{self.rounds} 轮：已完成 {i + 1}/{len(tasks)} 局")
+
+    def _load_journal(self, journal: str):
+        if not os.path.exists(journal):
+            return
+        valid_size = 0
+        with open(journal, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                valid_size += len(line)
+                if record['type'] == 'header' and record['params'] != self.params():
+                    raise ValueError(f"日志 {journal} 属于参数不同的另一场锦标赛，请换一个日志文件")
+                elif record['type'] == 'round':
+                    self.pairings[record['round']] = record['pairings']
+                elif record['type'] == 'game':
+                    self.results[record['id']] = record
+        # 截掉中断时写了一半的最后一行，续写的记录才能被正确读回
+        with open(journal, 'r+b') as f:
+            f.truncate(valid_size)
+
+    @staticmethod
+    def _write(log, record: Dict):
+        log.write(json.dumps(record, ensure_ascii=False) + "\n")
+        log.flush()
+
+    def standings(self) -> List[Dict]:
+        games = list(self.results.values())
+        ratings = elo_with_intervals(games, self.names, seed=self.seed)
+        rows = []
+        for name in self.names:
+            played = [g for g in games if name in (g['a'], g['b'])]
+            rows.append({
+                'name': name,
+                'elo': ratings[name][0], 'low': ratings[name][1], 'high': ratings[name][2],
+                'games': len(played),
+                'wins': sum(1 for g in played if g['winner'] == name),
+                'draws': sum(1 for g in played if g['winner'] is None),
+            })
+        return sorted(rows, key=lambda row: -row['elo'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI 策略锦标赛")
+    parser.add_argument('strategies', nargs='*', help="参赛策略名，默认全部")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--format', choices=['round-robin', 'swiss'], default='round-robin')
+    parser.add_argument('--rounds', type=int, default=5, help="瑞士轮轮数")
+    parser.add_argument('--games', type=int, default=20, help="每次对阵的局数")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--time-budget', type=float, default=None, help="每回合思考时间上限（秒）")
+    parser.add_argument('--journal', default='tournament.jsonl', help="结果日志，用于断点续跑")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    names = args.strategies or sorted(load_strategies())
+    tournament = Tournament(config, names, args.format, args.rounds, args.games, args.seed, args.time_budget)
+    tournament.run(args.journal, args.jobs, verbose=True)
+
+    print(f"{'策略':<12}{'Elo':>8}{'95% 区间':>20}{'局数':>8}{'胜':>6}{'平':>6}")
+    for row in tournament.standings():
+        interval = f"[{row['low']:.0f}, {row['high']:.0f}]"
+        print(f"{row['name']:<12}{row['elo']:>8.0f}{interval:>20}{row['games']:>8}{row['wins']:>6}{row['draws']:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# LingCard/strategies/greedy.py
+import copy
+from typing import List
+from .strategy import AIStrategy, Move
+from LingCard.utils.enums import ActionType
+
+class GreedyAI(AIStrategy):
+    """贪心 AI：攻击血量最少的敌人，治疗受伤最重的队友，防御血量最少的队友"""
+    name = "greedy"
+    description = "逐张判断手牌的贪心策略"
+
+    def choose_moves(self, game_state) -> List[Move]:
+        return self.play_turn(copy.deepcopy(game_state))
+
+    def play_turn(self, game_state) -> List[Move]:
+        """直接在 game_state 上执行整个回合（不结束回合），返回执行过的行动"""
+        player = game_state.get_current_player()
+        opponent = game_state.get_opponent_player()
+        moves = []
+
+        # 从后往前遍历手牌，这样在执行动作（pop牌）时不会影响后续遍历的索引
+        for card_idx, card in reversed(list(enumerate(player.hand))):
+            alive_ai_chars = player.get_alive_characters()
+            if not alive_ai_chars:
+                break # AI没有存活角色，无法行动
+
+            target_idx = self._select_target_idx(card, player, opponent)
+            if target_idx == -1:
+                continue
+
+            # 简化：总是让第一个存活的角色使用卡牌
+            move = (card_idx, 0, target_idx)
+            self.engine.execute_action(game_state, *move)
+            moves.append(move)
+            if game_state.game_over:
+                break
+        return moves
+
+    def _select_target_idx(self, card, player, opponent) -> int:
+        if card.action_type == ActionType.ATTACK:
+            targets = opponent.get_alive_characters()
+            if targets:
+                # 攻击血量最少的目标
+                return targets.index(min(targets, key=lambda c: c.current_hp))
+
+        elif card.action_type == ActionType.HEAL:
+            targets = player.get_alive_characters()
+            # 寻找受伤最严重的角色
+            heal_candidates = [c for c in targets if c.current_hp < c.max_hp]
+            if heal_candidates:
+                return targets.index(min(heal_candidates, key=lambda c: c.current_hp))
+
+        elif card.action_type == ActionType.DEFEND:
+            targets = player.get_alive_characters()
+            if targets:
+                # 防御血量最少的角色
+                return targets.index(min(targets, key=lambda c: c.current_hp))
+        return -1
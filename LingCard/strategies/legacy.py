@@ -0,0 +1,43 @@
+# LingCard/strategies/legacy.py
+import random
+from typing import List, Optional
+from .strategy import AIStrategy, Move
+from LingCard.utils.enums import ActionType
+
+class LegacyAI(AIStrategy):
+    """旧版 GameAI（others/旧代码/game_engine.py）的移植，便于与新策略对比"""
+    name = "legacy"
+    description = "旧版简单 AI：使用者随机，防御目标随机"
+
+    def choose_moves(self, game_state) -> List[Move]:
+        player = game_state.get_current_player()
+        alive_chars = player.get_alive_characters()
+        enemies = game_state.get_opponent_player().get_alive_characters()
+        if not alive_chars or not player.hand:
+            return []
+
+        moves = []
+        # 从后往前出牌，保证前面的手牌索引不变
+        for card_idx in reversed(range(len(player.hand))):
+            card = player.hand[card_idx]
+            # 选择使用技能的角色（随机选择存活角色）
+            user_idx = random.randrange(len(alive_chars))
+            target_idx = self._select_target(card.action_type, enemies, alive_chars)
+            if target_idx is not None:
+                moves.append((card_idx, user_idx, target_idx))
+        return moves
+
+    def _select_target(self, action_type: ActionType, enemies, own_chars) -> Optional[int]:
+        """AI选择目标的逻辑"""
+        if action_type == ActionType.ATTACK and enemies:
+            # 攻击：优先攻击血量最少的敌人
+            return enemies.index(min(enemies, key=lambda x: x.current_hp))
+        elif action_type == ActionType.HEAL:
+            # 回血：优先治疗血量最少的己方角色
+            injured_chars = [c for c in own_chars if c.current_hp < c.max_hp]
+            if injured_chars:
+                return own_chars.index(min(injured_chars, key=lambda x: x.current_hp))
+        elif action_type == ActionType.DEFEND:
+            # 防御：随机选择一个己方角色
+            return random.randrange(len(own_chars))
+        return None
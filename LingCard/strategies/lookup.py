@@ -0,0 +1,59 @@
+# LingCard/strategies/lookup.py
+import copy
+import os
+from typing import List
+from .strategy import AIStrategy, Move
+from .greedy import GreedyAI
+from LingCard.ai.lookup import HandLookupTable
+from LingCard.utils.enums import ActionType
+
+class LookupAI(AIStrategy):
+    """查表 AI：一次查找表读取得到出牌分配，适合批量模拟与服务器的低难度档"""
+    name = "lookup"
+    description = "查预生成的手牌分配表，微秒级决策"
+
+    def __init__(self, engine, table=None):
+        super().__init__(engine)
+        if table is None:
+            path = engine.config.get('ai_settings', {}).get('lookup_table', 'ai_lookup.lut')
+            table = HandLookupTable(path, engine.config) if os.path.exists(path) else None
+        self.table = table
+        self.fallback = GreedyAI(engine) # 查找表缺失或阵容不在表中时使用
+
+    def choose_moves(self, game_state) -> List[Move]:
+        player = game_state.get_current_player()
+        opponent = game_state.get_opponent_player()
+        alloc = None
+        if self.table is not None:
+            counts = [sum(1 for c in player.hand if c.action_type == t)
+                      for t in (ActionType.ATTACK, ActionType.HEAL, ActionType.DEFEND)]
+            alloc = self.table.lookup(player.characters, opponent.characters, counts)
+        if alloc is None:
+            return self.fallback.choose_moves(game_state)
+        return self._alloc_to_moves(game_state, alloc)
+
+    def _alloc_to_moves(self, game_state, alloc) -> List[Move]:
+        """在状态副本上依次执行分配：每一步都按执行到该步时的局面重新计算手牌、使用者与目标的索引"""
+        sim = copy.deepcopy(game_state)
+        player = sim.get_current_player()
+        opponent = sim.get_opponent_player()
+
+        moves = []
+        for key, action_type, side in (('attack', ActionType.ATTACK, opponent),
+                                       ('heal', ActionType.HEAL, player),
+                                       ('defend', ActionType.DEFEND, player)):
+            for char_pos, char in enumerate(side.characters):
+                for _ in range(alloc[key][char_pos]):
+                    if sim.game_over:
+                        return moves
+                    alive = player.get_alive_characters()
+                    card_idx = next((i for i, c in enumerate(player.hand) if c.action_type == action_type), None)
+                    if not alive or card_idx is None or not char.is_alive:
+                        break
+                    user = max(alive, key=lambda c: c.current_hp)
+                    if action_type == ActionType.ATTACK and not moves:
+                        user = next((c for c in alive if c.__class__.__name__ == 'Cafe'), user)
+                    move = (card_idx, alive.index(user), side.get_alive_characters().index(char))
+                    self.engine.execute_action(sim, *move)
+                    moves.append(move)
+        return moves
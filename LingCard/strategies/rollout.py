@@ -0,0 +1,133 @@
+# LingCard/strategies/rollout.py
+import copy
+import random
+import time
+import weakref
+from typing import List, Optional, Iterator
+from .strategy import AIStrategy, Move, evaluate
+from .greedy import GreedyAI
+from LingCard.ai.belief import BeliefTracker
+
+class _SearchTimeout(Exception):
+    """搜索超出截止时间"""
+    pass
+
+class RolloutAI(AIStrategy):
+    """
+    迭代加深的蒙特卡洛推演 AI。
+    每一步比较“打出某张牌后结束回合”与“直接结束回合”的推演均值，
+    推演中双方后续回合由贪心策略代打；每加深一层就产出一次完整的回合计划。
+    提供开局库或残局库时，先查表，查不到再实时搜索。
+    提供 evaluator（如 ai.features.BatchEvaluator）时，每个候选行动的全部推演叶子一次批量估值。
+    track_beliefs 开启时按局记牌（ai.belief），推演只采样与公开信息一致的对手手牌。
+    """
+    name = "rollout"
+    description = "迭代加深的推演搜索，可随时中断"
+
+    def __init__(self, engine, samples: int = 8, max_depth: int = 4, tablebase=None, opening_book=None,
+                 evaluator=None, track_beliefs: bool = True):
+        super().__init__(engine)
+        self.evaluator = evaluator
+        self.samples = samples
+        self.max_depth = max_depth
+        self.tablebase = tablebase
+        self.opening_book = opening_book
+        self.policy = GreedyAI(engine)
+        self.track_beliefs = track_beliefs
+        self._trackers = weakref.WeakKeyDictionary() # 真实对局状态 -> {玩家id: BeliefTracker}
+        self._observed: Optional[BeliefTracker] = None
+        self._belief: Optional[BeliefTracker] = None
+
+    def observe(self, game_state):
+        if not self.track_beliefs:
+            return
+        opponent_id = game_state.get_opponent_player().id
+        trackers = self._trackers.setdefault(game_state, {})
+        if opponent_id not in trackers:
+            trackers[opponent_id] = BeliefTracker(self.engine.config, opponent_id)
+        trackers[opponent_id].observe(game_state)
+        self._observed = trackers[opponent_id]
+
+    def choose_moves(self, game_state) -> List[Move]:
+        self.observe(game_state)
+        moves = []
+        for moves in self.iter_moves(game_state):
+            pass
+        return moves
+
+    def iter_moves(self, game_state, deadline: Optional[float] = None) -> Iterator[List[Move]]:
+        for book in (self.opening_book, self.tablebase):
+            plan = book.lookup(game_state, self.engine) if book is not None else None
+            if plan is not None:
+                yield plan
+                return
+
+        me = game_state.get_current_player().id
+        # 只有最近一次 observe 的正是这个局面（或其副本）时才使用记牌信念
+        tracker = self._observed
+        opponent_id = game_state.get_opponent_player().id
+        self._belief = tracker if tracker is not None and tracker.player_id == opponent_id \
+            and tracker.matches(game_state) else None
+        for depth in range(1, self.max_depth + 1):
+            try:
+                plan = self._plan_turn(game_state, me, depth, deadline)
+            except _SearchTimeout:
+                return
+            yield plan
+
+    def _plan_turn(self, game_state, me: int, depth: int, deadline: Optional[float]) -> List[Move]:
+        sim = copy.deepcopy(game_state)
+        self._reseed(sim)
+        plan = []
+        while not sim.game_over:
+            best_move = None
+            best_score = self._score(sim, None, me, depth, deadline)
+            for move in self.engine.get_legal_moves(sim):
+                score = self._score(sim, move, me, depth, deadline)
+                if score > best_score:
+                    best_move, best_score = move, score
+            if best_move is None:
+                break
+            self.engine.execute_action(sim, *best_move)
+            plan.append(best_move)
+        return plan
+
+    def _score(self, sim, move: Optional[Move], me: int, depth: int, deadline: Optional[float]) -> float:
+        leaves = []
+        for _ in range(self.samples):
+            if deadline is not None and time.perf_counter() > deadline:
+                raise _SearchTimeout()
+            rollout = copy.deepcopy(sim)
+            self.determinize(rollout, me)
+            if move is not None:
+                self.engine.execute_action(rollout, *move)
+            for _ in range(depth - 1):
+                if rollout.game_over:
+                    break
+                self.engine.end_turn(rollout)
+                self.policy.play_turn(rollout)
+            leaves.append(rollout)
+
+        if self.evaluator is not None:
+            return float(self.evaluator.evaluate(leaves, me).mean())
+        return sum(evaluate(leaf, me) for leaf in leaves) / len(leaves)
+
+    @staticmethod
+    def _reseed(game_state):
+        """副本复制来的本局随机数发生器会重放真实对局之后的掷骰等结果，换成新的发生器"""
+        if game_state.rng is not None:
+            game_state.rng = random.Random(random.getrandbits(64))
+
+    def determinize(self, game_state, me: int):
+        """打乱推演副本中的隐藏信息：己方牌序，对手的手牌与牌库，以及之后的随机结果"""
+        self._reseed(game_state)
+        for player in game_state.players:
+            if player.id == me:
+                random.shuffle(player.deck)
+            elif self._belief is not None:
+                self._belief.determinize(game_state)
+            else:
+                pool = player.hand + player.deck
+                random.shuffle(pool)
+                player.hand = pool[:len(player.hand)]
+                player.deck = pool[len(player.hand):]
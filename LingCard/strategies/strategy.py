@@ -0,0 +1,47 @@
+# LingCard/strategies/strategy.py
+from typing import List, Tuple, Iterator, Optional
+
+# 一个行动: (手牌索引, 使用角色索引, 目标角色索引)，索引含义与 GameEngine.execute_action 相同
+Move = Tuple[int, int, int]
+
+class AIStrategy:
+    """AI 策略基类"""
+    name = "base"
+    description = ""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def choose_moves(self, game_state) -> List[Move]:
+        """
+        返回本回合要依次执行的行动列表（空列表表示直接结束回合）。
+        每个行动的索引基于执行到该行动时的局面；实现不得修改传入的 game_state。
+        """
+        raise NotImplementedError
+
+    def iter_moves(self, game_state, deadline: Optional[float] = None) -> Iterator[List[Move]]:
+        """
+        可随时中断的搜索接口：依次产出越来越好的行动列表。
+        deadline 为 time.perf_counter() 时间戳，默认只产出一次 choose_moves 的结果。
+        """
+        yield self.choose_moves(game_state)
+
+    def observe(self, game_state):
+        """
+        在真实对局状态上更新策略自己的对局记忆（如对手记牌信念），默认什么也不做。
+        包装器（如 AnytimeAI）会在复制状态交给搜索线程之前调用它。
+        """
+        pass
+
+
+def evaluate(game_state, player_id: int) -> float:
+    """从 player_id 视角评估局面：己方血量与防御减去对方，胜负给予极大分值"""
+    if game_state.game_over:
+        return 1000.0 if game_state.winner == player_id else -1000.0
+
+    score = 0.0
+    for player in game_state.players:
+        sign = 1 if player.id == player_id else -1
+        for char in player.get_alive_characters():
+            score += sign * (char.current_hp + 0.5 * char.defense_buff + 5)
+    return score
@@ -0,0 +1,69 @@
+# LingCard/utils/digest.py
+import ast
+import hashlib
+import importlib.util
+import inspect
+import yaml
+
+def config_digest(config, *sections: str) -> str:
+    """
+    计算配置的稳定摘要（sha1 十六进制），用于给离线生成的数据打上版本标记。
+    指定 sections 时只对这些顶层配置段求摘要。
+    """
+    if sections:
+        config = {key: config.get(key) for key in sections}
+    text = yaml.safe_dump(config, allow_unicode=True, sort_keys=True)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def source_digest(*objects) -> str:
+    """
+    对类或模块所在源文件，以及这些文件（递归）导入的 LingCard 模块的源码求摘要，
+    源码或其依赖改动后摘要随之变化。
+    """
+    sha = hashlib.sha1()
+    for path in sorted(_source_closure(inspect.getfile(obj) for obj in objects)):
+        with open(path, 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+def _source_closure(paths) -> set:
+    """从给定的源文件出发，沿 import 语句找出所有依赖的 LingCard 源文件（含函数内的延迟导入）"""
+    seen = set()
+    pending = list(paths)
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), path)
+        package = _module_name(path).rpartition('.')[0]
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                base = node.module or ''
+                if node.level:
+                    base = '.'.join(package.split('.')[:len(package.split('.')) - node.level + 1] + ([base] if base else []))
+                # from 包 import 模块 的形式里，被导入的名字本身也可能是模块
+                names = [base] + [f"{base}.{alias.name}" for alias in node.names]
+            else:
+                continue
+            for name in names:
+                if name.split('.')[0] != 'LingCard':
+                    continue
+                try:
+                    spec = importlib.util.find_spec(name)
+                except (ImportError, ValueError):
+                    spec = None
+                if spec is not None and spec.origin and spec.origin.endswith('.py'):
+                    pending.append(spec.origin)
+    return seen
+
+def _module_name(path: str) -> str:
+    """源文件路径对应的模块名，如 .../LingCard/core/flow.py -> LingCard.core.flow"""
+    parts = path[:-len('.py')].replace('\\', '/').split('/')
+    parts = parts[len(parts) - 1 - parts[::-1].index('LingCard'):]
+    if parts[-1] == '__init__':
+        parts.pop()
+    return '.'.join(parts)
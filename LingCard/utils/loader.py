@@ -40,4 +40,13 @@ def load_cards() -> Dict[str, Type]:
     # 获取当前文件的目录，并构建 cards 目录的路径
     current_dir = os.path.dirname(os.path.abspath(__file__))
     cards_dir = os.path.join(os.path.dirname(current_dir), 'cards')
-    return _load_classes_from_directory(cards_dir, ActionCard)
\ No newline at end of file
+    return _load_classes_from_directory(cards_dir, ActionCard)
+
+
+def load_strategies() -> Dict[str, Type]:
+    """加载所有 AI 策略类，返回 {策略名: 类对象}"""
+    from LingCard.strategies.strategy import AIStrategy
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    strategies_dir = os.path.join(os.path.dirname(current_dir), 'strategies')
+    classes = _load_classes_from_directory(strategies_dir, AIStrategy)
+    return {cls.name: cls for cls in classes.values()}
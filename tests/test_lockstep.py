@@ -0,0 +1,55 @@
+# tests/test_lockstep.py
+"""锁步联机：两个本地进程经 socketpair 对战，检查双方校验一致，以及人为改动状态后双方都报告失步"""
+import os
+import random
+import socket
+from multiprocessing import Process, Queue
+
+import pytest
+import yaml
+
+from LingCard.server.lockstep import _play
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.yaml')
+LINEUPS = [['Jun', 'Liuli'], ['Cafe', 'Xinhe']]
+
+
+@pytest.fixture(scope='module')
+def config():
+    with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def play_pair(config, seed, checksum_every=4, desync_at=None, timeout=120):
+    """与 lockstep demo 相同：两个进程各执一方，返回 {座位: 结果}"""
+    left, right = socket.socketpair()
+    results = Queue()
+    peers = [Process(target=_play, args=(config, left, 1, 'greedy', seed, LINEUPS, checksum_every, None, results)),
+             Process(target=_play, args=(config, right, 2, 'greedy', seed, LINEUPS, checksum_every, desync_at, results))]
+    for process in peers:
+        process.start()
+    left.close()
+    right.close()
+    outcomes = dict(results.get(timeout=timeout) for _ in peers)
+    for process in peers:
+        process.join(timeout)
+        assert process.exitcode == 0
+    return outcomes
+
+
+@pytest.mark.parametrize('seed', [1, 42])
+def test_peers_finish_with_matching_checksums(config, seed):
+    outcomes = play_pair(config, seed)
+    assert outcomes[1][0] == 'ok' and outcomes[2][0] == 'ok'
+    assert outcomes[1] == outcomes[2]
+
+
+@pytest.mark.parametrize('checksum_every', [1, 4])
+def test_tampered_state_is_detected_on_both_sides(config, checksum_every):
+    outcomes = play_pair(config, 42, checksum_every, desync_at=6)
+    assert outcomes[1][0] == 'desync' and outcomes[2][0] == 'desync'
+    assert outcomes[1][1] == outcomes[2][1] >= 6
+
+
+def test_same_seed_replays_the_same_game(config):
+    assert play_pair(config, 7) == play_pair(config, 7)